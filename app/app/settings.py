@@ -43,10 +43,13 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'drf_spectacular',
     'user',
-    'recipe'
+    'recipe',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.instrumentation.RequestProfileMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +59,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+# app.asgi włącza asynchroniczne widoki odczytu, app.wsgi zostaje przy
+# synchronicznych; można to nadpisać zmienną środowiskową
+API_ASYNC_READS = os.environ.get('API_ASYNC_READS', 'false') == 'true'
+
+ROOT_URLCONF = 'app.urls_async' if API_ASYNC_READS else 'app.urls'
 
 TEMPLATES = [
     {
@@ -80,13 +87,26 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+DB_POOL = os.environ.get('DB_POOL', 'true') == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.backends.postgresql_pool' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        # używane tylko przez core.backends.postgresql_pool
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'CHECK_AFTER': float(os.environ.get('DB_POOL_CHECK_AFTER', 5)),
+        },
     }
 }
 
@@ -138,4 +158,156 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # core.renderers/core.parsers dają te same bajty co domyślne klasy
+    # JSON, ale szybciej (orjson)
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'EXCEPTION_HANDLER': 'core.exceptions.exception_handler',
+    # liczba zaufanych proxy przed aplikacją; przy 0 klucze throttlingu
+    # biorą REMOTE_ADDR, a nie nagłówek X-Forwarded-For podany przez klienta
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.TokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.environ.get('LOGIN_IP_RATE', '30/min'),
+        'login_email': os.environ.get('LOGIN_EMAIL_RATE', '10/min'),
+    },
+}
+
+# Default number of objects per page of the cursor paginated endpoints.
+# Clients can ask for a different size with ?page_size=
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+
+# Number of worker processes serving the app (gunicorn and uvicorn read the
+# same variable). Process local caches are turned off when it is above 1.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# In-process cache of token -> user used by CachedTokenAuthentication.
+# SHARED_CACHE may name an entry of CACHES to share tokens between workers,
+# without it the local LRU is only used by a single worker process.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 300)),
+    'SHARED_CACHE': os.environ.get('TOKEN_AUTH_SHARED_CACHE') or None,
+}
+
+# Versioned per-user cache of recipe and tag list/retrieve responses.
+# With several worker processes ALIAS must point to a shared cache backend,
+# otherwise a write in one worker does not invalidate the others; the
+# recipe.E001 check refuses LocMemCache when WEB_CONCURRENCY is above 1.
+RECIPE_API_CACHE = {
+    'ENABLED': os.environ.get('RECIPE_API_CACHE_ENABLED', 'true') == 'true',
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.environ.get('RECIPE_API_CACHE_TIMEOUT', 300)),
+}
+
+# Token bucket rate limits of views with a throttle_scope, checked per user
+# or per client IP for anonymous requests (core.throttling). Every rate is
+# both the burst size and the refill over its period, reads and writes of
+# a scope have separate buckets. Buckets are kept in this process unless
+# SHARED_CACHE names an entry of CACHES.
+API_THROTTLE = {
+    'ENABLED': os.environ.get('API_THROTTLE_ENABLED', 'true') == 'true',
+    'SHARED_CACHE': os.environ.get('API_THROTTLE_SHARED_CACHE') or None,
+    'MAX_KEYS': int(os.environ.get('API_THROTTLE_MAX_KEYS', 100000)),
+    'RATES': {
+        'recipes.read': os.environ.get('RECIPES_READ_RATE', '1200/min'),
+        'recipes.write': os.environ.get('RECIPES_WRITE_RATE', '300/min'),
+        'tags.read': os.environ.get('TAGS_READ_RATE', '1200/min'),
+        'tags.write': os.environ.get('TAGS_WRITE_RATE', '300/min'),
+        'user.read': os.environ.get('USER_READ_RATE', '300/min'),
+        'user.write': os.environ.get('USER_WRITE_RATE', '60/min'),
+    },
+}
+
+# Bounded thread pools (core.executors). Calls beyond MAX_WORKERS +
+# MAX_PENDING are rejected with 503 instead of queueing.
+# The db executor runs async reads and defaults to the size of the
+# connection pool, the password executor hashes and verifies passwords.
+EXECUTORS = {
+    'db': {
+        'MAX_WORKERS': int(os.environ.get(
+            'DB_EXECUTOR_WORKERS', DATABASES['default']['POOL']['MAX_SIZE']
+        )),
+        'MAX_PENDING': int(os.environ.get('DB_EXECUTOR_PENDING', 200)),
+    },
+    'password': {
+        'MAX_WORKERS': int(os.environ.get(
+            'PASSWORD_EXECUTOR_WORKERS', os.cpu_count() or 2
+        )),
+        'MAX_PENDING': int(os.environ.get('PASSWORD_EXECUTOR_PENDING', 32)),
+    },
+}
+
+# Sampled per-request profiling (core.instrumentation). A SAMPLE_RATE
+# fraction of requests records its queries, DB and serializer time, gets a
+# Server-Timing header and is logged by the core.instrumentation logger.
+# Requests slower than SLOW_REQUEST_MS and statements repeated at least
+# DUPLICATE_QUERIES times in a request go to core.instrumentation.problems.
+REQUEST_PROFILE = {
+    'ENABLED': os.environ.get('REQUEST_PROFILE_ENABLED', 'true') == 'true',
+    'SAMPLE_RATE': float(os.environ.get('REQUEST_PROFILE_SAMPLE_RATE', 0.05)),
+    'SERVER_TIMING': os.environ.get(
+        'REQUEST_PROFILE_SERVER_TIMING', 'true'
+    ) == 'true',
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'SLOWEST_QUERIES': 3,
+    'DUPLICATE_QUERIES': int(os.environ.get('DUPLICATE_QUERIES', 5)),
+}
+
+# Sampled profiling is off while running tests (core.test_runner).
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Profile lines go to stderr, one per request; REQUEST_PROFILE_LOG_LEVEL
+# WARNING keeps only slow requests and repeated queries. Structured fields
+# are in the `profile` attribute of the records for other handlers.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'profile': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'profile': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'profile',
+        },
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['profile'],
+            'level': os.environ.get('REQUEST_PROFILE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Prometheus metrics served at /metrics (core.metrics). With several worker
+# processes MULTIPROCESS_DIR must name a directory shared by the workers and
+# emptied before they start: each process writes its own file there and
+# /metrics sums all of them. In-process stats of the connection pool,
+# executors, throttle and token cache are written every COLLECT_INTERVAL
+# seconds.
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', 'true') == 'true',
+    'MULTIPROCESS_DIR': os.environ.get('METRICS_MULTIPROCESS_DIR') or None,
+    'COLLECT_INTERVAL': float(os.environ.get('METRICS_COLLECT_INTERVAL', 5)),
+    'BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+}
+
+# /healthz and /readyz (core.views) reuse one database ping for
+# CACHE_SECONDS, so frequent probes do not add database load.
+HEALTH_CHECK = {
+    'CACHE_SECONDS': float(os.environ.get('HEALTH_CHECK_CACHE_SECONDS', 2)),
 }
@@ -0,0 +1,12 @@
+"""app URL Configuration for ASGI deployments
+
+Serves recipe and tag reads from async views and everything else from
+app.urls. Selected with API_ASYNC_READS, which app.asgi turns on.
+"""
+from django.urls import include, path
+
+from app.urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('api/recipe/', include('recipe.urls_async')),
+] + sync_urlpatterns
@@ -0,0 +1,327 @@
+"""
+Building blocks of the HTTP load test: dataset, server, clients and reports
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe, Tag, UserStats
+from recipe import stats
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+EMAIL_FORMAT = 'loadtest-{}@example.com'
+PASSWORD = 'loadtest-pass'
+TAG_VOCABULARY = (
+    'vegan', 'vegetarian', 'dessert', 'breakfast', 'dinner', 'soup',
+    'quick', 'spicy', 'italian', 'polish', 'baking', 'salad', 'grill',
+    'gluten-free', 'seafood', 'pasta', 'kids', 'party', 'healthy', 'cheap',
+)
+WORDS = (
+    'tomato', 'garlic', 'chicken', 'lentil', 'mushroom', 'potato', 'lemon',
+    'pepper', 'onion', 'rice', 'cheese', 'apple', 'cabbage', 'beetroot',
+)
+# (nazwa, metoda, ścieżka); {recipe_id} podstawiane losową recepturą
+SCENARIOS = {
+    'recipes': ('GET', '/api/recipe/recipes/'),
+    'recipe-detail': ('GET', '/api/recipe/recipes/{recipe_id}/'),
+    'recipes-by-tag': ('GET', '/api/recipe/recipes/?tags={tag_id}'),
+    'tags': ('GET', '/api/recipe/tags/'),
+    'token': ('POST', '/api/user/token/'),
+}
+
+
+class Client:
+    """A seeded user as seen by a load test worker"""
+
+    def __init__(self, email, token, recipe_ids, tag_ids):
+        self.email = email
+        self.token = token
+        self.recipe_ids = recipe_ids
+        self.tag_ids = tag_ids
+
+
+def seed_dataset(users, recipes_per_user, tags_per_user, seed=0):
+    """Create load test users with tokens, tags and linked recipes
+
+    Rows are bulk inserted, so denormalized counters are refreshed at the
+    end. Every user gets the same password hash, computed once.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    created = get_user_model().objects.bulk_create([
+        get_user_model()(
+            email=EMAIL_FORMAT.format(i), name=f'Load test {i}',
+            password=password
+        )
+        for i in range(users)
+    ])
+    owners = list(get_user_model().objects.filter(
+        email__in=[user.email for user in created]
+    ))
+    Token.objects.bulk_create([
+        Token(user=user, key=Token.generate_key()) for user in owners
+    ])
+
+    Tag.objects.bulk_create([
+        Tag(user=user, name=name)
+        for user in owners
+        for name in rng.sample(TAG_VOCABULARY, tags_per_user)
+    ])
+    Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=' '.join(rng.sample(WORDS, 3)).capitalize(),
+            description=' '.join(rng.choices(WORDS, k=20)),
+            time_minutes=rng.randint(5, 180),
+            price=Decimal(rng.randint(100, 9999)) / 100,
+            link=f'https://example.com/{user.pk}/{i}',
+        )
+        for user in owners
+        for i in range(recipes_per_user)
+    ])
+
+    tag_ids = {}
+    for pk, user_id in Tag.objects.filter(user__in=owners).values_list(
+        'pk', 'user_id'
+    ):
+        tag_ids.setdefault(user_id, []).append(pk)
+    recipe_ids = {}
+    for pk, user_id in Recipe.objects.filter(user__in=owners).values_list(
+        'pk', 'user_id'
+    ):
+        recipe_ids.setdefault(user_id, []).append(pk)
+
+    through = Recipe.tags.through
+    through.objects.bulk_create([
+        through(recipe_id=recipe_id, tag_id=tag_id)
+        for user_id, ids in recipe_ids.items()
+        for recipe_id in ids
+        for tag_id in rng.sample(
+            tag_ids[user_id], min(3, len(tag_ids[user_id]))
+        )
+    ], batch_size=5000)
+    stats.refresh_tag_counts(
+        [pk for ids in tag_ids.values() for pk in ids]
+    )
+    UserStats.objects.bulk_create([UserStats(user=user) for user in owners])
+    for user in owners:
+        stats.refresh_user_stats(user.pk)
+
+    tokens = dict(Token.objects.filter(user__in=owners).values_list(
+        'user_id', 'key'
+    ))
+    return [
+        Client(
+            user.email, tokens[user.pk],
+            recipe_ids.get(user.pk, []), tag_ids.get(user.pk, [])
+        )
+        for user in owners
+    ]
+
+
+def delete_dataset():
+    get_user_model().objects.filter(
+        email__startswith=EMAIL_FORMAT.split('{', 1)[0]
+    ).delete()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+
+class QueryCountingApplication:
+    """WSGI application reporting the queries of each request in a header"""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        def start(status, headers, exc_info=None):
+            headers = headers + [(QUERY_COUNT_HEADER, str(len(queries)))]
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(count):
+            return self.application(environ, start)
+
+
+class LiveServer:
+    """Serve the project from a thread of this process"""
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.httpd = ThreadedWSGIServer(
+            (host, port), QuietRequestHandler, allow_reuse_address=False
+        )
+        self.httpd.daemon_threads = True
+        self.httpd.set_app(QueryCountingApplication(get_wsgi_application()))
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+
+def request(base_url, scenario, client, rng):
+    """Send one scenario request, return (status, seconds, query count)"""
+    method, path = SCENARIOS[scenario]
+    path = path.format(
+        recipe_id=rng.choice(client.recipe_ids or [0]),
+        tag_id=rng.choice(client.tag_ids or [0]),
+    )
+    headers = {'Accept': 'application/json'}
+    body = None
+    if scenario == 'token':
+        body = json.dumps({'email': client.email, 'password': PASSWORD})
+        headers['Content-Type'] = 'application/json'
+    else:
+        headers['Authorization'] = f'Token {client.token}'
+
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    start = time.perf_counter()
+    try:
+        conn.request(method, url.path.rstrip('/') + path, body, headers)
+        response = conn.getresponse()
+        response.read()
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    queries = response.getheader(QUERY_COUNT_HEADER)
+    return (
+        response.status, elapsed, int(queries) if queries is not None else None
+    )
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_scenario(base_url, scenario, clients, concurrency, requests, seed=0):
+    """Drive a scenario with `concurrency` workers sending `requests` each"""
+    samples = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        client = clients[index % len(clients)]
+        results = []
+        barrier.wait()
+        for _ in range(requests):
+            results.append(request(base_url, scenario, client, rng))
+        with lock:
+            samples.extend(results)
+
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds for _, seconds, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(1 for status, _, _ in samples if status >= 400),
+        'requests_per_second': len(samples) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries_per_request': (
+            sum(queries) / len(queries) if queries else None
+        ),
+    }
+
+
+def format_result(result):
+    queries = result['queries_per_request']
+    return (
+        '{scenario:15} x{concurrency:<4} {requests_per_second:8.1f} req/s  '
+        'p50 {p50_ms:7.1f}ms  p95 {p95_ms:7.1f}ms  p99 {p99_ms:7.1f}ms  '
+        '{queries} queries  {errors} errors'.format(
+            queries='?' if queries is None else f'{queries:.1f}', **result
+        )
+    )
+
+
+def compare(results, baseline, threshold):
+    """Return descriptions of regressions of `results` against `baseline`
+
+    Throughput may drop and p95 latency grow by at most `threshold` (a
+    fraction), queries per request and errors may not grow at all.
+    """
+    previous = {
+        (result['scenario'], result['concurrency']): result
+        for result in baseline
+    }
+    regressions = []
+    for result in results:
+        key = (result['scenario'], result['concurrency'])
+        before = previous.get(key)
+        if before is None:
+            continue
+        name = '{} x{}'.format(*key)
+        if result['requests_per_second'] < (
+            before['requests_per_second'] * (1 - threshold)
+        ):
+            regressions.append('{}: {:.1f} req/s, baseline {:.1f}'.format(
+                name, result['requests_per_second'],
+                before['requests_per_second']
+            ))
+        if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append('{}: p95 {:.1f}ms, baseline {:.1f}ms'.format(
+                name, result['p95_ms'], before['p95_ms']
+            ))
+        if None not in (
+            result['queries_per_request'], before['queries_per_request']
+        ) and result['queries_per_request'] > before['queries_per_request']:
+            regressions.append(
+                '{}: {:.1f} queries/request, baseline {:.1f}'.format(
+                    name, result['queries_per_request'],
+                    before['queries_per_request']
+                )
+            )
+        if result['errors'] > before['errors']:
+            regressions.append('{}: {} errors, baseline {}'.format(
+                name, result['errors'], before['errors']
+            ))
+    return regressions
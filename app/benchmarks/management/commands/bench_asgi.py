@@ -0,0 +1,176 @@
+"""
+Django command comparing WSGI and ASGI servers under slow clients
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from benchmarks.utils import create_bench_user, write_results
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+SERVERS = {
+    'wsgi': [
+        'gunicorn', 'app.wsgi:application', '--workers', '1',
+        '--threads', '{threads}', '--bind', '127.0.0.1:{port}',
+    ],
+    'asgi': [
+        'uvicorn', 'app.asgi:application', '--host', '127.0.0.1',
+        '--port', '{port}', '--no-access-log',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_kb(pid):
+    """Resident memory of a process and all of its children"""
+    total = 0
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as children:
+                total += sum(rss_kb(int(child))
+                             for child in children.read().split())
+    except FileNotFoundError:
+        pass
+    return total
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError(f'Server on port {port} did not start')
+
+
+async def slow_request(port, token, slow_seconds, connected):
+    """Dribble the request headers, then read the whole response"""
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    connected.release()
+    lines = [
+        f'GET {RECIPES_URL} HTTP/1.1\r\n',
+        'Host: 127.0.0.1\r\n',
+        f'Authorization: Token {token}\r\n',
+        'Connection: close\r\n\r\n',
+    ]
+    for line in lines:
+        writer.write(line.encode())
+        await writer.drain()
+        await asyncio.sleep(slow_seconds / len(lines))
+    response = await reader.read()
+    writer.close()
+    if not response.startswith(b'HTTP/1.1 200'):
+        raise CommandError(response.split(b'\r\n', 1)[0].decode())
+    return time.perf_counter() - start
+
+
+async def run_clients(pid, port, token, clients, slow_seconds):
+    connected = asyncio.Semaphore(0)
+    tasks = [
+        asyncio.ensure_future(
+            slow_request(port, token, slow_seconds, connected)
+        )
+        for _ in range(clients)
+    ]
+    for _ in range(clients):
+        await connected.acquire()
+    # wszyscy klienci są połączeni i wciąż wysyłają nagłówki
+    loaded_kb = rss_kb(pid)
+    return await asyncio.gather(*tasks), loaded_kb
+
+
+class Command(BaseCommand):
+    """Start gunicorn and uvicorn and hit them with slow clients"""
+    help = 'Compare p99 latency and memory per connection of WSGI and ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--slow-ms', type=int, default=500,
+                            help='Time each client takes to send headers')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Threads of the WSGI worker')
+        parser.add_argument('--recipes', type=int, default=50)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def benchmark(self, mode, token, options):
+        port = free_port()
+        command = [
+            part.format(port=port, threads=options['threads'])
+            for part in SERVERS[mode]
+        ]
+        env = dict(os.environ, API_ASYNC_READS=str(mode == 'asgi').lower())
+        try:
+            server = subprocess.Popen(
+                command, env=env, stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except FileNotFoundError:
+            raise CommandError(f'{command[0]} is not installed')
+        try:
+            wait_for_port(port)
+            idle_kb = rss_kb(server.pid)
+            latencies, loaded_kb = asyncio.run(run_clients(
+                server.pid, port, token, options['clients'],
+                options['slow_ms'] / 1000
+            ))
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies.sort()
+        return {
+            'mode': mode,
+            'clients': options['clients'],
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'idle_rss_kb': idle_kb,
+            'kb_per_connection': (loaded_kb - idle_kb) / options['clients'],
+        }
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith('linux'):
+            raise CommandError('Memory is read from /proc, run on Linux')
+
+        user = create_bench_user()
+        try:
+            Recipe.objects.bulk_create([
+                Recipe(user=user, title=f'Recipe {i}', time_minutes=10)
+                for i in range(options['recipes'])
+            ])
+            token = Token.objects.create(user=user).key
+            results = []
+            for mode in SERVERS:
+                result = self.benchmark(mode, token, options)
+                results.append(result)
+                self.stdout.write(
+                    '{mode} {clients} clients  p50 {p50_ms:8.1f}ms  '
+                    'p99 {p99_ms:8.1f}ms  max {max_ms:8.1f}ms  '
+                    '{kb_per_connection:6.1f} KiB/connection'.format(**result)
+                )
+        finally:
+            user.delete()
+
+        if options['output']:
+            write_results(options['output'], results)
@@ -0,0 +1,82 @@
+"""
+Django command comparing the bulk recipe endpoint with single POSTs
+"""
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from benchmarks.utils import (
+    Timer,
+    check_statuses,
+    create_bench_user,
+    parse_sizes,
+    rollback,
+    token_client,
+    write_results,
+)
+
+RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def make_payload(count, tags_per_recipe):
+    return [
+        {
+            'title': f'Benchmark recipe {i}',
+            'time_minutes': 10 + i % 50,
+            'price': '5.00',
+            'tags': [
+                {'name': f'tag-{(i + j) % 50}'}
+                for j in range(tags_per_recipe)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Time N single POSTs against one bulk POST of N recipes"""
+    help = 'Compare bulk recipe creation with single POSTs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000')
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        for size in parse_sizes(options['sizes']):
+            payload = make_payload(size, options['tags_per_recipe'])
+
+            statuses = []
+            with rollback():
+                with token_client(create_bench_user()) as client:
+                    with Timer() as single:
+                        for item in payload:
+                            statuses.append(client.post(
+                                RECIPES_URL, item, format='json'
+                            ).status_code)
+            check_statuses(statuses, 201)
+
+            with rollback():
+                with token_client(create_bench_user()) as client:
+                    with Timer() as bulk:
+                        res = client.post(BULK_URL, payload, format='json')
+            check_statuses([res.status_code], 201)
+
+            result = {
+                'size': size,
+                'single_seconds': single.elapsed,
+                'bulk_seconds': bulk.elapsed,
+                'single_per_second': size / single.elapsed,
+                'bulk_per_second': size / bulk.elapsed,
+                'speedup': single.elapsed / bulk.elapsed,
+            }
+            results.append(result)
+            self.stdout.write(
+                '{size:>7} recipes  single {single_seconds:8.2f}s '
+                '({single_per_second:8.0f}/s)  bulk {bulk_seconds:8.2f}s '
+                '({bulk_per_second:8.0f}/s)  x{speedup:.1f}'.format(**result)
+            )
+
+        if options['output']:
+            write_results(options['output'], results)
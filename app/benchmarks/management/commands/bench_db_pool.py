@@ -0,0 +1,131 @@
+"""
+Django command comparing pooled and unpooled database connections
+"""
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+from django.urls import reverse
+
+from benchmarks.utils import (
+    check_statuses,
+    create_bench_user,
+    parse_sizes,
+    token_client,
+    write_results,
+)
+from core.backends.postgresql_pool.base import close_pools, get_pool_stats
+from core.models import Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+ENGINES = {
+    'unpooled': 'django.db.backends.postgresql',
+    'pooled': 'core.backends.postgresql_pool',
+}
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    """Hit the tag list from many threads with and without the pool"""
+    help = 'Benchmark pooled against unpooled connections (Postgres only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', default='1,8,32')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per thread')
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def run(self, mode, threads, requests, user):
+        # nowe wątki tworzą połączenia z aktualnego ENGINE
+        connections.settings[connection.alias]['ENGINE'] = ENGINES[mode]
+        close_pools()
+        latencies = []
+        statuses = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+
+        def worker():
+            timings = []
+            codes = []
+            with token_client(user) as client:
+                barrier.wait()
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    res = client.get(TAGS_URL)
+                    # klient testowy nie zamyka połączeń po żądaniu tak
+                    # jak serwer WSGI przy CONN_MAX_AGE = 0
+                    connections.close_all()
+                    timings.append(time.perf_counter() - start)
+                    codes.append(res.status_code)
+            with lock:
+                latencies.extend(timings)
+                statuses.extend(codes)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        # wyjątek w wątku nie przerywa pomiaru, więc sprawdzamy wszystkie
+        # żądania, także gdy któryś wątek skończył wcześniej
+        if len(statuses) != threads * requests:
+            raise CommandError(
+                f'{threads * requests - len(statuses)} requests not sent'
+            )
+        check_statuses(statuses, 200)
+
+        pool = get_pool_stats().get(connection.alias, {})
+        return {
+            'mode': mode,
+            'threads': threads,
+            'requests': len(latencies),
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'pool_waits': pool.get('waits', 0),
+            'pool_wait_max_ms': pool.get('wait_seconds_max', 0) * 1000,
+            'connections_opened': pool.get('created'),
+        }
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Connection pooling needs Postgres')
+
+        engine = connection.settings_dict['ENGINE']
+        user = create_bench_user()
+        Tag.objects.bulk_create([
+            Tag(user=user, name=f'tag-{i}') for i in range(options['tags'])
+        ])
+        results = []
+        try:
+            # cache odpowiedzi ominąłby bazę danych
+            with override_settings(RECIPE_API_CACHE={'ENABLED': False}):
+                for threads in parse_sizes(options['threads']):
+                    for mode in ENGINES:
+                        result = self.run(
+                            mode, threads, options['requests'], user
+                        )
+                        results.append(result)
+                        self.stdout.write(
+                            '{mode:>9} {threads:>4} threads  '
+                            '{requests_per_second:8.0f} req/s  '
+                            'p50 {p50_ms:7.2f}ms  p95 {p95_ms:7.2f}ms  '
+                            'waits {pool_waits}'.format(**result)
+                        )
+        finally:
+            connections.settings[connection.alias]['ENGINE'] = engine
+            close_pools()
+            user.delete()
+
+        if options['output']:
+            write_results(options['output'], results)
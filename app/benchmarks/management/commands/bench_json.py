@@ -0,0 +1,99 @@
+"""
+Django command comparing the stdlib and orjson JSON renderer and parser
+"""
+import io
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.utils import create_bench_user, rollback, write_results
+from core.models import Recipe, Tag
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+from recipe.serializers import RecipeSerializer
+
+
+def best_of(func, repeat, number):
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+class Command(BaseCommand):
+    """Time rendering and parsing of a recipe list response"""
+    help = 'Microbenchmark the JSON renderer and parser on a recipe list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--number', type=int, default=20)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def response_data(self, count):
+        with rollback():
+            user = create_bench_user()
+            Tag.objects.bulk_create([
+                Tag(user=user, name=f'tag-{i}') for i in range(10)
+            ])
+            Recipe.objects.bulk_create([
+                Recipe(
+                    user=user,
+                    title=f'Benchmark recipe {i}',
+                    time_minutes=5 + i % 60,
+                    price=Decimal('2.50') + i % 40,
+                    link=f'https://example.com/recipes/{i}',
+                )
+                for i in range(count)
+            ])
+            tag_ids = list(user.tag_set.values_list('pk', flat=True))
+            queryset = Recipe.objects.filter(user=user).prefetch_related(
+                'tags'
+            )
+            through = Recipe.tags.through
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, tag_id=tag_ids[j])
+                for i, recipe_id in enumerate(
+                    queryset.values_list('pk', flat=True)
+                )
+                for j in (i % 10, (i + 3) % 10)
+            ])
+            return {
+                'next': None,
+                'previous': None,
+                'results': RecipeSerializer(queryset, many=True).data,
+            }
+
+    def handle(self, *args, **options):
+        data = self.response_data(options['recipes'])
+        body = JSONRenderer().render(data)
+        assert FastJSONRenderer().render(data) == body
+
+        timings = {
+            'render_json': lambda: JSONRenderer().render(data),
+            'render_orjson': lambda: FastJSONRenderer().render(data),
+            'parse_json': lambda: JSONParser().parse(io.BytesIO(body)),
+            'parse_orjson': lambda: FastJSONParser().parse(io.BytesIO(body)),
+        }
+        result = {'recipes': options['recipes'], 'bytes': len(body)}
+        for name, func in timings.items():
+            result[f'{name}_ms'] = best_of(
+                func, options['repeat'], options['number']
+            ) * 1000
+        result['render_speedup'] = (
+            result['render_json_ms'] / result['render_orjson_ms']
+        )
+        result['parse_speedup'] = (
+            result['parse_json_ms'] / result['parse_orjson_ms']
+        )
+
+        self.stdout.write(
+            '{recipes} recipes, {bytes} bytes\n'
+            'render  json {render_json_ms:7.2f}ms  orjson '
+            '{render_orjson_ms:7.2f}ms  x{render_speedup:.1f}\n'
+            'parse   json {parse_json_ms:7.2f}ms  orjson '
+            '{parse_orjson_ms:7.2f}ms  x{parse_speedup:.1f}'.format(**result)
+        )
+        if options['output']:
+            write_results(options['output'], [result])
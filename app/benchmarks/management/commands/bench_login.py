@@ -0,0 +1,118 @@
+"""
+Django command measuring token endpoint throughput under contention
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from benchmarks.utils import create_bench_user, parse_sizes, write_results
+from user.views import CreateTokenView
+
+TOKEN_URL = reverse('user:token')
+PASSWORD = 'benchpass123'
+
+
+def login_worker(email, count, start, results):
+    client = APIClient()
+    start.wait()
+    try:
+        for _ in range(count):
+            began = time.perf_counter()
+            res = client.post(
+                TOKEN_URL, {'email': email, 'password': PASSWORD}
+            )
+            results.append((res.status_code, time.perf_counter() - began))
+    finally:
+        connection.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    """Log in from many threads with bounded and unbounded hashing"""
+    help = 'Benchmark logins/s, latency and 503s of the token endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', default='1,8,32')
+        parser.add_argument('--requests', type=int, default=10,
+                            help='Logins per client')
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def run_clients(self, email, clients, count):
+        start = threading.Barrier(clients + 1)
+        results = []
+        threads = [
+            threading.Thread(
+                target=login_worker, args=(email, count, start, results)
+            )
+            for _ in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - began
+
+    def benchmark(self, email, mode, clients, options):
+        password = settings.EXECUTORS['password']
+        if mode == 'unbounded':
+            # każdy wątek żądania liczy hash sam, jak bez executora
+            password = {'MAX_WORKERS': clients, 'MAX_PENDING': 0}
+        with override_settings(
+            EXECUTORS=dict(settings.EXECUTORS, password=password)
+        ):
+            results, elapsed = self.run_clients(
+                email, clients, options['requests']
+            )
+
+        latencies = sorted(
+            elapsed for status_code, elapsed in results if status_code == 200
+        )
+        return {
+            'mode': mode,
+            'clients': clients,
+            'workers': password['MAX_WORKERS'],
+            'logins_per_s': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'busy': sum(1 for code, _ in results if code == 503),
+            'errors': sum(1 for code, _ in results if code not in (200, 503)),
+        }
+
+    def handle(self, *args, **options):
+        user = create_bench_user()
+        results = []
+        try:
+            with patch.object(CreateTokenView, 'throttle_classes', ()), \
+                    override_settings(ALLOWED_HOSTS=['*']):
+                for clients in parse_sizes(options['clients']):
+                    for mode in ('unbounded', 'bounded'):
+                        result = self.benchmark(
+                            user.email, mode, clients, options
+                        )
+                        results.append(result)
+                        self.stdout.write(
+                            '{mode:9} {clients:3} clients {workers:3} '
+                            'workers  {logins_per_s:7.1f} logins/s  '
+                            'p50 {p50_ms:7.1f}ms  p99 {p99_ms:7.1f}ms  '
+                            '{busy} busy  {errors} errors'.format(**result)
+                        )
+        finally:
+            user.delete()
+
+        if options['output']:
+            write_results(options['output'], results)
@@ -0,0 +1,98 @@
+"""
+Django command comparing full-text recipe search with icontains scans
+"""
+import random
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from benchmarks.utils import Timer, create_bench_user, rollback, write_results
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+WORDS = (
+    'apple', 'basil', 'bean', 'beef', 'bread', 'broccoli', 'butter', 'cake',
+    'carrot', 'cheese', 'chicken', 'chickpea', 'chili', 'chocolate', 'curry',
+    'egg', 'garlic', 'ginger', 'honey', 'lemon', 'lentil', 'mushroom',
+    'noodle', 'onion', 'pancake', 'pasta', 'pepper', 'pork', 'potato',
+    'rice', 'salad', 'salmon', 'soup', 'spinach', 'stew', 'tofu', 'tomato',
+    'vanilla', 'walnut', 'yogurt', 'zucchini',
+)
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+class Command(BaseCommand):
+    """Seed recipes and time ranked search against icontains"""
+    help = 'Benchmark full-text recipe search (Postgres only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--terms', default='chickpea curry,lemon,tofu')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Full-text search needs Postgres')
+
+        rng = random.Random(options['seed'])
+        with rollback():
+            user = create_bench_user()
+            self.stdout.write(f'Seeding {options["recipes"]} recipes')
+            batch = 10000
+            for start in range(0, options['recipes'], batch):
+                Recipe.objects.bulk_create([
+                    Recipe(
+                        user=user,
+                        title=sentence(rng, 3),
+                        description=sentence(rng, 30),
+                        time_minutes=rng.randint(5, 120),
+                    )
+                    for _ in range(min(batch, options['recipes'] - start))
+                ])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_recipe')
+
+            viewset = RecipeViewSet()
+            owned = Recipe.objects.filter(user=user)
+            results = []
+            for terms in options['terms'].split(','):
+                icontains = Q()
+                for word in terms.split():
+                    icontains &= (
+                        Q(title__icontains=word) |
+                        Q(description__icontains=word)
+                    )
+                result = {
+                    'terms': terms,
+                    'fts_ms': self.time_query(
+                        viewset.search(owned, terms), options['repeat']
+                    ),
+                    'icontains_ms': self.time_query(
+                        owned.filter(icontains).order_by('-id'),
+                        options['repeat']
+                    ),
+                }
+                results.append(result)
+                self.stdout.write(
+                    '{terms!r:>20}  fts p50 {fts_ms:8.2f} ms  '
+                    'icontains p50 {icontains_ms:8.2f} ms'.format(**result)
+                )
+
+        if options['output']:
+            write_results(options['output'], results)
+
+    def time_query(self, queryset, repeat):
+        """Return the median time of fetching the first page of ids"""
+        timings = []
+        for _ in range(repeat):
+            with Timer() as timer:
+                list(queryset.values_list('id', flat=True)[:100])
+            timings.append(timer.elapsed * 1000)
+        return statistics.median(timings)
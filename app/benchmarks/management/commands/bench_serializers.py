@@ -0,0 +1,110 @@
+"""
+Django command comparing the recipe serializers with the row serializer
+"""
+import timeit
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+
+from benchmarks.utils import create_bench_user, rollback, write_results
+from core.models import Recipe, Tag
+from recipe.readers import TAG_ORDERING, RowSerializer
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+SERIALIZERS = {
+    'list': RecipeSerializer,
+    'detail': RecipeDetailSerializer,
+}
+
+
+def best_of(func, repeat, number):
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def create_recipes(user, count, tags_per_recipe):
+    Tag.objects.bulk_create([
+        Tag(user=user, name=f'tag-{i}') for i in range(10)
+    ])
+    Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Benchmark recipe {i}',
+            description='Opis ' * 20,
+            time_minutes=5 + i % 60,
+            price=Decimal('2.50') + i % 40 if i % 7 else None,
+            link=f'https://example.com/recipes/{i}',
+        )
+        for i in range(count)
+    ])
+    tag_ids = list(user.tag_set.values_list('pk', flat=True))
+    through = Recipe.tags.through
+    through.objects.bulk_create([
+        through(recipe_id=recipe_id, tag_id=tag_ids[(i + j) % 10])
+        for i, recipe_id in enumerate(
+            Recipe.objects.filter(user=user).values_list('pk', flat=True)
+        )
+        for j in range(tags_per_recipe)
+    ])
+
+
+class Command(BaseCommand):
+    """Time serializing a page of recipes including its queries"""
+    help = 'Microbenchmark ModelSerializer against the row serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=3,
+                            help='Tags linked to every recipe')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--number', type=int, default=5)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def benchmark(self, queryset, name, serializer_class, options):
+        row_serializer = RowSerializer(
+            serializer_class, {'tags': TAG_ORDERING}
+        )
+        instances = queryset.prefetch_related(Prefetch(
+            'tags',
+            queryset=Tag.objects.only('id', 'name').order_by(*TAG_ORDERING)
+        ))
+        rows = queryset.values(*row_serializer.columns)
+
+        def serializer():
+            return serializer_class(instances.all(), many=True).data
+
+        def rows_serializer():
+            return row_serializer.to_representation(list(rows.all()))
+
+        if serializer() != rows_serializer():
+            raise CommandError(f'{name}: row output differs')
+
+        result = {'serializer': name, 'recipes': options['recipes']}
+        for label, func in (('model', serializer), ('rows', rows_serializer)):
+            result[f'{label}_ms'] = best_of(
+                func, options['repeat'], options['number']
+            ) * 1000
+        result['speedup'] = result['model_ms'] / result['rows_ms']
+        return result
+
+    def handle(self, *args, **options):
+        results = []
+        with rollback():
+            user = create_bench_user()
+            create_recipes(user, options['recipes'], options['tags'])
+            queryset = Recipe.objects.filter(user=user).defer(
+                'search_vector'
+            ).order_by('-id')
+            for name, serializer_class in SERIALIZERS.items():
+                result = self.benchmark(
+                    queryset, name, serializer_class, options
+                )
+                results.append(result)
+                self.stdout.write(
+                    '{serializer:6} {recipes} recipes  model '
+                    '{model_ms:8.2f}ms  rows {rows_ms:8.2f}ms  '
+                    'x{speedup:.1f}'.format(**result)
+                )
+
+        if options['output']:
+            write_results(options['output'], results)
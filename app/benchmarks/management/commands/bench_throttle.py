@@ -0,0 +1,87 @@
+"""
+Django command measuring the per-request cost of the token bucket throttle
+"""
+import timeit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from benchmarks.utils import write_results
+from core.throttling import TokenBucketThrottle
+from recipe.views import RecipeViewSet
+
+STORES = {
+    'local': None,
+    'shared': 'default',
+}
+
+
+class Command(BaseCommand):
+    """Time TokenBucketThrottle.allow_request with each bucket store"""
+    help = 'Microbenchmark the token bucket throttle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000,
+                            help='Distinct client buckets to rotate through')
+        parser.add_argument('--number', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def requests(self, clients, anonymous):
+        factory = APIRequestFactory()
+        requests = []
+        for i in range(clients):
+            request = Request(factory.get(
+                '/api/recipe/recipes/',
+                REMOTE_ADDR=f'10.0.{i // 250}.{i % 250}'
+            ))
+            # użytkownik bez zapisu w bazie, liczy się tylko pk
+            request.user = AnonymousUser() if anonymous else get_user_model()(
+                pk=i + 1
+            )
+            requests.append(request)
+        return requests
+
+    def benchmark(self, store, anonymous, options):
+        requests = self.requests(options['clients'], anonymous)
+        view = RecipeViewSet()
+        throttle = TokenBucketThrottle()
+        calls = iter(range(10 ** 12))
+
+        def allow():
+            request = requests[next(calls) % len(requests)]
+            return throttle.allow_request(request, view)
+
+        with override_settings(API_THROTTLE=dict(
+            settings.API_THROTTLE, SHARED_CACHE=STORES[store],
+            RATES={'recipes.read': '1000000000/s'}
+        )):
+            best = min(timeit.repeat(
+                allow, repeat=options['repeat'], number=options['number']
+            ))
+        return {
+            'store': store,
+            'client': 'ip' if anonymous else 'user',
+            'clients': options['clients'],
+            'us_per_request': best / options['number'] * 10 ** 6,
+        }
+
+    def handle(self, *args, **options):
+        results = []
+        for store in STORES:
+            for anonymous in (False, True):
+                result = self.benchmark(store, anonymous, options)
+                results.append(result)
+                self.stdout.write(
+                    '{store:6} {clients} {client} clients  '
+                    '{us_per_request:6.2f}us/request'.format(**result)
+                )
+
+        if options['output']:
+            write_results(options['output'], results)
@@ -0,0 +1,132 @@
+"""
+Django command load testing the recipe API over HTTP
+"""
+import json
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+
+from benchmarks import loadtest
+from benchmarks.utils import parse_sizes, write_results
+from user.views import CreateTokenView
+
+
+class Command(BaseCommand):
+    """Seed a dataset and drive the API with concurrent HTTP clients"""
+    help = (
+        'Load test the recipe, tag and token endpoints and report req/s, '
+        'latency percentiles and queries per request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios', default=','.join(loadtest.SCENARIOS),
+            help='Comma separated, one of: {}'.format(
+                ', '.join(loadtest.SCENARIOS)
+            )
+        )
+        parser.add_argument('--concurrency', default='1,8,32')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Requests per worker')
+        parser.add_argument('--token-requests', type=int, default=5,
+                            help='Requests per worker of the token scenario')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=200,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=10,
+                            help='Tags per user')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Disable the recipe API response cache')
+        parser.add_argument(
+            '--url', help='Test a running server instead of one started '
+                          'in this process. Queries are not counted then.'
+        )
+        parser.add_argument('--output', help='Write results as JSON')
+        parser.add_argument('--baseline',
+                            help='Fail on regressions against this JSON')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Allowed drop of req/s and growth of p95 (fraction)'
+        )
+
+    def get_scenarios(self, value):
+        scenarios = [name for name in value.split(',') if name]
+        unknown = set(scenarios).difference(loadtest.SCENARIOS)
+        if unknown:
+            raise CommandError(
+                f'Unknown scenarios: {", ".join(sorted(unknown))}'
+            )
+        return scenarios
+
+    def serve(self, stack, options):
+        """Return the URL to test, starting a server when none is given"""
+        if options['url']:
+            return options['url']
+
+        overrides = {
+            'ALLOWED_HOSTS': ['*'],
+            'API_THROTTLE': dict(settings.API_THROTTLE, ENABLED=False),
+        }
+        if options['no_cache']:
+            overrides['RECIPE_API_CACHE'] = dict(
+                settings.RECIPE_API_CACHE, ENABLED=False
+            )
+        stack.enter_context(override_settings(**overrides))
+        stack.enter_context(
+            patch.object(CreateTokenView, 'throttle_classes', ())
+        )
+        return stack.enter_context(loadtest.LiveServer()).url
+
+    def handle(self, *args, **options):
+        scenarios = self.get_scenarios(options['scenarios'])
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        if connection.vendor != 'postgresql':
+            self.stderr.write(
+                f'Testing against {connection.vendor}, results will not '
+                'match a Postgres deployment'
+            )
+
+        loadtest.delete_dataset()
+        clients = loadtest.seed_dataset(
+            options['users'], options['recipes'], options['tags'],
+            seed=options['seed']
+        )
+        results = []
+        try:
+            with ExitStack() as stack:
+                url = self.serve(stack, options)
+                for scenario in scenarios:
+                    requests = options[
+                        'token_requests' if scenario == 'token' else 'requests'
+                    ]
+                    for concurrency in parse_sizes(options['concurrency']):
+                        result = loadtest.run_scenario(
+                            url, scenario, clients, concurrency, requests,
+                            seed=options['seed']
+                        )
+                        results.append(result)
+                        self.stdout.write(loadtest.format_result(result))
+        finally:
+            loadtest.delete_dataset()
+
+        if options['output']:
+            write_results(options['output'], results)
+
+        if baseline is not None:
+            regressions = loadtest.compare(
+                results, baseline, options['threshold']
+            )
+            if regressions:
+                raise CommandError(
+                    'Regressions against the baseline:\n' +
+                    '\n'.join(regressions)
+                )
+            self.stdout.write('No regressions against the baseline')
@@ -0,0 +1,60 @@
+"""
+Smoke tests for the benchmark commands
+"""
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def test_bench_bulk_recipes(self):
+        out = StringIO()
+
+        call_command('bench_bulk_recipes', sizes='3', stdout=out)
+
+        self.assertIn('bulk', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    @override_settings(API_THROTTLE=dict(settings.API_THROTTLE, RATES=dict(
+        settings.API_THROTTLE['RATES'], **{'recipes.write': '1/min'}
+    )))
+    def test_bench_bulk_recipes_not_throttled(self):
+        out = StringIO()
+
+        call_command('bench_bulk_recipes', sizes='3', stdout=out)
+
+        self.assertIn('bulk', out.getvalue())
+
+    def test_bench_json(self):
+        out = StringIO()
+
+        call_command(
+            'bench_json', recipes=5, repeat=1, number=1, stdout=out
+        )
+
+        self.assertIn('orjson', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_serializers(self):
+        out = StringIO()
+
+        call_command(
+            'bench_serializers', recipes=5, repeat=1, number=1, stdout=out
+        )
+
+        self.assertIn('rows', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bench_throttle(self):
+        out = StringIO()
+
+        call_command(
+            'bench_throttle', clients=3, number=10, repeat=1, stdout=out
+        )
+
+        self.assertIn('us/request', out.getvalue())
@@ -0,0 +1,101 @@
+"""
+Tests for the load test dataset and baseline comparison
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase
+
+from rest_framework.authtoken.models import Token
+
+from benchmarks import loadtest
+from core.models import Recipe, Tag
+
+
+def result(scenario='recipes', concurrency=8, **values):
+    return dict({
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'requests': 100,
+        'errors': 0,
+        'requests_per_second': 100.0,
+        'p50_ms': 5.0,
+        'p95_ms': 10.0,
+        'p99_ms': 20.0,
+        'queries_per_request': 2.0,
+    }, **values)
+
+
+class CompareTests(SimpleTestCase):
+
+    def test_within_threshold_passes(self):
+        regressions = loadtest.compare(
+            [result(requests_per_second=91.0, p95_ms=10.9)],
+            [result()], 0.1
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_regressions_reported(self):
+        regressions = loadtest.compare(
+            [result(
+                requests_per_second=80.0, p95_ms=12.0,
+                queries_per_request=3.0, errors=1
+            )],
+            [result()], 0.1
+        )
+
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(all(
+            line.startswith('recipes x8: ') for line in regressions
+        ))
+
+    def test_unmatched_and_uncounted_results_skipped(self):
+        regressions = loadtest.compare(
+            [
+                result(concurrency=32, requests_per_second=1.0),
+                result(queries_per_request=None),
+            ],
+            [result()], 0.1
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_format_result(self):
+        line = loadtest.format_result(result(queries_per_request=None))
+
+        self.assertIn('100.0 req/s', line)
+        self.assertIn('? queries', line)
+
+
+class SeedDatasetTests(TestCase):
+
+    def test_seed_dataset(self):
+        clients = loadtest.seed_dataset(3, 4, 5, seed=1)
+
+        self.assertEqual(len(clients), 3)
+        self.assertEqual(Recipe.objects.count(), 12)
+        for client in clients:
+            user = get_user_model().objects.get(email=client.email)
+            self.assertTrue(user.check_password(loadtest.PASSWORD))
+            self.assertEqual(Token.objects.get(user=user).key, client.token)
+            self.assertEqual(len(client.recipe_ids), 4)
+            self.assertEqual(len(client.tag_ids), 5)
+            self.assertEqual(user.stats.recipe_count, 4)
+        for tag in Tag.objects.annotate(links=Count('recipe')):
+            self.assertEqual(tag.recipe_count, tag.links)
+
+        loadtest.delete_dataset()
+
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_seed_is_reproducible(self):
+        def titles():
+            loadtest.seed_dataset(2, 3, 2, seed=7)
+            values = list(Recipe.objects.order_by('id').values_list(
+                'title', 'time_minutes', 'price'
+            ))
+            loadtest.delete_dataset()
+            return values
+
+        self.assertEqual(titles(), titles())
@@ -0,0 +1,75 @@
+"""
+Helpers shared by the benchmark commands
+"""
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+@contextmanager
+def rollback():
+    """Run the block in a transaction that is always rolled back"""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+class Timer:
+    """Measure wall time of a block"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def create_bench_user(email='bench@example.com'):
+    return get_user_model().objects.create_user(
+        email=email, password='benchpass123', name='Benchmark'
+    )
+
+
+@contextmanager
+def token_client(user):
+    """Yield an API client authenticated with a real token
+
+    Rate limits are off, otherwise longer runs would time 429 responses.
+    """
+    token, _ = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    with override_settings(
+        ALLOWED_HOSTS=['*'],
+        API_THROTTLE=dict(settings.API_THROTTLE, ENABLED=False),
+    ):
+        yield client
+
+
+def check_statuses(statuses, expected):
+    """Raise CommandError unless every response had the expected status"""
+    unexpected = Counter(code for code in statuses if code != expected)
+    if unexpected:
+        raise CommandError('Unexpected responses: {}'.format(', '.join(
+            f'{count}x {code}' for code, count in sorted(unexpected.items())
+        )))
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',') if size]
+
+
+def write_results(path, results):
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
@@ -0,0 +1,189 @@
+"""
+Token authentication backed by an in-process LRU cache
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Bounded LRU of token key -> token with an optional shared tier
+
+    Entries expire after `ttl` seconds. When `shared_cache` names a Django
+    cache alias, misses of the local LRU are looked up there before falling
+    back to the database, so workers can share authenticated tokens.
+    Invalidation leaves a timestamp in the shared tier, checked on local
+    hits, so a token dropped by one worker is not served by the others.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, shared_cache=None,
+                 key_prefix='auth-token'):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared_cache = shared_cache
+        self.key_prefix = key_prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls):
+        options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+        shared_cache = options.get('SHARED_CACHE')
+        max_size = options.get('MAX_SIZE', 10000)
+        processes = getattr(settings, 'WEB_CONCURRENCY', 1)
+        if shared_cache is None and processes > 1:
+            # unieważnienie w jednym procesie nie dotarłoby do pozostałych
+            max_size = 0
+        return cls(
+            max_size=max_size,
+            ttl=options.get('TTL', 300),
+            shared_cache=shared_cache,
+        )
+
+    @property
+    def shared(self):
+        if self.shared_cache is None:
+            return None
+        return caches[self.shared_cache]
+
+    def _shared_key(self, key):
+        return f'{self.key_prefix}:{key}'
+
+    def _revoked_key(self, key):
+        return f'{self.key_prefix}:revoked:{key}'
+
+    def _store_local(self, key, token, now, stored_at):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (token, now + self.ttl, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached token for the key or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                entry = None
+
+        shared = self.shared
+        if entry is not None:
+            revoked = None
+            if shared is not None:
+                revoked = shared.get(self._revoked_key(key))
+            with self._lock:
+                if revoked is None or revoked < entry[2]:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._entries.pop(key, None)
+
+        if shared is not None:
+            shared_key = self._shared_key(key)
+            revoked_key = self._revoked_key(key)
+            found = shared.get_many([shared_key, revoked_key])
+            if shared_key in found:
+                token, stored_at = found[shared_key]
+                revoked = found.get(revoked_key)
+                if revoked is None or revoked < stored_at:
+                    self._store_local(key, token, now, stored_at)
+                    with self._lock:
+                        self.shared_hits += 1
+                    return token
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, token):
+        # czas ścienny, bo porównywany z unieważnieniami z innych procesów
+        stored_at = time.time()
+        self._store_local(key, token, time.monotonic(), stored_at)
+        shared = self.shared
+        if shared is not None:
+            shared.set(
+                self._shared_key(key), (token, stored_at), timeout=self.ttl
+            )
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        shared = self.shared
+        if shared is not None and keys:
+            revoked_at = time.time()
+            shared.delete_many([self._shared_key(key) for key in keys])
+            # wpisy starsze od tej chwili są nieważne także w lokalnych LRU
+            # pozostałych procesów, do końca ich ttl
+            shared.set_many(
+                {self._revoked_key(key): revoked_at for key in keys},
+                timeout=self.ttl
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the LRU"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
+
+
+token_cache = TokenCache.from_settings()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in TokenAuthentication that skips the DB for cached tokens"""
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        cached = self.cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            self.cache.set(key, token)
+            return (user, token)
+
+        # kopia, żeby zmiany w request.user nie trafiały do cache
+        token = copy.copy(cached)
+        token.user = copy.copy(cached.user)
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop tokens of a user whose password or active flag may have changed"""
+    if created:
+        return
+    keys = Token.objects.filter(user_id=instance.pk).values_list(
+        'key', flat=True
+    )
+    token_cache.invalidate(*keys)
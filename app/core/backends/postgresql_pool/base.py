@@ -0,0 +1,124 @@
+"""
+PostgreSQL backend that reuses connections from a bounded pool
+
+Configure it with ENGINE 'core.backends.postgresql_pool' and an optional
+POOL dict in the database settings:
+
+    'POOL': {
+        'MIN_SIZE': 0,         # connections opened with the first checkout
+        'MAX_SIZE': 10,        # checkouts wait while this many are in use
+        'TIMEOUT': 10,         # seconds to wait before raising
+        'MAX_LIFETIME': 1800,  # seconds before a connection is replaced
+        'CHECK_AFTER': 5,      # idle seconds before SELECT 1 on checkout
+    }
+
+Django closes the connection at the end of every request when
+CONN_MAX_AGE is 0; this backend returns it to the pool instead.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+
+from core.backends.postgresql_pool.creation import DatabaseCreation
+from core.backends.postgresql_pool.pool import ConnectionPool
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Database.OperationalError):
+    """Django re-raises it as django.db.OperationalError"""
+
+
+def _check(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+def get_pool(wrapper, conn_params):
+    key = (wrapper.alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool.from_options(
+                lambda: Database.connect(**conn_params),
+                _check,
+                wrapper.settings_dict.get('POOL', {}),
+                timeout_error=PoolTimeout,
+            )
+            pool.database = conn_params.get('database')
+            fill = True
+        else:
+            fill = False
+    if fill:
+        pool.fill()
+    return pool
+
+
+def close_pools(database=None):
+    """Close the pools of a database name, or all pools"""
+    with _pools_lock:
+        for key, pool in list(_pools.items()):
+            if database is None or pool.database == database:
+                pool.close()
+                del _pools[key]
+
+
+def get_pool_stats():
+    """Return {alias: stats} summed over the pools of every alias"""
+    with _pools_lock:
+        pools = list(_pools.items())
+    totals = {}
+    for (alias, _), pool in pools:
+        stats = pool.stats()
+        total = totals.setdefault(alias, dict.fromkeys(stats, 0))
+        for name, value in stats.items():
+            total[name] = (max(total[name], value)
+                           if name == 'wait_seconds_max'
+                           else total[name] + value)
+    for total in totals.values():
+        total['saturation'] = total['in_use'] / total['max_size']
+    return totals
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self, conn_params)
+        connection = self.pool.getconn()
+
+        # jak w klasie bazowej, poziom izolacji trzeba odczytać przed
+        # włączeniem autocommit
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        base.psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        """Return the connection to the pool instead of closing it"""
+        if self.connection is None:
+            return
+        connection = self.connection
+        discard = False
+        try:
+            status = connection.info.transaction_status
+            if status != base.psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Database.Error:
+            discard = True
+        self.pool.putconn(connection, discard=discard)
@@ -0,0 +1,22 @@
+from django.db.backends.postgresql.creation import (
+    DatabaseCreation as BaseDatabaseCreation,
+)
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    """Close pooled connections before a test database is dropped"""
+
+    def _close_pools(self, database):
+        from core.backends.postgresql_pool.base import close_pools
+
+        close_pools(database)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        # CREATE DATABASE ... TEMPLATE wymaga braku połączeń do szablonu
+        self.connection.close()
+        self._close_pools(self.connection.settings_dict['NAME'])
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self._close_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,191 @@
+"""
+Thread-safe bounded pool of DB-API connections
+"""
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Keep between `min_size` and `max_size` open connections
+
+    `connect` opens a new connection and `check` returns whether an idle
+    connection still works. Connections older than `max_lifetime` seconds
+    are replaced on checkout and on return, and connections that were idle
+    longer than `check_after` seconds are checked before being handed out.
+    """
+
+    def __init__(self, connect, check, min_size=0, max_size=10,
+                 max_lifetime=1800, timeout=10, check_after=5,
+                 timeout_error=PoolTimeout):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min <= max >= 1')
+        self.connect = connect
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check_after = check_after
+        self.timeout_error = timeout_error
+        self._idle = deque()
+        self._born = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._closed = False
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'created': 0,
+            'discarded': 0,
+            'failed_checks': 0,
+        }
+
+    @classmethod
+    def from_options(cls, connect, check, options, **kwargs):
+        return cls(
+            connect,
+            check,
+            min_size=options.get('MIN_SIZE', 0),
+            max_size=options.get('MAX_SIZE', 10),
+            max_lifetime=options.get('MAX_LIFETIME', 1800),
+            timeout=options.get('TIMEOUT', 10),
+            check_after=options.get('CHECK_AFTER', 5),
+            **kwargs
+        )
+
+    def _expired(self, conn, now):
+        return (self.max_lifetime is not None
+                and now - self._born[id(conn)] >= self.max_lifetime)
+
+    def _discard(self, conn):
+        """Close a connection that no longer counts towards the size"""
+        self._born.pop(id(conn), None)
+        self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _open(self):
+        """Open a connection for a slot that the caller already reserved"""
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._born[id(conn)] = time.monotonic()
+            self._stats['created'] += 1
+        return conn
+
+    def fill(self):
+        """Open connections until the pool holds `min_size` of them"""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+
+    def getconn(self):
+        """Check out a working connection, waiting up to `timeout` seconds"""
+        started = time.monotonic()
+        deadline = None if self.timeout is None else started + self.timeout
+        waited = False
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise self.timeout_error('Connection pool is closed')
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = idle_since = None
+                    break
+                waited = True
+                remaining = None if deadline is None else (
+                    deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise self.timeout_error(
+                        f'No connection available within {self.timeout}s '
+                        f'({self.max_size} in use)'
+                    )
+                self._available.wait(remaining)
+
+            wait = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['waits'] += waited
+            self._stats['wait_seconds_total'] += wait
+            self._stats['wait_seconds_max'] = max(
+                self._stats['wait_seconds_max'], wait
+            )
+
+        if conn is None:
+            return self._open()
+        return self._validated(conn, idle_since)
+
+    def _validated(self, conn, idle_since):
+        now = time.monotonic()
+        stale = self._expired(conn, now) or getattr(conn, 'closed', False)
+        if not stale and (self.check_after is not None
+                          and now - idle_since >= self.check_after):
+            stale = not self.check(conn)
+            if stale:
+                with self._lock:
+                    self._stats['failed_checks'] += 1
+        if not stale:
+            return conn
+
+        # slot zostaje zarezerwowany dla nowego połączenia
+        with self._lock:
+            self._discard(conn)
+        return self._open()
+
+    def putconn(self, conn, discard=False):
+        """Return a checked out connection, closing it if it is unusable"""
+        with self._lock:
+            if (discard or self._closed or getattr(conn, 'closed', False)
+                    or self._expired(conn, time.monotonic())):
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+    def close(self):
+        """Close idle connections and refuse new checkouts"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.popleft()[0])
+                self._size -= 1
+            self._available.notify_all()
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+            return dict(
+                self._stats,
+                size=self._size,
+                idle=idle,
+                in_use=self._size - idle,
+                max_size=self.max_size,
+                saturation=(self._size - idle) / self.max_size,
+            )
@@ -0,0 +1,23 @@
+"""
+API exceptions and the REST framework exception handler
+"""
+from rest_framework import status, views
+from rest_framework.exceptions import APIException
+
+from core.executors import ExecutorBusy
+
+
+class ServiceBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy, try again later.'
+    default_code = 'service_busy'
+
+
+def exception_handler(exc, context):
+    """Default handler that also answers ExecutorBusy with 503"""
+    if isinstance(exc, ExecutorBusy):
+        exc = ServiceBusy()
+    response = views.exception_handler(exc, context)
+    if isinstance(exc, ServiceBusy):
+        response['Retry-After'] = '1'
+    return response
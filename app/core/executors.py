@@ -0,0 +1,120 @@
+"""
+Bounded thread pools for blocking work started from async code
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class ExecutorBusy(Exception):
+    """All workers are busy and the queue of pending calls is full"""
+
+
+class BoundedExecutor:
+    """Run at most `max_workers` calls at once and queue `max_pending` more
+
+    Calls beyond that are rejected right away with ExecutorBusy instead of
+    piling up in an unbounded queue.
+    """
+
+    def __init__(self, max_workers, max_pending=0, name='executor'):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix=name
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._rejected = 0
+
+    @classmethod
+    def from_options(cls, name, options):
+        return cls(
+            options.get('MAX_WORKERS', 4),
+            options.get('MAX_PENDING', 0),
+            name=name,
+        )
+
+    def _release(self, future):
+        with self._lock:
+            self._queued -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorBusy(
+                f'{self.max_workers} workers busy and '
+                f'{self.max_pending} calls pending'
+            )
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Await `fn(*args, **kwargs)` running in a worker thread
+
+        Like asyncio.to_thread, the call sees the caller's context
+        variables, e.g. the profile of the current request.
+        """
+        context = contextvars.copy_context()
+        return await asyncio.wrap_future(
+            self.submit(context.run, fn, *args, **kwargs)
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'in_flight': self._queued,
+                'rejected': self._rejected,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name):
+    """Return the executor configured in settings.EXECUTORS[name]"""
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = BoundedExecutor.from_options(
+                name, settings.EXECUTORS[name]
+            )
+        return executor
+
+
+def executor_stats():
+    """Return {name: stats} of the executors started in this process"""
+    with _executors_lock:
+        executors = list(_executors.items())
+    return {name: executor.stats() for name, executor in executors}
+
+
+@receiver(setting_changed)
+def reset_executors(setting, **kwargs):
+    if setting == 'EXECUTORS':
+        with _executors_lock:
+            executors = list(_executors.values())
+            _executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=False)
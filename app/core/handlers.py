@@ -0,0 +1,53 @@
+"""
+ASGI handler that iterates streaming responses outside of the event loop
+"""
+from asgiref.sync import sync_to_async
+
+import django
+from django.core.handlers import asgi
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Fetch every part of a streaming response in a worker thread
+
+    Django 3.2 iterates StreamingHttpResponse content in the event loop,
+    where generators reading the database (recipe export and import)
+    raise SynchronousOnlyOperation. Parts are fetched in the thread Django
+    runs sync views in, so they use the same database connection.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        parts = iter(response)
+        # Django wysyła nagłówki, pustą treść i zamknięcie; części
+        # wysyłamy tuż przed zamknięciem
+        response.streaming_content = ()
+
+        async def send_parts_before_end(message):
+            if (message['type'] == 'http.response.body'
+                    and not message.get('more_body')):
+                await self.send_parts(parts, send)
+            await send(message)
+
+        await super().send_response(response, send_parts_before_end)
+
+    async def send_parts(self, parts, send):
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await next_part(parts, None)
+            if part is None:
+                return
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+
+
+def get_asgi_application():
+    """Like django.core.asgi.get_asgi_application with the handler above"""
+    django.setup(set_prefix=False)
+    return ASGIHandler()
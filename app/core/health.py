@@ -0,0 +1,61 @@
+"""
+Database ping shared by wait_for_db and the health endpoints
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import Error
+
+
+def get_options():
+    return getattr(settings, 'HEALTH_CHECK', {})
+
+
+def ping_database(alias=DEFAULT_DB_ALIAS):
+    """Connect to the database if needed and run SELECT 1
+
+    Raises the backend's error when the database is not available.
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class CachedPing:
+    """Result of ping_database reused for CACHE_SECONDS
+
+    Concurrent callers wait for a single ping instead of each running
+    their own, so probes add at most one query per period.
+    """
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._available = False
+
+    def _fresh(self, now):
+        return self._checked_at is not None and (
+            now - self._checked_at < get_options().get('CACHE_SECONDS', 2)
+        )
+
+    def available(self):
+        if self._fresh(time.monotonic()):
+            return self._available
+        with self._lock:
+            if not self._fresh(time.monotonic()):
+                try:
+                    ping_database(self.alias)
+                    self._available = True
+                except Error:
+                    self._available = False
+                self._checked_at = time.monotonic()
+            return self._available
+
+    def clear(self):
+        with self._lock:
+            self._checked_at = None
+
+
+database_ping = CachedPing()
@@ -0,0 +1,266 @@
+"""
+Sampled per-request profile of queries, DB time and serializer time
+"""
+import heapq
+import logging
+import random
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from rest_framework import serializers
+
+from core.middleware import RequestHooksMiddleware
+
+logger = logging.getLogger('core.instrumentation')
+# wolne żądania i powtarzane zapytania (N+1)
+problem_logger = logging.getLogger('core.instrumentation.problems')
+
+SERVER_TIMING_HEADER = 'Server-Timing'
+MAX_SQL_LENGTH = 500
+
+current_profile = ContextVar('current_profile', default=None)
+# licznik zapytań żądania dla core.metrics
+current_query_count = ContextVar('current_query_count', default=None)
+
+
+def get_options():
+    return getattr(settings, 'REQUEST_PROFILE', {})
+
+
+class RequestProfile:
+    """Queries and named phase timings of one request
+
+    Records every query run while it is the current profile, including
+    queries of executor threads that run with the request's context
+    (async views).
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.phases = defaultdict(float)
+        self.open_phases = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    def slowest(self, count):
+        """Return the `count` slowest (sql, seconds) pairs"""
+        return heapq.nlargest(count, self.queries, key=lambda query: query[1])
+
+    def duplicates(self, threshold):
+        """Return (sql, times) of statements run at least `threshold` times
+
+        Parameters are not part of the SQL, so the same query run for
+        every row of a list (N+1) shows up as one statement.
+        """
+        if len(self.queries) < threshold:
+            return []
+        counts = Counter(sql for sql, _ in self.queries)
+        return [
+            (sql, times) for sql, times in counts.most_common()
+            if times >= threshold
+        ]
+
+
+class QueryCount:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+
+def observe_query(execute, sql, params, many, context):
+    """Count the query for the metrics and record it in the profile"""
+    count = current_query_count.get()
+    if count is not None:
+        count.value += 1
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_observer(sender, connection, **kwargs):
+    """Observe the queries of every connection for the current request
+
+    Executor threads run with the request's context, so the queries of
+    async views are attributed to their request as well.
+    """
+    if observe_query not in connection.execute_wrappers:
+        # na początek, execute_wrapper() zdejmuje ostatni wrapper z listy
+        connection.execute_wrappers.insert(0, observe_query)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to a phase of the current profile
+
+    Does nothing outside of a profiled request. Nested blocks of the same
+    phase are counted once.
+    """
+    profile = current_profile.get()
+    if profile is None or name in profile.open_phases:
+        yield
+        return
+    profile.open_phases.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[name] += time.perf_counter() - start
+        profile.open_phases.discard(name)
+
+
+class TimedSerializerMixin:
+    """Count building `.data` as the serialize phase of the request"""
+
+    @property
+    def data(self):
+        with phase('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 2)
+
+
+def server_timing(profile, total):
+    parts = [
+        'db;dur={};desc="{} queries"'.format(
+            milliseconds(profile.db_time), len(profile.queries)
+        ),
+    ]
+    parts.extend(
+        f'{name};dur={milliseconds(seconds)}'
+        for name, seconds in profile.phases.items()
+    )
+    parts.append(f'total;dur={milliseconds(total)}')
+    return ', '.join(parts)
+
+
+def request_summary(request, response, total):
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'method': request.method,
+        'path': request.path,
+        'view': match.view_name if match else None,
+        'status': response.status_code,
+        'total_ms': milliseconds(total),
+    }
+
+
+def format_fields(fields):
+    return ' '.join(f'{key}={value}' for key, value in fields.items())
+
+
+class RequestProfileMiddleware(RequestHooksMiddleware):
+    """Profile a sample of requests and log slow ones and N+1 patterns
+
+    Sampled requests get a Server-Timing header and a log line with their
+    query count, DB time and phase timings; the rest only pay for two
+    clock reads, so slow requests are still reported. Structured fields
+    are passed to handlers as the `profile` attribute of the log record.
+    """
+
+    def start(self, request):
+        options = get_options()
+        if not options.get('ENABLED', True):
+            return None
+        profile = token = None
+        if random.random() < options.get('SAMPLE_RATE', 0.05):
+            profile = RequestProfile()
+            token = current_profile.set(profile)
+        return (options, profile, token, time.perf_counter())
+
+    def finish(self, request, response, state):
+        options, profile, token, start = state
+        total = time.perf_counter() - start
+        if token is not None:
+            current_profile.reset(token)
+        if response is None:
+            return None
+        if profile is None:
+            self.check_slow(request, response, total, options)
+            return response
+
+        if options.get('SERVER_TIMING', True):
+            response[SERVER_TIMING_HEADER] = server_timing(profile, total)
+        self.report(request, response, profile, total, options)
+        return response
+
+    def check_slow(self, request, response, total, options, profile=None):
+        if total * 1000 < options.get('SLOW_REQUEST_MS', 500):
+            return
+        fields = request_summary(request, response, total)
+        slowest = ''
+        if profile is not None:
+            fields['queries'] = len(profile.queries)
+            fields['db_ms'] = milliseconds(profile.db_time)
+            fields['slowest'] = [
+                {'sql': sql[:MAX_SQL_LENGTH], 'ms': milliseconds(seconds)}
+                for sql, seconds in profile.slowest(
+                    options.get('SLOWEST_QUERIES', 3)
+                )
+            ]
+            slowest = ''.join(
+                '\n  {ms}ms {sql}'.format(**query)
+                for query in fields['slowest']
+            )
+        problem_logger.warning(
+            'slow request %s%s', format_fields({
+                key: value for key, value in fields.items()
+                if key != 'slowest'
+            }), slowest,
+            extra={'profile': fields}
+        )
+
+    def report(self, request, response, profile, total, options):
+        if logger.isEnabledFor(logging.INFO):
+            fields = request_summary(request, response, total)
+            fields['queries'] = len(profile.queries)
+            fields['db_ms'] = milliseconds(profile.db_time)
+            for name, seconds in profile.phases.items():
+                fields[f'{name}_ms'] = milliseconds(seconds)
+            logger.info(
+                'request %s', format_fields(fields), extra={'profile': fields}
+            )
+
+        self.check_slow(request, response, total, options, profile)
+
+        duplicates = profile.duplicates(
+            options.get('DUPLICATE_QUERIES', 5)
+        )
+        if duplicates:
+            problem_fields = dict(
+                request_summary(request, response, total),
+                duplicates=[
+                    {'sql': sql[:MAX_SQL_LENGTH], 'times': times}
+                    for sql, times in duplicates
+                ],
+            )
+            problem_logger.warning(
+                'repeated queries (possible N+1) %s %s: %s',
+                request.method, request.path, '; '.join(
+                    f'{times}x {sql[:MAX_SQL_LENGTH]}'
+                    for sql, times in duplicates
+                ),
+                extra={'profile': problem_fields}
+            )
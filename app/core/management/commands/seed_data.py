@@ -0,0 +1,85 @@
+"""
+Django command filling the database with synthetic users and recipes
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.seeding import Seeder
+
+
+class Command(BaseCommand):
+    """Bulk load reproducible users, tags and recipes"""
+    help = (
+        'Generate users with a Zipf distributed number of recipes and tags '
+        'from a shared vocabulary, using COPY on Postgres'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Average recipes per user')
+        parser.add_argument('--tags', type=int, default=15,
+                            help='Tags per user')
+        parser.add_argument('--vocabulary', type=int, default=200,
+                            help='Distinct tag names shared by all users')
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Zipf exponent of recipes per user and tag popularity'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help='Users get <prefix>-<n>@example.com emails')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Users generated between writes')
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Rows per COPY or INSERT')
+
+    def handle(self, *args, **options):
+        for name in ('users', 'chunk_size', 'batch_size', 'vocabulary'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be > 0')
+        if min(options['recipes'], options['tags']) < 0:
+            raise CommandError('--recipes and --tags can not be negative')
+        if get_user_model().objects.filter(
+            email__startswith=f'{options["prefix"]}-'
+        ).exists():
+            raise CommandError(
+                f'Users with the {options["prefix"]!r} prefix already exist, '
+                'use another --prefix'
+            )
+
+        seeder = Seeder(
+            options['users'], options['recipes'],
+            tags_per_user=options['tags'],
+            vocabulary=options['vocabulary'], skew=options['skew'],
+            seed=options['seed'], prefix=options['prefix'],
+            password=options['password'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+        start = time.perf_counter()
+
+        def progress(totals):
+            if options['verbosity'] > 1:
+                self.stdout.write('{} users, {} recipes, {:.1f}s'.format(
+                    totals['users'], totals['recipes'],
+                    time.perf_counter() - start
+                ))
+
+        with transaction.atomic():
+            totals = seeder.run(progress)
+        elapsed = time.perf_counter() - start
+
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            '{users} users, {tags} tags, {recipes} recipes, {links} recipe '
+            'tags written'.format(**totals)
+        ))
+        self.stdout.write('{:.1f}s, {:.0f} rows/s ({})'.format(
+            elapsed, rows / elapsed if elapsed else 0,
+            'COPY' if connection.vendor == 'postgresql' else 'bulk insert'
+        ))
@@ -1,29 +1,74 @@
 """
 Django command to wait for DB to be avaialble
 """
+import random
 import time
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+
+from core.health import ping_database
 
 
 class Command(BaseCommand):
     """Django command to wait for database"""
+    help = (
+        'Wait until the database accepts connections, retrying with '
+        'exponential backoff and jitter'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Give up after this many seconds')
+        parser.add_argument('--min-delay', type=float, default=0.05,
+                            help='Delay after the first failed attempt')
+        parser.add_argument('--max-delay', type=float, default=2,
+                            help='Longest delay between attempts')
+
+    def ping(self, database):
+        # samo połączenie i SELECT 1 zamiast wszystkich system checks
+        ping_database(database)
+
+    def delay(self, attempt, options):
+        """Backoff doubling per attempt, randomized to its upper half"""
+        delay = min(
+            options['max_delay'], options['min_delay'] * 2 ** attempt
+        )
+        return delay / 2 + random.uniform(0, delay / 2)
 
     def handle(self, *args, **options):
         """Entrypoint for command"""
         self.stdout.write('Waiting for database')
 
-        db_up = False
-        while db_up is False:
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        attempt = 0
+        while True:
             try:
-                # wbudowana metoda która sprawdza czy baza wstała
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2Error, OperationalError):
-                self.stdout.write('Database unavailabale. waiting for 3 seconds')
-                time.sleep(3)
-
-        self.stdout.write(self.style.SUCCESS('Database avaialable!'))
+                self.ping(options['database'])
+                break
+            except (Psycopg2Error, OperationalError) as error:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        'Database unavailable after {:.1f}s: {}'.format(
+                            options['timeout'], error
+                        )
+                    )
+                delay = min(self.delay(attempt, options), remaining)
+                self.stdout.write(
+                    f'Database unavailable, retrying in {delay:.2f}s'
+                )
+                time.sleep(delay)
+                attempt += 1
+        connections[options['database']].close()
+
+        self.stdout.write(self.style.SUCCESS(
+            'Database available after {} attempt(s), {:.2f}s'.format(
+                attempt + 1, time.monotonic() - start
+            )
+        ))
@@ -0,0 +1,557 @@
+"""
+Prometheus metrics kept in per-process files and summed when scraped
+"""
+import bisect
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from core.instrumentation import QueryCount, current_query_count
+from core.middleware import RequestHooksMiddleware
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+METHODS = frozenset(
+    ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+)
+FILE_PATTERN = re.compile(r'^metrics-(\d+)\.db$')
+
+# (typ, opis, liczone tylko dla żyjących procesów)
+FAMILIES = {
+    'http_requests_total': (
+        'counter', 'Requests by view action, method and status code.',
+        False,
+    ),
+    'http_request_duration_seconds': (
+        'histogram', 'Request latency by view action.', False,
+    ),
+    'http_request_db_queries_total': (
+        'counter', 'Database queries run by requests of a view action.',
+        False,
+    ),
+    'http_requests_in_flight': (
+        'gauge', 'Requests being handled.', True,
+    ),
+    'cache_requests_total': (
+        'counter', 'Lookups of a response cache by result.', False,
+    ),
+    'token_cache_requests_total': (
+        'counter', 'Token authentication cache lookups by result.', True,
+    ),
+    'token_cache_entries': (
+        'gauge', 'Tokens in the in-process authentication cache.', True,
+    ),
+    'db_pool_connections': (
+        'gauge', 'Pooled database connections by state.', True,
+    ),
+    'db_pool_max_connections': (
+        'gauge', 'Maximum size of the database connection pool.', True,
+    ),
+    'db_pool_checkouts_total': (
+        'counter', 'Connections taken from the pool.', True,
+    ),
+    'db_pool_timeouts_total': (
+        'counter', 'Pool checkouts that timed out.', True,
+    ),
+    'db_pool_wait_seconds_total': (
+        'counter', 'Time spent waiting for a pooled connection.', True,
+    ),
+    'executor_in_flight': (
+        'gauge', 'Calls running or queued on a bounded executor.', True,
+    ),
+    'executor_max_workers': (
+        'gauge', 'Worker threads of a bounded executor.', True,
+    ),
+    'executor_rejected_total': (
+        'counter', 'Calls rejected by a full bounded executor.', True,
+    ),
+    'throttle_requests_total': (
+        'counter', 'Throttle decisions by bucket and result.', True,
+    ),
+    'throttle_buckets': (
+        'gauge', 'Token buckets kept in this process.', True,
+    ),
+}
+
+HEADER = struct.Struct('<Q')
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+# rodzina, sufiks, etykiety, le
+KEY_SEPARATOR = '\x1f'
+
+
+def get_options():
+    return getattr(settings, 'METRICS', {})
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n'
+    )
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{escape(value)}"' for name, value in labels)
+
+
+def make_key(family, labels=(), suffix='', le=''):
+    return KEY_SEPARATOR.join((family, suffix, format_labels(labels), le))
+
+
+def read_entries(data):
+    """Yield (key, value) pairs stored in a MetricFile buffer"""
+    if len(data) < HEADER.size:
+        return
+    used = min(HEADER.unpack_from(data, 0)[0], len(data))
+    position = HEADER.size
+    while position + KEY_LENGTH.size <= used:
+        length = KEY_LENGTH.unpack_from(data, position)[0]
+        key_start = position + KEY_LENGTH.size
+        value_at = key_start + length
+        value_at += -value_at % VALUE.size
+        if value_at + VALUE.size > used:
+            break
+        key = bytes(data[key_start:key_start + length]).decode()
+        yield key, VALUE.unpack_from(data, value_at)[0]
+        position = value_at + VALUE.size
+
+
+class MetricFile:
+    """Float values by key in a buffer written by a single process
+
+    With a `path` the buffer is an mmap'ed file other processes can read,
+    otherwise a bytearray. Entries are appended as key length, key,
+    padding and a double, and never removed; the header holds the number
+    of bytes used, written after the entry so readers never see a partial
+    one. Values are read and written through `values`, a memoryview of
+    doubles, at the index of their key. Callers hold `lock` around every
+    call and every use of `values`.
+    """
+    initial_size = 1 << 16
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.indexes = {}
+        self._file = None
+        if path is None:
+            self.buffer = bytearray(self.initial_size)
+        else:
+            self._file = open(path, 'w+b')
+            self._file.truncate(self.initial_size)
+            self.buffer = mmap.mmap(self._file.fileno(), self.initial_size)
+        self.values = memoryview(self.buffer).cast('d')
+        self.used = HEADER.size
+        HEADER.pack_into(self.buffer, 0, self.used)
+
+    def _grow(self, needed):
+        size = len(self.buffer)
+        while size < needed:
+            size *= 2
+        # bufor nie może być powiększony, gdy istnieje jego memoryview
+        self.values.release()
+        if self._file is None:
+            self.buffer.extend(bytes(size - len(self.buffer)))
+        else:
+            self.buffer.close()
+            self._file.truncate(size)
+            self.buffer = mmap.mmap(self._file.fileno(), size)
+        self.values = memoryview(self.buffer).cast('d')
+
+    def index(self, key):
+        """Return the index of the value of `key` in `values`, adding it"""
+        index = self.indexes.get(key)
+        if index is not None:
+            return index
+        encoded = key.encode()
+        key_start = self.used + KEY_LENGTH.size
+        offset = key_start + len(encoded)
+        offset += -offset % VALUE.size
+        end = offset + VALUE.size
+        if end > len(self.buffer):
+            self._grow(end)
+        KEY_LENGTH.pack_into(self.buffer, self.used, len(encoded))
+        self.buffer[key_start:key_start + len(encoded)] = encoded
+        index = self.indexes[key] = offset // VALUE.size
+        self.values[index] = 0.0
+        self.used = end
+        HEADER.pack_into(self.buffer, 0, end)
+        return index
+
+    def items(self):
+        return list(read_entries(self.buffer))
+
+    def close(self):
+        self.values.release()
+        if self._file is not None:
+            self.buffer.close()
+            self._file.close()
+
+
+def pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def process_stats():
+    """Yield (family, labels, value) of the stats kept in this process"""
+    from core.authentication import token_cache
+    from core.backends.postgresql_pool.base import get_pool_stats
+    from core.executors import executor_stats
+    from core.throttling import bucket_store
+
+    cache_stats = token_cache.stats()
+    for result in ('hits', 'shared_hits', 'misses'):
+        yield ('token_cache_requests_total', (('result', result),),
+               cache_stats[result])
+    yield 'token_cache_entries', (), cache_stats['size']
+
+    for alias, pool in get_pool_stats().items():
+        labels = (('alias', alias),)
+        for state in ('in_use', 'idle'):
+            yield ('db_pool_connections',
+                   labels + (('state', state),), pool[state])
+        yield 'db_pool_max_connections', labels, pool['max_size']
+        yield 'db_pool_checkouts_total', labels, pool['checkouts']
+        yield 'db_pool_timeouts_total', labels, pool['timeouts']
+        yield ('db_pool_wait_seconds_total', labels,
+               pool['wait_seconds_total'])
+
+    for name, executor in executor_stats().items():
+        labels = (('executor', name),)
+        yield 'executor_in_flight', labels, executor['in_flight']
+        yield 'executor_max_workers', labels, executor['max_workers']
+        yield 'executor_rejected_total', labels, executor['rejected']
+
+    throttle_stats = bucket_store.stats()
+    for result in ('allowed', 'rejected'):
+        for bucket, count in throttle_stats[result].items():
+            yield ('throttle_requests_total',
+                   (('bucket', bucket), ('result', result)), count)
+    yield 'throttle_buckets', (), throttle_stats['size']
+
+
+class MetricStore:
+    """Metrics of this process, written to `directory` when given
+
+    Every process writes its own metrics-<pid>.db file and the scraping
+    process sums all of them. Values of live-only families (gauges and
+    in-process stats) are skipped for processes that are gone; the
+    directory should be emptied before the workers start.
+    """
+
+    def __init__(self, directory=None, buckets=DEFAULT_BUCKETS,
+                 collect_interval=5.0):
+        self.directory = directory
+        self.pid = os.getpid()
+        self.buckets = tuple(buckets)
+        self.collect_interval = collect_interval
+        self.collected_at = 0.0
+        path = None
+        previous = []
+        if directory is not None:
+            path = os.path.join(directory, f'metrics-{self.pid}.db')
+            # plik procesu o tym samym pid, który już nie żyje
+            if os.path.exists(path):
+                with open(path, 'rb') as old:
+                    previous = list(read_entries(old.read()))
+        self.file = MetricFile(path)
+        self.lock = self.file.lock
+        self._indexes = {}
+        self._requests = {}
+        with self.lock:
+            for key, value in previous:
+                family = key.split(KEY_SEPARATOR, 1)[0]
+                if not FAMILIES.get(family, (None, None, True))[2]:
+                    self.file.values[self.file.index(key)] = value
+            self.in_flight = self.file.index(
+                make_key('http_requests_in_flight')
+            )
+
+    @classmethod
+    def from_settings(cls):
+        options = get_options()
+        return cls(
+            directory=options.get('MULTIPROCESS_DIR'),
+            buckets=options.get('BUCKETS', DEFAULT_BUCKETS),
+            collect_interval=options.get('COLLECT_INTERVAL', 5.0),
+        )
+
+    def _index(self, family, labels):
+        key = (family, labels)
+        index = self._indexes.get(key)
+        if index is None:
+            with self.lock:
+                index = self.file.index(make_key(family, labels))
+            self._indexes[key] = index
+        return index
+
+    def _request_indexes(self, view, method, status):
+        labels = (('view', view),)
+        le = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        family = 'http_request_duration_seconds'
+        with self.lock:
+            index = self.file.index
+            return (
+                index(make_key('http_requests_total', labels + (
+                    ('method', method), ('status', status),
+                ))),
+                tuple(
+                    index(make_key(family, labels, '_bucket', bound))
+                    for bound in le
+                ),
+                index(make_key(family, labels, '_sum')),
+                index(make_key(family, labels, '_count')),
+                index(make_key('http_request_db_queries_total', labels)),
+            )
+
+    def increment(self, family, labels=(), amount=1):
+        index = self._index(family, labels)
+        with self.lock:
+            self.file.values[index] += amount
+
+    def request_started(self):
+        with self.lock:
+            self.file.values[self.in_flight] += 1
+
+    def request_finished(self, view, method, status, seconds, queries):
+        key = (view, method, status)
+        indexes = self._requests.get(key)
+        if indexes is None:
+            indexes = self._requests[key] = self._request_indexes(
+                view, method, status
+            )
+        total, buckets, duration_sum, duration_count, db_queries = indexes
+        bucket = buckets[bisect.bisect_left(self.buckets, seconds)]
+        with self.lock:
+            values = self.file.values
+            values[self.in_flight] -= 1
+            values[total] += 1
+            values[bucket] += 1
+            values[duration_sum] += seconds
+            values[duration_count] += 1
+            values[db_queries] += queries
+
+    def collect(self, now=None):
+        """Write the in-process stats of the pool, caches and executors"""
+        self.collected_at = time.monotonic() if now is None else now
+        updates = [
+            (self._index(family, labels), value)
+            for family, labels, value in process_stats()
+        ]
+        with self.lock:
+            values = self.file.values
+            for index, value in updates:
+                values[index] = value
+
+    def maybe_collect(self):
+        now = time.monotonic()
+        if now - self.collected_at >= self.collect_interval:
+            self.collect(now)
+
+    def entries(self):
+        """Yield (key, value) of every process sharing the directory"""
+        if self.directory is None:
+            with self.lock:
+                yield from self.file.items()
+            return
+        for name in os.listdir(self.directory):
+            match = FILE_PATTERN.match(name)
+            if match is None:
+                continue
+            alive = pid_alive(int(match.group(1)))
+            try:
+                with open(os.path.join(self.directory, name), 'rb') as data:
+                    entries = list(read_entries(data.read()))
+            except FileNotFoundError:
+                continue
+            for key, value in entries:
+                family = key.split(KEY_SEPARATOR, 1)[0]
+                if alive or not FAMILIES.get(family, (None, None, True))[2]:
+                    yield key, value
+
+    def close(self):
+        self.file.close()
+
+
+def format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+def le_order(le):
+    return math.inf if le == '+Inf' else float(le)
+
+
+def sample(name, labels, value):
+    if labels:
+        return f'{name}{{{labels}}} {format_value(value)}'
+    return f'{name} {format_value(value)}'
+
+
+def render(entries):
+    """Return summed entries in the Prometheus text format"""
+    totals = {}
+    for key, value in entries:
+        totals[key] = totals.get(key, 0.0) + value
+
+    samples = {}
+    for key, value in totals.items():
+        family, suffix, labels, le = key.split(KEY_SEPARATOR)
+        if family in FAMILIES:
+            samples.setdefault(family, {}).setdefault(labels, []).append(
+                (suffix, le, value)
+            )
+
+    lines = []
+    for family, (kind, help_text, _) in FAMILIES.items():
+        if family not in samples:
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for labels, values in sorted(samples[family].items()):
+            if kind != 'histogram':
+                lines.extend(
+                    sample(family, labels, value) for _, _, value in values
+                )
+                continue
+            cumulative = 0.0
+            prefix = f'{labels},' if labels else ''
+            for _, le, value in sorted(
+                (item for item in values if item[0] == '_bucket'),
+                key=lambda item: le_order(item[1])
+            ):
+                cumulative += value
+                lines.append(sample(
+                    f'{family}_bucket', f'{prefix}le="{le}"', cumulative
+                ))
+            for suffix in ('_sum', '_count'):
+                lines.extend(
+                    sample(family + suffix, labels, value)
+                    for item_suffix, _, value in values
+                    if item_suffix == suffix
+                )
+    return '\n'.join(lines) + '\n'
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    store = _store
+    if store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MetricStore.from_settings()
+            store = _store
+    return store
+
+
+def reset_store():
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
+
+
+@receiver(setting_changed)
+def reset_store_on_setting_change(setting, **kwargs):
+    if setting == 'METRICS':
+        reset_store()
+
+
+def _forget_store_after_fork():
+    # worker gunicorna z --preload zaczyna z własnym plikiem, plik
+    # rodzica zostaje otwarty
+    global _store, _store_lock
+    _store = None
+    _store_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_store_after_fork)
+
+
+def increment(family, labels=(), amount=1):
+    """Add to a counter of the current process"""
+    if get_options().get('ENABLED', True):
+        get_store().increment(family, labels, amount)
+
+
+_view_labels = {}
+
+
+def view_label(request):
+    """Return e.g. RecipeViewSet.list for the view that served `request`"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    key = (match.func, request.method)
+    label = _view_labels.get(key)
+    if label is None:
+        func = match.func
+        cls = getattr(func, 'cls', None)
+        method = (
+            request.method if request.method in METHODS else 'OTHER'
+        ).lower()
+        if cls is None:
+            label = f'{match.view_name or func.__name__}.{method}'
+        else:
+            actions = getattr(func, 'actions', None) or {}
+            label = f'{cls.__name__}.{actions.get(method, method)}'
+        if request.method in METHODS:
+            _view_labels[key] = label
+    return label
+
+
+class MetricsMiddleware(RequestHooksMiddleware):
+    """Record latency, status and query count of every request"""
+
+    def start(self, request):
+        if not get_options().get('ENABLED', True):
+            return None
+        store = get_store()
+        queries = QueryCount()
+        token = current_query_count.set(queries)
+        store.request_started()
+        return (store, queries, token, time.perf_counter())
+
+    def finish(self, request, response, state):
+        store, queries, token, start = state
+        elapsed = time.perf_counter() - start
+        current_query_count.reset(token)
+        store.request_finished(
+            view_label(request), self.method(request),
+            500 if response is None else response.status_code, elapsed,
+            queries.value
+        )
+        if response is not None:
+            store.maybe_collect()
+        return response
+
+    @staticmethod
+    def method(request):
+        return request.method if request.method in METHODS else 'OTHER'
@@ -0,0 +1,54 @@
+"""
+Base of the request metrics and profile middleware
+"""
+import asyncio
+
+
+class RequestHooksMiddleware:
+    """Run `start` and `finish` hooks around sync and async requests
+
+    `start(request)` returns the state of the request, or None to pass it
+    through untouched. `finish(request, response, state)` returns the
+    response; it gets None when the rest of the chain raised, and the
+    exception is re-raised afterwards. Both run in the request's context,
+    so context variables set in `start` can be reset in `finish`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Django 3.2 nie ma markcoroutinefunction
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.start(request)
+        if state is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self.finish(request, None, state)
+            raise
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        if state is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self.finish(request, None, state)
+            raise
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        raise NotImplementedError
+
+    def finish(self, request, response, state):
+        raise NotImplementedError
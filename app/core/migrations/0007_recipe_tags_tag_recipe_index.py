@@ -0,0 +1,76 @@
+# Generated by Django 3.2.25 on 2026-10-18 11:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# nazwa nadana przez Django indeksowi klucza obcego tag_id w 0005
+TAG_ID_INDEX = 'core_recipe_tags_tag_id_10c0ffea'
+
+
+class Migration(migrations.Migration):
+    """Index the recipe-tag link table from the tag side
+
+    The unique (recipe_id, tag_id) constraint already covers lookups by
+    recipe; the covering (tag_id, recipe_id) index lets tag filters resolve
+    recipe ids with an index-only scan. It also serves lookups by tag
+    alone, so the single column tag_id index is dropped. The link table
+    becomes the explicit RecipeTag model, so the state records both.
+    """
+
+    dependencies = [
+        ('core', '0006_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE INDEX core_recipetag_tag_recipe_idx '
+                    'ON core_recipe_tags (tag_id, recipe_id);',
+                    'DROP INDEX core_recipetag_tag_recipe_idx;',
+                ),
+                migrations.RunSQL(
+                    f'DROP INDEX {TAG_ID_INDEX};',
+                    f'CREATE INDEX {TAG_ID_INDEX} '
+                    'ON core_recipe_tags (tag_id);',
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='RecipeTag',
+                    fields=[
+                        ('id', models.AutoField(
+                            primary_key=True, serialize=False
+                        )),
+                        ('recipe', models.ForeignKey(
+                            on_delete=django.db.models.deletion.CASCADE,
+                            to='core.recipe'
+                        )),
+                        ('tag', models.ForeignKey(
+                            db_index=False,
+                            on_delete=django.db.models.deletion.CASCADE,
+                            to='core.tag'
+                        )),
+                    ],
+                    options={
+                        'db_table': 'core_recipe_tags',
+                        'unique_together': {('recipe', 'tag')},
+                    },
+                ),
+                migrations.AddIndex(
+                    model_name='recipetag',
+                    index=models.Index(
+                        fields=['tag', 'recipe'],
+                        name='core_recipetag_tag_recipe_idx'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='recipe',
+                    name='tags',
+                    field=models.ManyToManyField(
+                        through='core.RecipeTag', to='core.Tag'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:00
+
+from django.db import migrations, models, transaction
+
+RECIPE_INDEX = models.Index(
+    fields=['user', '-id'], name='core_recipe_user_id_desc_idx'
+)
+TAG_CONSTRAINT = models.UniqueConstraint(
+    fields=['user', 'name'], name='core_tag_user_name_uniq'
+)
+
+
+def dedupe_tags(apps, schema_editor):
+    """Merge tags with the same (user, name) into the oldest one
+
+    Every group is merged in its own short transaction, so the table is
+    never locked for long. Tags duplicated again before the unique index
+    is built make the index build fail; running the migration again
+    merges them.
+    """
+    Tag = apps.get_model('core', 'Tag')
+    through = apps.get_model('core', 'Recipe').tags.through
+    groups = list(Tag.objects.values('user_id', 'name').annotate(
+        copies=models.Count('id'), keep=models.Min('id')
+    ).filter(copies__gt=1))
+
+    for group in groups:
+        with transaction.atomic():
+            duplicate_ids = list(Tag.objects.filter(
+                user_id=group['user_id'], name=group['name']
+            ).exclude(id=group['keep']).values_list('id', flat=True))
+            recipe_ids = set(through.objects.filter(
+                tag_id__in=duplicate_ids
+            ).values_list('recipe_id', flat=True))
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, tag_id=group['keep'])
+                for recipe_id in recipe_ids
+            ], ignore_conflicts=True)
+            through.objects.filter(tag_id__in=duplicate_ids).delete()
+            Tag.objects.filter(id__in=duplicate_ids).delete()
+
+
+def add_indexes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    if schema_editor.connection.vendor != 'postgresql':
+        # add_constraint na sqlite przebudowuje tabelę z historycznego
+        # modelu, który jeszcze nie ma ograniczenia
+        schema_editor.add_index(Recipe, RECIPE_INDEX)
+        schema_editor.execute(
+            'CREATE UNIQUE INDEX core_tag_user_name_uniq '
+            'ON core_tag (user_id, name)'
+        )
+        return
+
+    # CONCURRENTLY nie blokuje zapisów podczas budowania indeksów;
+    # DROP usuwa niepoprawny indeks po przerwanej poprzedniej próbie
+    schema_editor.execute(
+        'DROP INDEX CONCURRENTLY IF EXISTS core_recipe_user_id_desc_idx'
+    )
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY core_recipe_user_id_desc_idx '
+        'ON core_recipe (user_id, id DESC)'
+    )
+    schema_editor.execute(
+        'DROP INDEX CONCURRENTLY IF EXISTS core_tag_user_name_uniq'
+    )
+    schema_editor.execute(
+        'CREATE UNIQUE INDEX CONCURRENTLY core_tag_user_name_uniq '
+        'ON core_tag (user_id, name)'
+    )
+    schema_editor.execute(
+        'ALTER TABLE core_tag ADD CONSTRAINT core_tag_user_name_uniq '
+        'UNIQUE USING INDEX core_tag_user_name_uniq'
+    )
+
+
+def remove_indexes(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('core', 'Recipe'), RECIPE_INDEX)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE core_tag DROP CONSTRAINT core_tag_user_name_uniq'
+        )
+    else:
+        schema_editor.execute('DROP INDEX core_tag_user_name_uniq')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_recipe_tags_tag_recipe_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_tags, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=RECIPE_INDEX),
+                migrations.AddConstraint(
+                    model_name='tag', constraint=TAG_CONSTRAINT
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(add_indexes, remove_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def grouped(queryset, field, aggregate):
+    """Subquery returning one aggregate of the rows of the outer user"""
+    return models.Subquery(queryset.order_by().values(field).annotate(
+        value=aggregate
+    ).values('value'))
+
+
+def backfill_stats(apps, schema_editor):
+    User = apps.get_model('core', 'User')
+    Recipe = apps.get_model('core', 'Recipe')
+    Tag = apps.get_model('core', 'Tag')
+    UserStats = apps.get_model('core', 'UserStats')
+
+    links = Recipe.tags.through.objects.filter(tag_id=models.OuterRef('pk'))
+    Tag.objects.update(recipe_count=Coalesce(
+        grouped(links, 'tag_id', models.Count('recipe_id')), 0
+    ))
+
+    UserStats.objects.bulk_create([
+        UserStats(user_id=pk) for pk in User.objects.values_list('pk', flat=True)
+    ], batch_size=1000)
+    recipes = Recipe.objects.filter(user_id=models.OuterRef('user_id'))
+    tags = Tag.objects.filter(user_id=models.OuterRef('user_id'))
+    UserStats.objects.update(
+        recipe_count=Coalesce(grouped(recipes, 'user_id', models.Count('id')), 0),
+        tag_count=Coalesce(grouped(tags, 'user_id', models.Count('id')), 0),
+        time_minutes_total=Coalesce(
+            grouped(recipes, 'user_id', models.Sum('time_minutes')), 0
+        ),
+        min_price=grouped(recipes, 'user_id', models.Min('price')),
+        max_price=grouped(recipes, 'user_id', models.Max('price')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_tag_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.PositiveIntegerField(default=0)),
+                ('tag_count', models.PositiveIntegerField(default=0)),
+                ('time_minutes_total', models.BigIntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:00
+
+from django.db import migrations
+
+BATCH_SIZE = 5000
+
+# to samo wyrażenie co w triggerze z 0006
+BACKFILL = """
+UPDATE core_recipe SET search_vector =
+    setweight(
+        to_tsvector('pg_catalog.english', coalesce(title, '')), 'A'
+    ) ||
+    setweight(
+        to_tsvector('pg_catalog.english', coalesce(description, '')), 'B'
+    )
+WHERE id >= %s AND id < %s AND search_vector IS NULL
+"""
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Fill search_vector of rows written before the trigger existed
+
+    Every batch of ids is its own short transaction, so the table is never
+    locked for the whole run and new rows (filled by the trigger) can be
+    written meanwhile.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min(id), max(id) FROM core_recipe')
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, BATCH_SIZE):
+            cursor.execute(BACKFILL, [start, start + BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_tag_recipe_count_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_search_vector, migrations.RunPython.noop
+        ),
+    ]
@@ -1,6 +1,8 @@
 """Databse models"""
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -9,6 +11,8 @@ from django.contrib.auth.models import (
 
 from django.conf import settings
 
+from core import passwords
+
 class UserManager(BaseUserManager):
     """Manager for users"""
 
@@ -47,6 +51,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        self.password = passwords.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """Verify the password on the password executor"""
+        is_correct, must_update = passwords.check_password(
+            raw_password, self.password
+        )
+        if must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=['password'])
+        return is_correct
+
 
 class Recipe(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -55,7 +74,17 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
     link = models.CharField(max_length=255, blank=True)
-    tags = models.ManyToManyField('Tag')
+    tags = models.ManyToManyField('Tag', through='RecipeTag')
+    # wypełniane przez trigger w bazie z title i description
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='core_recipe_search_gin'),
+            models.Index(
+                fields=['user', '-id'], name='core_recipe_user_id_desc_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.title
@@ -64,6 +93,60 @@ class Recipe(models.Model):
 class Tag(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
+    # utrzymywane przez sygnały z recipe.stats
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'], name='core_tag_user_name_uniq'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
+
+
+class RecipeTag(models.Model):
+    """Link between a recipe and a tag
+
+    The table Django first created for Recipe.tags, made explicit so the
+    tag_id index can be replaced by the (tag, recipe) one.
+    """
+    id = models.AutoField(primary_key=True)
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    # indeks (tag, recipe) obsługuje też wyszukiwanie po samym tagu
+    tag = models.ForeignKey('Tag', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        db_table = 'core_recipe_tags'
+        unique_together = (('recipe', 'tag'),)
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'], name='core_recipetag_tag_recipe_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Denormalized totals of a user's recipe library"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    recipe_count = models.PositiveIntegerField(default=0)
+    tag_count = models.PositiveIntegerField(default=0)
+    time_minutes_total = models.BigIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+    max_price = models.DecimalField(max_digits=5, decimal_places=2, null=True)
+
+    @property
+    def avg_time_minutes(self):
+        if not self.recipe_count:
+            return None
+        return self.time_minutes_total / self.recipe_count
+
+    def __str__(self) -> str:
+        return f'Stats of user {self.user_id}'
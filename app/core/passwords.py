@@ -0,0 +1,35 @@
+"""
+Password hashing on the bounded `password` executor
+
+PBKDF2 with the default iteration count takes tens of milliseconds of CPU.
+Running it in a separate bounded pool caps how many hashes are computed
+at once; calls beyond the queue limit raise ExecutorBusy straight away.
+"""
+from django.contrib.auth import hashers
+
+from core.executors import get_executor
+
+EXECUTOR = 'password'
+
+
+def run(fn, *args):
+    return get_executor(EXECUTOR).submit(fn, *args).result()
+
+
+def make_password(raw_password):
+    if raw_password is None:
+        return hashers.make_password(None)
+    return run(hashers.make_password, raw_password)
+
+
+def check_password(raw_password, encoded):
+    """Return if the password matches and if its hash should be upgraded
+
+    The upgrade itself is left to the caller, so nothing touches the
+    database from the executor thread.
+    """
+    upgrades = []
+    is_correct = run(
+        hashers.check_password, raw_password, encoded, upgrades.append
+    )
+    return is_correct, bool(upgrades)
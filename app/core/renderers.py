@@ -0,0 +1,49 @@
+"""
+JSON renderer backed by orjson
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+# typy, których orjson nie zna, kodowane jak w JSONRenderer
+encode_default = encoders.JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer producing the same bytes with orjson
+
+    Types orjson does not know (Decimal, lazy strings, timedelta, ...) go
+    through DRF's JSONEncoder.default, so they come out as before. Requests
+    for indented output, non-compact or ASCII-only settings and a missing
+    orjson fall back to the stdlib renderer. Known differences: floats that
+    need an exponent (1e16 vs 1e+16) and NaN/Infinity, which orjson writes
+    as null where STRICT_JSON raises.
+    """
+    options = 0 if orjson is None else (
+        orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        ret = orjson.dumps(data, default=encode_default, option=self.options)
+        # JSONRenderer zawsze escapuje U+2028 i U+2029
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+                PARAGRAPH_SEPARATOR, b'\\u2029'
+            )
+        return ret
@@ -0,0 +1,310 @@
+"""
+Fast generation of synthetic users, tags and recipes
+
+Rows get their primary keys up front, so recipes and tag links never have
+to be read back. They are written per chunk of users with COPY on Postgres
+and plain INSERTs elsewhere. Denormalized counters are computed while the
+rows are generated, and all output is reproducible from the seed.
+"""
+import bisect
+import io
+import itertools
+import random
+import string
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.color import no_style
+from django.db import connections
+from django.db.models import Max
+
+from core.models import Recipe, Tag, UserStats
+
+# tylko dla danych testowych: hash sprawdza się normalnie, a przy pierwszym
+# logowaniu check_password przelicza go z pełną liczbą iteracji
+SEED_HASH_ITERATIONS = 1
+ADJECTIVES = (
+    'quick', 'spicy', 'creamy', 'roasted', 'grandma\'s', 'vegan', 'smoky',
+    'crispy', 'light', 'hearty', 'summer', 'winter', 'lemony', 'garlic',
+    'baked', 'grilled', 'sweet', 'sour', 'fresh', 'rustic',
+)
+DISHES = (
+    'soup', 'stew', 'salad', 'pasta', 'curry', 'pie', 'cake', 'pancakes',
+    'risotto', 'dumplings', 'tacos', 'omelette', 'bread', 'casserole',
+    'burger', 'noodles', 'chili', 'tart', 'porridge', 'skewers',
+)
+INGREDIENTS = (
+    'tomato', 'chicken', 'lentil', 'mushroom', 'potato', 'beetroot',
+    'cabbage', 'salmon', 'tofu', 'pumpkin', 'apple', 'cheese', 'spinach',
+    'chickpea', 'rice', 'pork', 'beef', 'carrot', 'plum', 'cherry',
+)
+TAG_PREFIXES = ('', 'easy', 'family', 'weekday', 'festive', 'budget')
+TAG_WORDS = (
+    'vegan', 'vegetarian', 'dessert', 'breakfast', 'dinner', 'lunch',
+    'soup', 'quick', 'spicy', 'italian', 'polish', 'asian', 'mexican',
+    'baking', 'salad', 'grill', 'gluten-free', 'seafood', 'pasta', 'kids',
+    'party', 'healthy', 'snack', 'slow-cooker', 'one-pot', 'low-carb',
+)
+TAG_COUNTS = (0, 1, 1, 2, 2, 2, 3, 3, 4)
+
+
+def zipf_weights(count, skew):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def zipf_counts(total, count, skew, rng):
+    """Split `total` between `count` buckets by Zipf weights in random order
+
+    Rounds with the largest remainder method so the counts add up exactly.
+    """
+    weights = zipf_weights(count, skew)
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(count), key=lambda i: counts[i] - shares[i]
+    )
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    rng.shuffle(counts)
+    return counts
+
+
+def tag_vocabulary(size):
+    """Return `size` distinct tag names, most popular first"""
+    names = (
+        f'{prefix} {word}' if prefix else word
+        for prefix, word in itertools.product(TAG_PREFIXES, TAG_WORDS)
+    )
+    vocabulary = list(itertools.islice(names, size))
+    vocabulary.extend(
+        f'tag {i}' for i in range(len(vocabulary), size)
+    )
+    return vocabulary
+
+
+def weighted_sample(rng, population, cum_weights, k):
+    """Sample `k` distinct items, more often the ones with bigger weights"""
+    k = min(k, len(population))
+    total = cum_weights[-1]
+    chosen = {}
+    while len(chosen) < k:
+        index = bisect.bisect(cum_weights, rng.random() * total)
+        chosen.setdefault(min(index, len(population) - 1), None)
+    return [population[index] for index in chosen]
+
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if value is True or value is False:
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n'
+    ).replace('\r', '\\r')
+
+
+class RowWriter:
+    """Write tuples of column values with COPY or executemany INSERTs"""
+
+    def __init__(self, using='default', batch_size=10000):
+        self.connection = connections[using]
+        self.batch_size = batch_size
+        self.copy = self.connection.vendor == 'postgresql'
+
+    def write(self, model, fields, rows):
+        quote = self.connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        columns = ', '.join(
+            quote(model._meta.get_field(name).column) for name in fields
+        )
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            if self.copy:
+                self._copy(table, columns, batch)
+            else:
+                self._insert(table, columns, len(fields), batch)
+
+    def _copy(self, table, columns, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(map(copy_value, row)))
+            buffer.write('\n')
+        buffer.seek(0)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {table} ({columns}) FROM STDIN', buffer
+            )
+
+    def _insert(self, table, columns, width, rows):
+        # bez instancji modeli, które przy milionach wierszy kosztują
+        # więcej niż sam zapis
+        placeholders = ', '.join(['%s'] * width)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} ({columns}) VALUES ({placeholders})',
+                rows
+            )
+
+
+class Seeder:
+    """Generate users with Zipf distributed recipes and overlapping tags
+
+    Every user owns `tags_per_user` tags drawn from a shared vocabulary
+    with Zipf popularity, so popular names are shared by many users. The
+    number of recipes per user is Zipf distributed around
+    `recipes_per_user`; `skew` 0 gives every user the same number.
+    """
+    user_fields = (
+        'id', 'password', 'last_login', 'is_superuser', 'email', 'name',
+        'is_active', 'is_staff',
+    )
+    tag_fields = ('id', 'user_id', 'name', 'recipe_count')
+    recipe_fields = (
+        'id', 'user_id', 'title', 'description', 'time_minutes', 'price',
+        'link',
+    )
+    link_fields = ('id', 'recipe_id', 'tag_id')
+    stats_fields = (
+        'user_id', 'recipe_count', 'tag_count', 'time_minutes_total',
+        'min_price', 'max_price',
+    )
+
+    def __init__(self, users, recipes_per_user, tags_per_user=15,
+                 vocabulary=200, skew=1.0, seed=0, prefix='seed',
+                 password='seed-password', chunk_size=1000,
+                 batch_size=10000, using='default'):
+        self.users = users
+        self.recipes_per_user = recipes_per_user
+        self.tags_per_user = min(tags_per_user, vocabulary)
+        self.vocabulary = tag_vocabulary(vocabulary)
+        self.vocabulary_weights = list(itertools.accumulate(
+            zipf_weights(vocabulary, skew)
+        ))
+        self.skew = skew
+        self.seed = seed
+        self.prefix = prefix
+        self.password = password
+        self.chunk_size = chunk_size
+        self.using = using
+        self.writer = RowWriter(using, batch_size)
+        self.link_model = Recipe.tags.through
+        self.models = (get_user_model(), Tag, Recipe, self.link_model)
+
+    def next_ids(self):
+        return {
+            model: itertools.count(
+                (model.objects.using(self.using).aggregate(
+                    top=Max('id')
+                )['top'] or 0) + 1
+            )
+            for model in self.models
+        }
+
+    def reset_sequences(self):
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), self.models
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def password_hash(self, rng):
+        salt = ''.join(rng.choices(string.ascii_letters + string.digits,
+                                   k=12))
+        return PBKDF2PasswordHasher().encode(
+            self.password, salt, iterations=SEED_HASH_ITERATIONS
+        )
+
+    def recipe_row(self, rng, recipe_id, user_id, number):
+        title = '{} {} {}'.format(
+            rng.choice(ADJECTIVES), rng.choice(INGREDIENTS),
+            rng.choice(DISHES)
+        ).capitalize()
+        description = ' '.join(rng.choices(INGREDIENTS, k=rng.randint(0, 12)))
+        price = None
+        if rng.random() < 0.8:
+            price = Decimal(rng.randint(50, 99999)).scaleb(-2)
+        return (
+            recipe_id, user_id, title, description,
+            int(rng.lognormvariate(3.3, 0.6)) + 1, price,
+            f'https://example.com/{self.prefix}/{user_id}/{number}'
+            if rng.random() < 0.5 else '',
+        )
+
+    def generate_user(self, rng, ids, index, recipe_count, rows):
+        user_id = next(ids[get_user_model()])
+        rows['users'].append((
+            user_id, self.password_hash(rng), None, False,
+            f'{self.prefix}-{index}@example.com', f'Seed user {index}',
+            True, False,
+        ))
+
+        names = weighted_sample(
+            rng, self.vocabulary, self.vocabulary_weights, self.tags_per_user
+        )
+        tag_ids = [next(ids[Tag]) for _ in names]
+        tag_weights = list(itertools.accumulate(
+            zipf_weights(len(tag_ids), self.skew)
+        ))
+        tag_counts = dict.fromkeys(tag_ids, 0)
+
+        prices = []
+        time_total = 0
+        for number in range(recipe_count):
+            recipe_id = next(ids[Recipe])
+            recipe = self.recipe_row(rng, recipe_id, user_id, number)
+            rows['recipes'].append(recipe)
+            time_total += recipe[4]
+            if recipe[5] is not None:
+                prices.append(recipe[5])
+            if not tag_ids:
+                continue
+            for tag_id in weighted_sample(
+                rng, tag_ids, tag_weights, rng.choice(TAG_COUNTS)
+            ):
+                rows['links'].append(
+                    (next(ids[self.link_model]), recipe_id, tag_id)
+                )
+                tag_counts[tag_id] += 1
+
+        rows['tags'].extend(
+            (tag_id, user_id, name, tag_counts[tag_id])
+            for tag_id, name in zip(tag_ids, names)
+        )
+        rows['stats'].append((
+            user_id, recipe_count, len(tag_ids), time_total,
+            min(prices, default=None), max(prices, default=None),
+        ))
+
+    def write_chunk(self, rows):
+        self.writer.write(get_user_model(), self.user_fields, rows['users'])
+        self.writer.write(Tag, self.tag_fields, rows['tags'])
+        self.writer.write(Recipe, self.recipe_fields, rows['recipes'])
+        self.writer.write(self.link_model, self.link_fields, rows['links'])
+        self.writer.write(UserStats, self.stats_fields, rows['stats'])
+
+    def run(self, progress=None):
+        """Write all rows, returning the number written per table"""
+        rng = random.Random(self.seed)
+        counts = zipf_counts(
+            self.users * self.recipes_per_user, self.users, self.skew, rng
+        )
+        ids = self.next_ids()
+        totals = dict.fromkeys(
+            ('users', 'tags', 'recipes', 'links', 'stats'), 0
+        )
+        for start in range(0, self.users, self.chunk_size):
+            rows = {name: [] for name in totals}
+            for index in range(start, min(start + self.chunk_size,
+                                          self.users)):
+                self.generate_user(rng, ids, index, counts[index], rows)
+            self.write_chunk(rows)
+            for name, chunk in rows.items():
+                totals[name] += len(chunk)
+            if progress is not None:
+                progress(totals)
+        self.reset_sequences()
+        return totals
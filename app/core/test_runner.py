@@ -0,0 +1,25 @@
+"""
+Test runner of the project
+"""
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Run the tests with sampled request profiling turned off
+
+    Otherwise profile lines of randomly sampled requests end up in the
+    test output. Tests of the profiler turn it on with override_settings.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.profile_settings = override_settings(
+            REQUEST_PROFILE=dict(settings.REQUEST_PROFILE, ENABLED=False)
+        )
+        self.profile_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.profile_settings.disable()
+        super().teardown_test_environment(**kwargs)
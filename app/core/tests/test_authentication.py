@@ -0,0 +1,142 @@
+"""
+Tests for the cached token authentication
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenCache, token_cache
+
+ME_URL = reverse('user:me')
+
+
+class TokenCacheTests(SimpleTestCase):
+    """Test the LRU used to cache tokens"""
+
+    def test_get_counts_hits_and_misses(self):
+        cache = TokenCache(max_size=10)
+
+        self.assertIsNone(cache.get('abc'))
+        cache.set('abc', 'token')
+
+        self.assertEqual(cache.get('abc'), 'token')
+        self.assertEqual(cache.stats(), {
+            'hits': 1, 'shared_hits': 0, 'misses': 1, 'size': 1
+        })
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('core.authentication.time.monotonic')
+    def test_entries_expire_after_ttl(self, patched_monotonic):
+        cache = TokenCache(ttl=10)
+        patched_monotonic.return_value = 100
+        cache.set('a', 1)
+
+        patched_monotonic.return_value = 109
+        self.assertEqual(cache.get('a'), 1)
+        patched_monotonic.return_value = 111
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_shared_tier_fills_local_lru(self):
+        cache = TokenCache(shared_cache='default', key_prefix='test-token')
+        other = TokenCache(shared_cache='default', key_prefix='test-token')
+        cache.set('a', 1)
+
+        self.assertEqual(other.get('a'), 1)
+        self.assertEqual(other.get('a'), 1)
+        self.assertEqual(other.stats()['shared_hits'], 1)
+        self.assertEqual(other.stats()['hits'], 1)
+
+        cache.invalidate('a')
+        self.assertIsNone(cache.get('a'))
+
+    def test_invalidation_reaches_local_lru_of_other_instances(self):
+        a = TokenCache(shared_cache='default', key_prefix='test-revoke')
+        b = TokenCache(shared_cache='default', key_prefix='test-revoke')
+        a.set('k', 1)
+        self.assertEqual(b.get('k'), 1)
+
+        a.invalidate('k')
+
+        self.assertIsNone(b.get('k'))
+        self.assertEqual(b.stats()['size'], 0)
+
+        b.set('k', 2)
+        self.assertEqual(a.get('k'), 2)
+
+    @override_settings(WEB_CONCURRENCY=4)
+    def test_local_lru_disabled_for_several_processes(self):
+        self.assertEqual(TokenCache.from_settings().max_size, 0)
+
+    @override_settings(WEB_CONCURRENCY=4, TOKEN_AUTH_CACHE={
+        'MAX_SIZE': 100, 'SHARED_CACHE': 'default'
+    })
+    def test_local_lru_kept_with_shared_tier(self):
+        self.assertEqual(TokenCache.from_settings().max_size, 100)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating API requests with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_skips_token_query(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cached_user(self):
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'password': 'newpassword123'})
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
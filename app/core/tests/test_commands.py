@@ -1,27 +1,53 @@
 """Test custom Django management commands"""
 
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
 
-@patch('core.management.commands.wait_for_db.Command.check')
+@patch('core.management.commands.wait_for_db.Command.ping')
 class CommandTests(SimpleTestCase):
 
-    def test_wait_for_db_ready(self, patched_check):
-        patched_check.return_value = True
+    def call(self, **options):
+        call_command('wait_for_db', stdout=StringIO(), **options)
 
-        call_command('wait_for_db')
-        patched_check.assert_called_once_with(databases=['default'])
+    def test_wait_for_db_ready(self, patched_ping):
+        patched_ping.return_value = None
+
+        self.call()
+        patched_ping.assert_called_once_with('default')
+
+    @patch('time.sleep')
+    def test_wait_for_db_delay(self, patched_sleep, patched_ping):
+        patched_ping.side_effect = (
+            [Psycopg2Error] * 2 + [OperationalError] * 3 + [None]
+        )
+
+        self.call(min_delay=0.1, max_delay=0.4)
+        self.assertEqual(patched_ping.call_count, 6)
+        patched_ping.assert_called_with('default')
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(len(delays), 5)
+        # backoff podwaja się do max_delay, jitter w górnej połowie
+        for delay, limit in zip(delays, [0.1, 0.2, 0.4, 0.4, 0.4]):
+            self.assertGreaterEqual(delay, limit / 2)
+            self.assertLessEqual(delay, limit)
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
-        patched_check.side_effect = [Psycopg2Error] * 2 + [OperationalError] * 3 + [True]
+    def test_wait_for_db_timeout(self, patched_sleep, patched_ping):
+        patched_ping.side_effect = OperationalError('refused')
+
+        with patch('time.monotonic', side_effect=[0, 1, 2, 3, 4]):
+            with self.assertRaises(CommandError):
+                self.call(timeout=3)
 
-        call_command('wait_for_db')
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        self.assertEqual(patched_sleep.call_count, 2)
+        self.assertLessEqual(sum(
+            call.args[0] for call in patched_sleep.call_args_list
+        ), 3)
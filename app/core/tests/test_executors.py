@@ -0,0 +1,52 @@
+"""
+Tests for the bounded executors
+"""
+import asyncio
+import threading
+
+from django.test import SimpleTestCase, override_settings
+
+from core.executors import BoundedExecutor, ExecutorBusy, get_executor
+
+
+class BoundedExecutorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.executor = BoundedExecutor(max_workers=1, max_pending=1)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_run_returns_result(self):
+        result = asyncio.run(self.executor.run(sum, [1, 2, 3]))
+
+        self.assertEqual(result, 6)
+
+    def test_rejects_calls_over_the_limit(self):
+        release = threading.Event()
+        running = self.executor.submit(release.wait)
+        pending = self.executor.submit(lambda: None)
+
+        with self.assertRaises(ExecutorBusy):
+            self.executor.submit(lambda: None)
+        self.assertEqual(self.executor.stats()['rejected'], 1)
+        self.assertEqual(self.executor.stats()['in_flight'], 2)
+
+        release.set()
+        running.result()
+        pending.result()
+        self.executor.submit(lambda: None).result()
+
+    def test_errors_are_raised_to_caller(self):
+        def fail():
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            asyncio.run(self.executor.run(fail))
+        self.assertEqual(self.executor.stats()['in_flight'], 0)
+
+    def test_executors_follow_settings(self):
+        with override_settings(EXECUTORS={'db': {'MAX_WORKERS': 3}}):
+            executor = get_executor('db')
+            self.assertIs(get_executor('db'), executor)
+            self.assertEqual(executor.max_workers, 3)
+
+        self.assertIsNot(get_executor('db'), executor)
@@ -0,0 +1,55 @@
+"""
+Tests for the liveness and readiness endpoints
+"""
+from unittest.mock import patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.health import database_ping
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthEndpointTests(TestCase):
+
+    def setUp(self):
+        database_ping.clear()
+        self.addCleanup(database_ping.clear)
+
+    def test_ready(self):
+        response = self.client.get(READYZ_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), {'status': 'ok', 'database': 'ok'}
+        )
+
+    @patch('core.health.ping_database', side_effect=OperationalError)
+    def test_database_down(self, patched_ping):
+        readiness = self.client.get(READYZ_URL)
+        liveness = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(readiness.status_code, 503)
+        self.assertEqual(readiness.json()['database'], 'unavailable')
+        self.assertEqual(liveness.status_code, 200)
+        self.assertEqual(liveness.json()['database'], 'unavailable')
+
+    @patch('core.health.ping_database')
+    def test_ping_cached(self, patched_ping):
+        for _ in range(3):
+            self.client.get(READYZ_URL)
+            self.client.get(HEALTHZ_URL)
+
+        patched_ping.assert_called_once_with('default')
+
+        with override_settings(HEALTH_CHECK={'CACHE_SECONDS': 0}):
+            self.client.get(READYZ_URL)
+        self.assertEqual(patched_ping.call_count, 2)
+
+    def test_only_safe_methods(self):
+        response = self.client.post(READYZ_URL)
+
+        self.assertEqual(response.status_code, 405)
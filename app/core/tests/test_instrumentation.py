@@ -0,0 +1,160 @@
+"""
+Tests for the sampled request profile middleware
+"""
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.executors import get_executor
+from core.instrumentation import (
+    SERVER_TIMING_HEADER,
+    RequestProfile,
+    RequestProfileMiddleware,
+    observe_query,
+    phase,
+)
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def profile_settings(**options):
+    return dict(settings.REQUEST_PROFILE, **options)
+
+
+def problem_records(logs):
+    return [
+        record for record in logs.records
+        if record.name == 'core.instrumentation.problems'
+    ]
+
+
+def run_queries(count):
+    def view(request):
+        for pk in range(count):
+            list(Tag.objects.filter(pk=pk))
+        return HttpResponse()
+    return view
+
+
+class RequestProfileTests(TestCase):
+
+    def test_duplicates(self):
+        profile = RequestProfile()
+        profile.queries = [('a', 0.1)] * 3 + [('b', 0.5)] * 2
+
+        self.assertEqual(profile.duplicates(3), [('a', 3)])
+        self.assertEqual(profile.duplicates(4), [])
+        self.assertEqual(profile.slowest(1), [('b', 0.5)])
+
+    def test_single_query_observer_per_connection(self):
+        connection.ensure_connection()
+
+        self.assertEqual(connection.execute_wrappers, [observe_query])
+
+    def test_phase_outside_of_request_is_noop(self):
+        with phase('serialize'):
+            pass
+
+
+@override_settings(REQUEST_PROFILE=profile_settings(
+    ENABLED=True, SAMPLE_RATE=1.0, SLOW_REQUEST_MS=10 ** 6,
+    DUPLICATE_QUERIES=5
+))
+class RequestProfileMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_sampled_request_logged_with_server_timing(self):
+        middleware = RequestProfileMiddleware(run_queries(2))
+
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = middleware(self.factory.get('/test/'))
+
+        self.assertIn('db;dur=', response[SERVER_TIMING_HEADER])
+        self.assertIn('desc="2 queries"', response[SERVER_TIMING_HEADER])
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].profile['queries'], 2)
+        self.assertEqual(logs.records[0].profile['path'], '/test/')
+
+    def test_repeated_queries_reported(self):
+        middleware = RequestProfileMiddleware(run_queries(6))
+
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            middleware(self.factory.get('/test/'))
+
+        problems = problem_records(logs)
+        duplicates = problems[0].profile['duplicates']
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0]['times'], 6)
+
+    def test_slow_request_reported_with_slowest_queries(self):
+        middleware = RequestProfileMiddleware(run_queries(4))
+
+        with override_settings(REQUEST_PROFILE=profile_settings(
+            SAMPLE_RATE=1.0, SLOW_REQUEST_MS=0, SLOWEST_QUERIES=2
+        )), self.assertLogs('core.instrumentation', 'INFO') as logs:
+            middleware(self.factory.get('/test/'))
+
+        problems = problem_records(logs)
+        self.assertEqual(len(problems[0].profile['slowest']), 2)
+
+    def test_unsampled_request_only_checked_for_slowness(self):
+        middleware = RequestProfileMiddleware(run_queries(6))
+
+        with override_settings(REQUEST_PROFILE=profile_settings(
+            SAMPLE_RATE=0, SLOW_REQUEST_MS=0
+        )), self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = middleware(self.factory.get('/test/'))
+
+        self.assertNotIn(SERVER_TIMING_HEADER, response)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].name, 'core.instrumentation.problems')
+        self.assertNotIn('queries', logs.records[0].profile)
+
+    def test_async_request_records_executor_queries(self):
+        async def view(request):
+            return await get_executor('db').run(run_queries(2), request)
+
+        middleware = RequestProfileMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = asyncio.run(middleware(self.factory.get('/test/')))
+
+        self.assertIn('desc="2 queries"', response[SERVER_TIMING_HEADER])
+        self.assertEqual(logs.records[0].profile['queries'], 2)
+
+    def test_disabled(self):
+        middleware = RequestProfileMiddleware(run_queries(1))
+
+        with override_settings(REQUEST_PROFILE={'ENABLED': False}):
+            response = middleware(self.factory.get('/test/'))
+
+        self.assertNotIn(SERVER_TIMING_HEADER, response)
+
+    @override_settings(RECIPE_API_CACHE={'ENABLED': False})
+    def test_recipe_list_serializer_time(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        Recipe.objects.create(user=user, title='Soup', time_minutes=5)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = client.get(RECIPES_URL)
+
+        self.assertIn('serialize;dur=', response[SERVER_TIMING_HEADER])
+        profile = logs.records[0].profile
+        self.assertEqual(profile['view'], 'recipe:recipe-list')
+        self.assertEqual(profile['status'], 200)
+        self.assertIn('serialize_ms', profile)
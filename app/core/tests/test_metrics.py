@@ -0,0 +1,254 @@
+"""
+Tests for the Prometheus metrics store, middleware and endpoint
+"""
+import asyncio
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import (
+    AsyncClient,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe, Tag
+
+METRICS_URL = reverse('metrics')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def metrics_settings(**options):
+    return dict(settings.METRICS, **dict({'ENABLED': True}, **options))
+
+
+def dead_pid():
+    pid = 4194303
+    while metrics.pid_alive(pid):
+        pid -= 1
+    return pid
+
+
+class MetricFileTests(SimpleTestCase):
+
+    def test_values_survive_growing(self):
+        metric_file = metrics.MetricFile()
+        indexes = [metric_file.index(f'key-{i}' * 20) for i in range(1000)]
+        for index in indexes:
+            metric_file.values[index] += 1.5
+        metric_file.values[indexes[0]] += 1
+
+        entries = dict(metric_file.items())
+        self.assertEqual(len(entries), 1000)
+        self.assertEqual(entries['key-0' * 20], 2.5)
+        self.assertEqual(entries['key-999' * 20], 1.5)
+        self.assertEqual(metric_file.index('key-0' * 20), indexes[0])
+
+    def test_render_sums_and_accumulates_buckets(self):
+        family = 'http_request_duration_seconds'
+        labels = (('view', 'RecipeViewSet.list'),)
+        entries = [
+            (metrics.make_key(family, labels, '_bucket', '0.1'), 2),
+            (metrics.make_key(family, labels, '_bucket', '+Inf'), 1),
+            (metrics.make_key(family, labels, '_bucket', '0.1'), 1),
+            (metrics.make_key(family, labels, '_sum'), 0.5),
+            (metrics.make_key(family, labels, '_count'), 4),
+            (metrics.make_key('http_requests_in_flight'), 2),
+        ]
+
+        lines = metrics.render(entries).splitlines()
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn(
+            family + '_bucket{view="RecipeViewSet.list",le="0.1"} 3', lines
+        )
+        self.assertIn(
+            family + '_bucket{view="RecipeViewSet.list",le="+Inf"} 4', lines
+        )
+        self.assertIn(family + '_sum{view="RecipeViewSet.list"} 0.5', lines)
+        self.assertIn('http_requests_in_flight 2', lines)
+
+    def test_label_values_escaped(self):
+        self.assertEqual(
+            metrics.format_labels((('view', 'a"b\\c'),)), 'view="a\\"b\\\\c"'
+        )
+
+
+class MultiprocessStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write_process_file(self, pid, values):
+        metric_file = metrics.MetricFile(
+            os.path.join(self.directory, f'metrics-{pid}.db')
+        )
+        for key, value in values.items():
+            metric_file.values[metric_file.index(key)] = value
+        metric_file.close()
+
+    def test_files_of_all_processes_summed(self):
+        total = metrics.make_key('http_requests_total', (
+            ('view', 'TagViewSet.list'), ('method', 'GET'), ('status', 200),
+        ))
+        in_flight = metrics.make_key('http_requests_in_flight')
+        self.write_process_file(os.getppid(), {total: 2, in_flight: 1})
+        self.write_process_file(dead_pid(), {total: 3, in_flight: 5})
+        store = metrics.MetricStore(self.directory)
+        self.addCleanup(store.close)
+
+        store.request_started()
+        store.request_finished('TagViewSet.list', 'GET', 200, 0.01, 1)
+        output = metrics.render(store.entries())
+
+        self.assertIn(
+            'http_requests_total{view="TagViewSet.list",method="GET",'
+            'status="200"} 6', output
+        )
+        # wartości chwilowe martwych procesów są pomijane
+        self.assertIn('http_requests_in_flight 1', output)
+
+    def test_restarted_pid_keeps_counters_only(self):
+        total = metrics.make_key('cache_requests_total', (
+            ('cache', 'recipe_api'), ('result', 'hit'),
+        ))
+        in_flight = metrics.make_key('http_requests_in_flight')
+        self.write_process_file(os.getpid(), {total: 4, in_flight: 3})
+
+        store = metrics.MetricStore(self.directory)
+        self.addCleanup(store.close)
+
+        entries = dict(store.entries())
+        self.assertEqual(entries[total], 4)
+        self.assertEqual(entries[in_flight], 0)
+
+
+@override_settings(
+    METRICS=metrics_settings(MULTIPROCESS_DIR=None),
+    API_THROTTLE=dict(settings.API_THROTTLE, ENABLED=False),
+)
+class MetricsEndpointTests(TestCase):
+
+    def setUp(self):
+        metrics.reset_store()
+        self.addCleanup(metrics.reset_store)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def scrape(self):
+        response = self.client.get(METRICS_URL)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode().splitlines()
+
+    def test_requests_labeled_by_viewset_action(self):
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        self.client.get(RECIPES_URL)
+        self.client.patch(
+            reverse('recipe:tag-detail', args=[tag.pk]), {'name': 'Vegetarian'}
+        )
+        self.client.post(reverse('user:token'), {
+            'email': 'user@example.com', 'password': 'wrong'
+        })
+        lines = self.scrape()
+
+        self.assertIn(
+            'http_requests_total{view="RecipeViewSet.list",method="GET",'
+            'status="200"} 1', lines
+        )
+        self.assertIn(
+            'http_requests_total{view="TagViewSet.partial_update",'
+            'method="PATCH",status="200"} 1', lines
+        )
+        self.assertIn(
+            'http_requests_total{view="CreateTokenView.post",'
+            'method="POST",status="400"} 1', lines
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{view="RecipeViewSet.list"} 1', lines
+        )
+        self.assertTrue(any(
+            line.startswith('http_request_db_queries_total'
+                            '{view="RecipeViewSet.list"}')
+            for line in lines
+        ))
+        self.assertIn('http_requests_in_flight 1', lines)
+
+    def test_cache_hits_and_process_stats(self):
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        lines = self.scrape()
+
+        self.assertIn(
+            'cache_requests_total{cache="recipe_api",result="miss"} 1', lines
+        )
+        self.assertIn(
+            'cache_requests_total{cache="recipe_api",result="hit"} 1', lines
+        )
+        self.assertTrue(any(
+            line.startswith('token_cache_requests_total') for line in lines
+        ))
+
+    def test_disabled(self):
+        with override_settings(METRICS=metrics_settings(ENABLED=False)):
+            response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    ROOT_URLCONF='app.urls_async',
+    METRICS=metrics_settings(MULTIPROCESS_DIR=None),
+    API_THROTTLE=dict(settings.API_THROTTLE, ENABLED=False),
+    RECIPE_API_CACHE={'ENABLED': False},
+)
+class AsyncMetricsTests(TransactionTestCase):
+
+    def setUp(self):
+        metrics.reset_store()
+        self.addCleanup(metrics.reset_store)
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.token = Token.objects.create(user=user)
+        Recipe.objects.create(user=user, title='Soup', time_minutes=5)
+
+    def get(self, url):
+        return asyncio.run(AsyncClient().get(
+            url, authorization=f'Token {self.token.key}'
+        ))
+
+    def test_middleware_is_async_under_asgi(self):
+        async def view(request):
+            pass
+
+        self.assertTrue(asyncio.iscoroutinefunction(
+            metrics.MetricsMiddleware(view)
+        ))
+
+    def test_queries_of_async_reads_counted(self):
+        self.assertEqual(self.get(RECIPES_URL).status_code, 200)
+        lines = self.get(METRICS_URL).content.decode().splitlines()
+
+        prefix = 'http_request_db_queries_total{view="RecipeViewSet.list"} '
+        counts = [
+            float(line[len(prefix):]) for line in lines
+            if line.startswith(prefix)
+        ]
+        self.assertEqual(len(counts), 1)
+        self.assertGreater(counts[0], 0)
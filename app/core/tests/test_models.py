@@ -4,6 +4,7 @@ Test for models
 
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -90,4 +91,13 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(tag), 'Vegan')
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name"""
+        user = create_user()
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(
+            user=create_user(email='other@example.com'), name='Vegan'
+        )
 
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
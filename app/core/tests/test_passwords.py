@@ -0,0 +1,78 @@
+"""
+Tests for password hashing on the password executor
+"""
+import threading
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.test import TestCase, override_settings
+
+from core.executors import ExecutorBusy, get_executor
+
+BUSY_EXECUTORS = dict(
+    settings.EXECUTORS, password={'MAX_WORKERS': 1, 'MAX_PENDING': 0}
+)
+
+
+class PasswordExecutorTests(TestCase):
+
+    def test_hashing_and_checking_run_on_executor(self):
+        threads = []
+
+        def record(fn):
+            def wrapper(*args, **kwargs):
+                threads.append(threading.current_thread().name)
+                return fn(*args, **kwargs)
+            return wrapper
+
+        with patch.object(
+            hashers, 'make_password', record(hashers.make_password)
+        ), patch.object(
+            hashers, 'check_password', record(hashers.check_password)
+        ):
+            user = get_user_model().objects.create_user(
+                email='user@example.com', password='testpass'
+            )
+            self.assertTrue(user.check_password('testpass'))
+            self.assertFalse(user.check_password('wrong'))
+
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(name.startswith('password') for name in threads))
+
+    def test_unusable_password_skips_executor(self):
+        with patch.object(get_executor('password'), 'submit') as submit:
+            user = get_user_model().objects.create_user(
+                email='user@example.com'
+            )
+
+        submit.assert_not_called()
+        self.assertFalse(user.has_usable_password())
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_outdated_hash_upgraded_by_caller(self):
+        user = get_user_model().objects.create_user(email='user@example.com')
+        user.password = hashers.make_password('testpass', hasher='md5')
+        user.save()
+
+        self.assertTrue(user.check_password('testpass'))
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password('testpass'))
+
+    @override_settings(EXECUTORS=BUSY_EXECUTORS)
+    def test_full_queue_raises_busy(self):
+        release = threading.Event()
+        blocker = get_executor('password').submit(release.wait)
+        try:
+            with self.assertRaises(ExecutorBusy):
+                get_user_model().objects.create_user(
+                    email='user@example.com', password='testpass'
+                )
+        finally:
+            release.set()
+            blocker.result()
@@ -0,0 +1,160 @@
+"""
+Tests for the pooled database backend
+"""
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.backends.postgresql_pool.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def create_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    kwargs.setdefault('check', lambda conn: True)
+    return ConnectionPool(connect, **kwargs), opened
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_connection_is_reused(self):
+        pool, opened = create_pool(max_size=2)
+
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(opened), 1)
+
+    def test_fill_opens_min_size(self):
+        pool, opened = create_pool(min_size=2, max_size=4)
+
+        pool.fill()
+
+        self.assertEqual(len(opened), 2)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_checkout_waits_for_returned_connection(self):
+        pool, _ = create_pool(max_size=1, timeout=5)
+        conn = pool.getconn()
+        timer = threading.Timer(0.05, pool.putconn, [conn])
+        timer.start()
+
+        self.assertIs(pool.getconn(), conn)
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_seconds_max'], 0)
+        self.assertEqual(stats['saturation'], 1)
+
+    def test_checkout_times_out(self):
+        pool, _ = create_pool(max_size=1, timeout=0.01)
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_expired_connection_is_replaced(self):
+        pool, opened = create_pool(max_size=1, max_lifetime=60)
+        with patch('time.monotonic', return_value=0):
+            conn = pool.getconn()
+            pool.putconn(conn)
+
+        with patch('time.monotonic', return_value=61):
+            fresh = pool.getconn()
+
+        self.assertIsNot(fresh, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_failed_health_check_replaces_connection(self):
+        pool, opened = create_pool(
+            max_size=1, check=lambda conn: False, check_after=0
+        )
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(pool.stats()['failed_checks'], 1)
+
+    def test_discarded_connection_frees_slot(self):
+        pool, opened = create_pool(max_size=1, timeout=0.01)
+        conn = pool.getconn()
+        conn.close()
+        pool.putconn(conn)
+
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertEqual(len(opened), 2)
+
+    def test_failed_connect_frees_slot(self):
+        calls = []
+
+        def connect():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError('refused')
+            return FakeConnection()
+
+        pool = ConnectionPool(connect, lambda conn: True, max_size=1,
+                              timeout=0.01)
+        with self.assertRaises(OSError):
+            pool.getconn()
+
+        self.assertIsInstance(pool.getconn(), FakeConnection)
+
+
+@skipUnless(
+    connection.settings_dict['ENGINE'] == 'core.backends.postgresql_pool',
+    'Needs the pooled Postgres backend'
+)
+class PooledBackendTests(TransactionTestCase):
+
+    def test_connection_returned_to_pool(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+
+        connection.ensure_connection()
+
+        self.assertIs(connection.connection, raw)
+
+    def test_open_transaction_is_rolled_back(self):
+        connection.set_autocommit(False)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        connection.close()
+        connection.set_autocommit(True)
+
+        status = connection.connection.info.transaction_status
+        self.assertEqual(status, 0)
+
+    def test_pool_timeout_is_operational_error(self):
+        connection.ensure_connection()
+        pool = connection.pool
+        connection.close()
+        held = [pool.getconn() for _ in range(pool.max_size)]
+        try:
+            with patch.object(pool, 'timeout', 0.01):
+                with self.assertRaises(OperationalError):
+                    connection.ensure_connection()
+        finally:
+            for conn in held:
+                pool.putconn(conn)
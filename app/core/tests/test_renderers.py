@@ -0,0 +1,142 @@
+"""
+Tests for the orjson renderer and parser
+"""
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.models import Recipe, Tag
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+PAYLOADS = [
+    {'price': Decimal('5.50'), 'zero': Decimal('0'), 'big': Decimal('999.99')},
+    {
+        'utc': datetime.datetime(2024, 6, 1, 12, 30, tzinfo=timezone.utc),
+        'micro': datetime.datetime(
+            2024, 6, 1, 12, 30, 5, 123456, tzinfo=timezone.utc
+        ),
+        'offset': datetime.datetime(
+            2024, 6, 1, 12, 30,
+            tzinfo=datetime.timezone(datetime.timedelta(hours=2))
+        ),
+        'naive': datetime.datetime(2024, 6, 1, 12, 30),
+        'date': datetime.date(2024, 6, 1),
+        'time': datetime.time(7, 5, 1),
+        'duration': datetime.timedelta(minutes=90),
+    },
+    {'lazy': gettext_lazy('This field is required.')},
+    OrderedDict([('b', 1), ('a', [1, 2.5, None, True, False])]),
+    ReturnList([ReturnDict({'id': 1}, serializer=None)], serializer=None),
+    {'unicode': 'zażółć gęślą jaźń – 🍲', 'separators': 'a\u2028b\u2029c'},
+    {'escapes': 'quote " slash \\ newline \n tab \t nul \x00'},
+    {1: 'int key', 'nested': {'empty': {}, 'list': []}},
+    {'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678')},
+    {'floats': [0.1, 17.5, 1.0, -3.25, 123456.789]},
+    ['top', 'level', 'list'],
+    'string',
+    42,
+]
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def test_output_matches_json_renderer(self):
+        for payload in PAYLOADS:
+            with self.subTest(payload=payload):
+                self.assertEqual(
+                    FastJSONRenderer().render(payload),
+                    JSONRenderer().render(payload)
+                )
+
+    def test_indent_falls_back_to_json_renderer(self):
+        payload = {'a': [1, 2]}
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            FastJSONRenderer().render(payload, media_type),
+            JSONRenderer().render(payload, media_type)
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class FastJSONParserTests(SimpleTestCase):
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body))
+
+    def test_parses_like_json_parser(self):
+        body = (
+            '{"title": "Zupa \\u2028 ż", "time_minutes": 5, '
+            '"price": 5.5, "tags": [{"name": "vegan"}], "link": null}'
+        ).encode()
+
+        self.assertEqual(
+            self.parse(FastJSONParser(), body), self.parse(JSONParser(), body)
+        )
+
+    def test_invalid_json_raises_parse_error(self):
+        for body in (b'{"title": ', b'{"a": NaN}', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    self.parse(FastJSONParser(), body)
+
+    def test_other_encodings_use_json_parser(self):
+        body = '{"title": "żółć"}'.encode('utf-16')
+        result = FastJSONParser().parse(
+            io.BytesIO(body), parser_context={'encoding': 'utf-16'}
+        )
+
+        self.assertEqual(result, {'title': 'żółć'})
+
+
+class FastJSONApiTests(TestCase):
+    """Test API responses are rendered and parsed with the fast classes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipe_list_bytes_match_json_renderer(self):
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Zupa {i}', time_minutes=5 + i,
+                price=Decimal('4.50') + i
+            )
+            recipe.tags.add(
+                Tag.objects.get_or_create(user=self.user, name='wegańska')[0]
+            )
+
+        res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+
+    def test_json_body_is_parsed(self):
+        res = self.client.post(
+            reverse('recipe:recipe-list'),
+            '{"title": "Tost", "time_minutes": 3, "price": "1.20"}',
+            content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['price'], '1.20')
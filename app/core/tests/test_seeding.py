@@ -0,0 +1,123 @@
+"""
+Tests for the synthetic data generator and the seed_data command
+"""
+import random
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import SimpleTestCase, TestCase
+
+from core import seeding
+from core.models import Recipe, Tag
+from recipe.stats import rebuild_stats
+
+
+class DistributionTests(SimpleTestCase):
+
+    def test_zipf_counts_add_up_and_are_skewed(self):
+        counts = seeding.zipf_counts(10000, 100, 1.0, random.Random(0))
+
+        self.assertEqual(sum(counts), 10000)
+        self.assertGreater(max(counts), 10 * sorted(counts)[50])
+
+    def test_zipf_counts_without_skew_are_even(self):
+        counts = seeding.zipf_counts(1000, 10, 0, random.Random(0))
+
+        self.assertEqual(counts, [100] * 10)
+
+    def test_tag_vocabulary_is_distinct(self):
+        vocabulary = seeding.tag_vocabulary(500)
+
+        self.assertEqual(len(set(vocabulary)), 500)
+
+    def test_copy_value(self):
+        self.assertEqual(seeding.copy_value(None), '\\N')
+        self.assertEqual(seeding.copy_value(False), 'f')
+        self.assertEqual(seeding.copy_value('a\tb\\'), 'a\\tb\\\\')
+
+
+class SeederTests(TestCase):
+
+    def seed(self, **kwargs):
+        options = dict(users=20, recipes_per_user=10, tags_per_user=5,
+                       vocabulary=30, chunk_size=7, batch_size=50)
+        options.update(kwargs)
+        return seeding.Seeder(**options).run()
+
+    def test_rows_and_counters(self):
+        totals = self.seed()
+
+        self.assertEqual(totals['users'], 20)
+        self.assertEqual(Recipe.objects.count(), 200)
+        self.assertEqual(Tag.objects.count(), totals['tags'])
+        self.assertEqual(
+            Recipe.tags.through.objects.count(), totals['links']
+        )
+        self.assertEqual(rebuild_stats(dry_run=True), [])
+
+    def test_tag_names_overlap_between_users(self):
+        self.seed()
+
+        top = Tag.objects.values('name').annotate(
+            users=Count('user')
+        ).order_by('-users').first()
+        self.assertGreater(top['users'], 10)
+
+    def test_seeded_user_can_log_in(self):
+        self.seed(users=1, password='secret')
+        user = get_user_model().objects.get(email='seed-0@example.com')
+        seeded_hash = user.password
+
+        self.assertTrue(user.check_password('secret'))
+        user.refresh_from_db()
+        self.assertNotEqual(user.password, seeded_hash)
+        self.assertTrue(user.check_password('secret'))
+
+    def test_reproducible(self):
+        def snapshot():
+            self.seed(users=5)
+            values = list(Recipe.objects.order_by('id').values_list(
+                'user__email', 'title', 'time_minutes', 'price', 'tags__name'
+            ))
+            get_user_model().objects.all().delete()
+            return values
+
+        self.assertEqual(snapshot(), snapshot())
+
+    def test_orm_inserts_after_seeding(self):
+        self.seed(users=2)
+        last = Recipe.objects.order_by('id').last()
+
+        recipe = Recipe.objects.create(
+            user=last.user, title='After', time_minutes=5
+        )
+        self.assertGreater(recipe.pk, last.pk)
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY needs Postgres')
+    def test_copy_writer_used_on_postgres(self):
+        self.assertTrue(seeding.RowWriter().copy)
+        self.seed(users=3)
+
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+
+
+class SeedDataCommandTests(TestCase):
+
+    def test_seed_data(self):
+        out = StringIO()
+
+        call_command('seed_data', users=4, recipes=3, tags=2, stdout=out)
+
+        self.assertIn('4 users', out.getvalue())
+        self.assertEqual(Recipe.objects.count(), 12)
+
+    def test_existing_prefix_rejected(self):
+        call_command('seed_data', users=1, recipes=1, stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', users=1, recipes=1, stdout=StringIO())
@@ -0,0 +1,172 @@
+"""
+Tests for the token bucket throttle
+"""
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.throttling import BucketStore, parse_rate
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+CREATE_USER_URL = reverse('user:create')
+
+
+def throttle_settings(**rates):
+    return dict(settings.API_THROTTLE, RATES=rates)
+
+
+class BucketStoreTests(SimpleTestCase):
+    """Test token buckets of the local and shared store"""
+
+    def consume(self, store, now, ident='user:1'):
+        with patch('core.throttling.time.time', return_value=now):
+            return store.consume('recipes.read', ident, *parse_rate('3/min'))
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('3/min'), (3, 0.05))
+        self.assertEqual(parse_rate('10/s'), (10, 10))
+        self.assertEqual(parse_rate('24/day'), (24, 24 / 86400))
+
+    def test_burst_then_refill(self):
+        store = BucketStore()
+
+        self.assertEqual(
+            [self.consume(store, 100) for _ in range(3)], [0, 0, 0]
+        )
+        self.assertAlmostEqual(self.consume(store, 100), 20)
+        self.assertAlmostEqual(self.consume(store, 110), 10)
+        self.assertEqual(self.consume(store, 120), 0)
+        self.assertEqual(store.stats(), {
+            'allowed': {'recipes.read': 4},
+            'rejected': {'recipes.read': 2},
+            'size': 1,
+        })
+
+    def test_refill_capped_at_bucket_size(self):
+        store = BucketStore()
+        self.consume(store, 100)
+
+        results = [self.consume(store, 10000) for _ in range(4)]
+
+        self.assertEqual(results[:3], [0, 0, 0])
+        self.assertGreater(results[3], 0)
+
+    def test_clients_have_separate_buckets(self):
+        store = BucketStore()
+        for _ in range(3):
+            self.consume(store, 100)
+
+        self.assertEqual(self.consume(store, 100, ident='user:2'), 0)
+
+    def test_least_recently_used_bucket_is_dropped(self):
+        store = BucketStore(max_keys=2)
+        for _ in range(3):
+            self.consume(store, 100, ident='a')
+        self.consume(store, 100, ident='b')
+        self.consume(store, 100, ident='c')
+
+        self.assertEqual(store.stats()['size'], 2)
+        self.assertEqual(self.consume(store, 100, ident='a'), 0)
+
+    def test_shared_cache_store(self):
+        cache.clear()
+        first = BucketStore(shared_cache='default')
+        second = BucketStore(shared_cache='default')
+
+        for _ in range(3):
+            self.assertEqual(self.consume(first, 100), 0)
+
+        self.assertGreater(self.consume(second, 100), 0)
+        self.assertEqual(second.stats()['size'], 0)
+        self.assertEqual(
+            second.stats()['rejected'], {'recipes.read': 1}
+        )
+
+
+class TokenBucketThrottleApiTests(TestCase):
+    """Test throttling of the API endpoints"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @override_settings(API_THROTTLE=throttle_settings(**{
+        'recipes.read': '2/min', 'recipes.write': '1/min'
+    }))
+    def test_reads_and_writes_have_separate_buckets(self):
+        for _ in range(2):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        throttled = self.client.get(RECIPES_URL)
+        created = self.client.post(
+            RECIPES_URL, {'title': 'Kisiel', 'time_minutes': 5}
+        )
+
+        self.assertEqual(
+            throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        self.assertEqual(throttled['Retry-After'], '30')
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            throttling.bucket_store.stats()['rejected'], {'recipes.read': 1}
+        )
+
+    @override_settings(API_THROTTLE=throttle_settings(**{
+        'tags.read': '1/min'
+    }))
+    def test_users_have_separate_buckets(self):
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass'
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+
+        res = client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.client.get(TAGS_URL).status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+    @override_settings(API_THROTTLE=throttle_settings(**{
+        'user.write': '1/hour'
+    }))
+    def test_anonymous_requests_throttled_per_ip(self):
+        client = APIClient()
+        payload = {
+            'email': 'new@example.com', 'password': 'testpass', 'name': 'Ala'
+        }
+        client.post(CREATE_USER_URL, payload)
+
+        res = client.post(CREATE_USER_URL, payload)
+        elsewhere = client.post(
+            CREATE_USER_URL, dict(payload, email='new2@example.com'),
+            REMOTE_ADDR='10.0.0.2'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '3600')
+        self.assertEqual(elsewhere.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(API_THROTTLE=dict(
+        throttle_settings(**{'recipes.read': '1/min'}), ENABLED=False
+    ))
+    def test_disabled(self):
+        for _ in range(3):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,189 @@
+"""
+Token bucket rate limiting with an in-process store
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_options():
+    return getattr(settings, 'API_THROTTLE', {})
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Return (bucket size, tokens refilled per second) of e.g. '100/min'"""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period[0]]
+
+
+@functools.lru_cache(maxsize=None)
+def bucket_names(scope):
+    """Return the read and write bucket names of a scope"""
+    return f'{scope}.read', f'{scope}.write'
+
+
+class BucketStore:
+    """Token buckets kept in a bounded LRU with an optional shared tier
+
+    Buckets are (tokens, updated) pairs refilled lazily when they are
+    used. The least recently used bucket is dropped above `max_keys`; it
+    comes back full, as an idle bucket would be anyway. When
+    `shared_cache` names a Django cache alias the buckets are kept there
+    instead, so workers share them. Reads and writes of a shared bucket
+    are not atomic, so concurrent workers may let a few extra requests
+    through.
+    """
+
+    def __init__(self, max_keys=100000, shared_cache=None,
+                 key_prefix='throttle'):
+        self.max_keys = max_keys
+        self.shared_cache = shared_cache
+        self.key_prefix = key_prefix
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._allowed = defaultdict(int)
+        self._rejected = defaultdict(int)
+
+    @classmethod
+    def from_settings(cls):
+        options = get_options()
+        return cls(
+            max_keys=options.get('MAX_KEYS', 100000),
+            shared_cache=options.get('SHARED_CACHE'),
+        )
+
+    @staticmethod
+    def take(bucket, capacity, refill, now):
+        """Return the bucket after taking a token and the wait if empty"""
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) / refill
+
+    def _consume_shared(self, key, capacity, refill, now):
+        shared = caches[self.shared_cache]
+        key = f'{self.key_prefix}:{key}'
+        bucket, wait = self.take(shared.get(key), capacity, refill, now)
+        # po tym czasie kubełek i tak byłby pełny
+        shared.set(key, bucket, timeout=max(1, int(capacity / refill) + 1))
+        return wait
+
+    def consume(self, name, ident, capacity, refill):
+        """Take a token from the bucket, return 0 or seconds to wait"""
+        now = time.time()
+        if self.shared_cache is not None:
+            wait = self._consume_shared(
+                f'{name}:{ident}', capacity, refill, now
+            )
+            with self._lock:
+                (self._rejected if wait else self._allowed)[name] += 1
+            return wait
+
+        # take() rozpisane w miejscu, to jest gorąca ścieżka każdego żądania
+        key = (name, ident)
+        buckets = self._buckets
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+                if len(buckets) >= self.max_keys:
+                    buckets.popitem(last=False)
+            else:
+                tokens = bucket[0] + (now - bucket[1]) * refill
+                if tokens > capacity:
+                    tokens = capacity
+                buckets.move_to_end(key)
+            if tokens >= 1:
+                buckets[key] = (tokens - 1, now)
+                self._allowed[name] += 1
+                return 0
+            buckets[key] = (tokens, now)
+            self._rejected[name] += 1
+        return (1 - tokens) / refill
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._allowed.clear()
+            self._rejected.clear()
+
+    def stats(self):
+        """Return allowed and rejected requests per bucket name"""
+        with self._lock:
+            return {
+                'allowed': dict(self._allowed),
+                'rejected': dict(self._rejected),
+                'size': len(self._buckets),
+            }
+
+
+bucket_store = BucketStore.from_settings()
+
+
+@receiver(setting_changed)
+def reset_bucket_store(setting, **kwargs):
+    global bucket_store
+    if setting == 'API_THROTTLE':
+        bucket_store = BucketStore.from_settings()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle views with a `throttle_scope` using token buckets
+
+    Reads and writes of a scope use separate buckets, `<scope>.read` and
+    `<scope>.write`, whose rates come from API_THROTTLE['RATES']. Buckets
+    are kept per user, or per client IP for anonymous requests.
+    """
+
+    def get_bucket_name(self, request, view):
+        return bucket_names(view.throttle_scope)[
+            request._request.method not in SAFE_METHODS
+        ]
+
+    def get_client_ident(self, request):
+        # pk to int, adres IP to str, więc klucze się nie pokrywają
+        user = request.user
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return self.get_ident(request)
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        options = get_options()
+        if not options.get('ENABLED', True) or not getattr(
+            view, 'throttle_scope', None
+        ):
+            return True
+
+        name = self.get_bucket_name(request, view)
+        rate = options.get('RATES', {}).get(name)
+        if rate is None:
+            return True
+
+        capacity, refill = parse_rate(rate)
+        wait = bucket_store.consume(
+            name, self.get_client_ident(request), capacity, refill
+        )
+        if wait:
+            self.wait_seconds = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,45 @@
+"""
+Operational endpoints of the service
+"""
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET, require_safe
+
+from core import metrics
+from core.health import database_ping
+
+
+@require_GET
+def metrics_view(request):
+    """Serve the metrics of all worker processes in Prometheus format"""
+    if not metrics.get_options().get('ENABLED', True):
+        raise Http404
+    store = metrics.get_store()
+    store.collect()
+    return HttpResponse(
+        metrics.render(store.entries()), content_type=metrics.CONTENT_TYPE
+    )
+
+
+def database_status():
+    return 'ok' if database_ping.available() else 'unavailable'
+
+
+@require_safe
+def liveness_view(request):
+    """Report that the process serves requests
+
+    Always 200: restarting the process does not help when only the
+    database is down. The database state is informational.
+    """
+    return JsonResponse({'status': 'ok', 'database': database_status()})
+
+
+@require_safe
+def readiness_view(request):
+    """Report whether the process can serve API requests"""
+    database = database_status()
+    ready = database == 'ok'
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'database': database},
+        status=200 if ready else 503
+    )
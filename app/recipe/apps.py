@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class RecipeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipe'
+
+    def ready(self):
+        # rejestruje sygnały unieważniające cache i liczące statystyki
+        # oraz system checks
+        from recipe import cache, checks, stats  # noqa: F401
@@ -0,0 +1,75 @@
+"""
+Async recipe and tag read endpoints for ASGI deployments
+
+Django runs sync views under ASGI one at a time in a single shared thread.
+These views hand reads to the bounded `db` executor instead, so up to
+EXECUTORS['db']['MAX_WORKERS'] reads run in parallel, each on its own
+connection, and requests over the queue limit get 503 straight away.
+Writes keep Django's default thread-sensitive path.
+"""
+from asgiref.sync import sync_to_async
+
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+from rest_framework import status
+
+from core.executors import ExecutorBusy, get_executor
+from recipe.views import RecipeViewSet, TagViewSet
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def run_view(view, request, *args, **kwargs):
+    """Run a sync view in a worker thread like a request of its own"""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        # renderowanie w wątku executora zamiast w kolejnym przeskoku
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def busy_response():
+    response = JsonResponse(
+        {'detail': 'Server is busy, try again later.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+def async_view(viewset, actions):
+    """Wrap a viewset route in an async view reading through the executor"""
+    view = viewset.as_view(actions)
+    write = sync_to_async(view)
+
+    async def wrapped(request, *args, **kwargs):
+        if request.method not in READ_METHODS:
+            return await write(request, *args, **kwargs)
+        try:
+            return await get_executor('db').run(
+                run_view, view, request, *args, **kwargs
+            )
+        except ExecutorBusy:
+            return busy_response()
+
+    # csrf_exempt z Django 3.2 zamienia widok na synchroniczny
+    wrapped.csrf_exempt = True
+    # jak w widokach z as_view(), etykiety metryk biorą je z widoku
+    wrapped.cls = viewset
+    wrapped.actions = actions
+    return wrapped
+
+
+recipe_list = async_view(RecipeViewSet, {'get': 'list', 'post': 'create'})
+recipe_detail = async_view(RecipeViewSet, {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+})
+tag_list = async_view(TagViewSet, {'get': 'list'})
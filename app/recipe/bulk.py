@@ -0,0 +1,129 @@
+"""
+Set based writes of recipes and their tags
+"""
+from django.db import connection
+
+from core.models import Recipe, Tag
+from recipe import stats
+from recipe.cache import invalidate_user
+
+BATCH_SIZE = 1000
+
+
+def resolve_tags(user, names):
+    """Return {name: tag} for the names, creating missing tags in bulk
+
+    Missing tags are inserted with ON CONFLICT DO NOTHING against the
+    unique (user, name) constraint and read back, so a tag created by a
+    concurrent request is reused instead of duplicated.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    found = {tag.name: tag for tag in Tag.objects.filter(
+        user=user, name__in=names
+    )}
+    missing = [name for name in names if name not in found]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(user=user, name=name) for name in missing],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        found.update((tag.name, tag) for tag in Tag.objects.filter(
+            user=user, name__in=missing
+        ))
+        stats.refresh_tag_count(user.pk)
+
+    return found
+
+
+def _tag_names(tags):
+    return list(dict.fromkeys(tag['name'] for tag in tags))
+
+
+def _link_tags(recipe_tag_names, tags_by_name):
+    through = Recipe.tags.through
+    through.objects.bulk_create([
+        through(recipe_id=recipe_id, tag_id=tags_by_name[name].pk)
+        for recipe_id, names in recipe_tag_names
+        for name in names
+    ], batch_size=BATCH_SIZE)
+
+
+def bulk_create_recipes(user, items):
+    """Create recipes from validated data with a constant number of queries"""
+    tag_names = [_tag_names(item.pop('tags', [])) for item in items]
+    recipes = [Recipe(**dict(item, user=user)) for item in items]
+
+    tags_by_name = resolve_tags(
+        user, [name for names in tag_names for name in names]
+    )
+    with stats.paused():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        else:
+            # backend nie zwraca id z bulk insert
+            for recipe in recipes:
+                recipe.save(force_insert=True)
+
+    _link_tags(
+        [(recipe.pk, names) for recipe, names in zip(recipes, tag_names)],
+        tags_by_name
+    )
+    stats.recipes_added(user.pk, recipes)
+    stats.refresh_tag_counts([
+        tags_by_name[name].pk for name in set().union(*tag_names)
+    ])
+    invalidate_user(user.pk)
+    return recipes
+
+
+def bulk_update_recipes(user, changes):
+    """Apply (recipe, validated_data) pairs with bulk updates"""
+    fields = set()
+    tag_changes = []
+    for recipe, data in changes:
+        tags = data.pop('tags', None)
+        if tags is not None:
+            tag_changes.append((recipe.pk, _tag_names(tags)))
+        for attr, value in data.items():
+            setattr(recipe, attr, value)
+            fields.add(attr)
+
+    if fields:
+        Recipe.objects.bulk_update(
+            [recipe for recipe, _ in changes], fields, batch_size=BATCH_SIZE
+        )
+        if fields & {'time_minutes', 'price'}:
+            stats.refresh_user_stats(user.pk)
+
+    if tag_changes:
+        tags_by_name = resolve_tags(
+            user, [name for _, names in tag_changes for name in names]
+        )
+        links = Recipe.tags.through.objects.filter(
+            recipe_id__in=[recipe_id for recipe_id, _ in tag_changes]
+        )
+        tag_ids = set(links.values_list('tag_id', flat=True))
+        links.delete()
+        _link_tags(tag_changes, tags_by_name)
+        stats.refresh_tag_counts(tag_ids | {
+            tags_by_name[name].pk for _, names in tag_changes for name in names
+        })
+
+    invalidate_user(user.pk)
+    return [recipe for recipe, _ in changes]
+
+
+def bulk_delete_recipes(user, queryset):
+    """Delete the user's recipes and recount the stats once"""
+    tag_ids = set(Recipe.tags.through.objects.filter(
+        recipe__in=queryset
+    ).values_list('tag_id', flat=True))
+    with stats.paused():
+        queryset.delete()
+    stats.refresh_user_stats(user.pk)
+    stats.refresh_tag_counts(tag_ids)
+    invalidate_user(user.pk)
@@ -0,0 +1,147 @@
+"""
+Per-user versioned cache for recipe API responses
+
+Every user has a version number that is bumped whenever one of their
+recipes, tags or recipe-tag links changes. Cached responses are keyed by
+that version, so a write makes all earlier entries unreachable. The same
+version is used to compute strong ETags without serializing the response.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import parse_etags, quote_etag
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core import metrics
+from core.models import Recipe, Tag
+
+VERSION_KEY = 'recipe-api:version:{}'
+METRIC_LABELS = {
+    result: (('cache', 'recipe_api'), ('result', result))
+    for result in ('hit', 'miss', 'not_modified')
+}
+
+
+def get_options():
+    return getattr(settings, 'RECIPE_API_CACHE', {})
+
+
+def get_cache():
+    return caches[get_options().get('ALIAS', 'default')]
+
+
+def get_user_version(user_id):
+    """Return the current cache version of the user's data"""
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # startuje od znacznika czasu, żeby po utracie klucza wersja
+        # nie powtórzyła się
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_user_version(user_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id):
+    """Bump the user's version now and again after the transaction commits
+
+    The second bump drops anything a concurrent reader cached from data
+    that was read before this write became visible.
+    """
+    bump_user_version(user_id)
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_owner(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
+
+
+class CachedResponseMixin:
+    """Shared conditional GET and cache logic for list and retrieve"""
+
+    def get_response_cache_key(self, request, version):
+        digest = hashlib.sha1('{}|{}'.format(
+            request.build_absolute_uri(), request.META.get('HTTP_ACCEPT', '')
+        ).encode()).hexdigest()
+        return 'recipe-api:{}:{}:{}:{}:{}'.format(
+            type(self).__name__, self.action, request.user.pk, version, digest
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        version = get_user_version(request.user.pk)
+        key = self.get_response_cache_key(request, version)
+        etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and etag in parse_etags(if_none_match):
+            metrics.increment(
+                'cache_requests_total', METRIC_LABELS['not_modified']
+            )
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+            )
+
+        options = get_options()
+        enabled = options.get('ENABLED', True)
+        data = get_cache().get(key) if enabled else None
+        if data is not None:
+            metrics.increment('cache_requests_total', METRIC_LABELS['hit'])
+            response = Response(data)
+        else:
+            if enabled:
+                metrics.increment(
+                    'cache_requests_total', METRIC_LABELS['miss']
+                )
+            response = handler(request, *args, **kwargs)
+            if enabled and response.status_code == status.HTTP_200_OK:
+                get_cache().set(
+                    key, response.data, options.get('TIMEOUT', 300)
+                )
+
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Serve conditional and cached list responses"""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Serve conditional and cached retrieve responses"""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,31 @@
+"""
+System checks of the recipe API settings
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from recipe.cache import get_options
+
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register(Tags.caches)
+def check_response_cache_backend(app_configs, **kwargs):
+    """Refuse a process local RECIPE_API_CACHE with several workers
+
+    User versions live in that cache, so a write in one worker would not
+    reach the others and they would keep serving stale responses and 304s.
+    """
+    if getattr(settings, 'WEB_CONCURRENCY', 1) <= 1:
+        return []
+    alias = get_options().get('ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_BACKENDS:
+        return []
+    return [Error(
+        f"RECIPE_API_CACHE uses the process local cache '{alias}' "
+        f"({backend}) with WEB_CONCURRENCY={settings.WEB_CONCURRENCY}.",
+        hint='Point RECIPE_API_CACHE ALIAS at a cache shared by all '
+             'workers, e.g. memcached or the database cache.',
+        id='recipe.E001',
+    )]
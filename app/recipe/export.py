@@ -0,0 +1,64 @@
+"""
+Streaming export of a user's recipes
+"""
+import csv
+import io
+
+from rest_framework.utils import encoders
+
+CSV_FIELDS = (
+    'id', 'title', 'description', 'time_minutes', 'price', 'link', 'tags'
+)
+TAG_SEPARATOR = '|'
+
+
+def iter_chunks(queryset, chunk_size, prepare=None):
+    """Yield lists of recipes walking the id index from the newest one
+
+    Every chunk is a separate keyset query, so memory use and the cost of
+    each step do not depend on how many recipes the user has.
+    """
+    queryset = queryset.order_by('-id')
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(id__lt=last_id)
+        page = page[:chunk_size]
+        if prepare is not None:
+            page = prepare(page)
+        chunk = list(page)
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def ndjson_lines(chunks, serializer_class):
+    encoder = encoders.JSONEncoder(ensure_ascii=False)
+    for chunk in chunks:
+        data = serializer_class(chunk, many=True).data
+        yield ''.join(
+            encoder.encode(item) + '\n' for item in data
+        ).encode()
+
+
+def csv_lines(chunks, serializer_class):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    yield buffer.getvalue().encode()
+
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for item in serializer_class(chunk, many=True).data:
+            row = dict(item, tags=TAG_SEPARATOR.join(
+                tag['name'] for tag in item['tags']
+            ))
+            writer.writerow([row.get(field) for field in CSV_FIELDS])
+        yield buffer.getvalue().encode()
+
+
+EXPORTERS = {
+    'ndjson': ndjson_lines,
+    'csv': csv_lines,
+}
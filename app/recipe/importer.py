@@ -0,0 +1,175 @@
+"""
+Streaming import of recipes from NDJSON or CSV files
+"""
+import csv
+import json
+import logging
+from itertools import islice
+
+from django.db import transaction
+
+from rest_framework.exceptions import ValidationError
+
+from recipe.bulk import bulk_create_recipes
+from recipe.export import TAG_SEPARATOR
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('ndjson', 'csv')
+CSV_OPTIONAL_FIELDS = ('description', 'price', 'link')
+INVALID_UTF8 = {'non_field_errors': ['Invalid UTF-8.']}
+
+
+def guess_format(name):
+    return 'csv' if name and name.lower().endswith('.csv') else 'ndjson'
+
+
+def _csv_record(row):
+    record = {
+        'title': row.get('title'),
+        'time_minutes': row.get('time_minutes'),
+        'tags': [
+            {'name': name}
+            for name in (row.get('tags') or '').split(TAG_SEPARATOR) if name
+        ],
+    }
+    for field in CSV_OPTIONAL_FIELDS:
+        if row.get(field):
+            record[field] = row[field]
+    return record
+
+
+class Utf8Lines:
+    """Decode the lines of a binary stream, remembering invalid ones
+
+    Lines that are not valid UTF-8 are decoded with replacement characters
+    and their numbers kept in `invalid`, so the records read from them can
+    be reported instead of stopping the whole import.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.invalid = set()
+
+    def __iter__(self):
+        for number, raw in enumerate(self.stream, 1):
+            try:
+                yield raw.decode('utf-8')
+            except UnicodeDecodeError:
+                self.invalid.add(number)
+                yield raw.decode('utf-8', 'replace')
+
+    def any_invalid(self, first, last):
+        """Return whether a line in first..last was invalid, forgetting them"""
+        found = False
+        for number in range(first, last + 1):
+            if number in self.invalid:
+                self.invalid.discard(number)
+                found = True
+        return found
+
+
+def iter_records(stream, file_format):
+    """Yield (line, data, error) for every record of a binary stream
+
+    The stream is decoded lazily, so only the current line is in memory.
+    """
+    lines = Utf8Lines(stream)
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        first = 1
+        for row in reader:
+            # rekord CSV może zajmować kilka linii
+            if lines.any_invalid(first, reader.line_num):
+                yield reader.line_num, None, INVALID_UTF8
+            else:
+                yield reader.line_num, _csv_record(row), None
+            first = reader.line_num + 1
+        return
+
+    for line, raw in enumerate(lines, 1):
+        if lines.any_invalid(line, line):
+            yield line, None, INVALID_UTF8
+            continue
+        if not raw.strip():
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError as exc:
+            yield line, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(data, dict):
+            yield line, None, {'non_field_errors': ['Expected an object.']}
+            continue
+        data.pop('id', None)
+        yield line, data, None
+
+
+def import_recipes(user, records, serializer, batch_size=1000,
+                   max_errors=100):
+    """Validate and write records in batches, yielding progress after each
+
+    `serializer` is an unbound recipe serializer instance reused to validate
+    every record. Each valid batch is written in its own transaction with
+    bulk inserts; invalid records are skipped and reported by line. The
+    import is not atomic: when it stops early, the batches counted in the
+    last progress are saved and the rest are not.
+    """
+    progress = {'processed': 0, 'created': 0, 'failed': 0, 'errors': []}
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+
+        valid = []
+        for line, data, errors in batch:
+            if errors is None:
+                try:
+                    valid.append(serializer.run_validation(data))
+                    continue
+                except ValidationError as exc:
+                    errors = exc.detail
+            progress['failed'] += 1
+            if len(progress['errors']) < max_errors:
+                progress['errors'].append({'line': line, 'errors': errors})
+
+        if valid:
+            with transaction.atomic():
+                bulk_create_recipes(user, valid)
+
+        progress['processed'] += len(batch)
+        progress['created'] += len(valid)
+        yield progress
+
+
+def progress_lines(progress):
+    """Render import progress as NDJSON, ending with a summary line
+
+    The summary has `done` false and an `error` when the import failed
+    part way; `created` then counts the recipes that were saved.
+    """
+    last = {'processed': 0, 'created': 0, 'failed': 0, 'errors': []}
+    try:
+        for last in progress:
+            yield json.dumps({
+                key: value for key, value in last.items() if key != 'errors'
+            }).encode() + b'\n'
+    except GeneratorExit:
+        # klient się rozłączył, zapisane partie zostają
+        logger.warning(
+            'Import interrupted after %(processed)s records, '
+            '%(created)s recipes saved', last
+        )
+        raise
+    except Exception:
+        logger.exception(
+            'Import failed after %(processed)s records, '
+            '%(created)s recipes saved', last
+        )
+        yield json.dumps(dict(
+            last, done=False, error='Import failed, only the recipes '
+            'counted in created were saved.'
+        )).encode() + b'\n'
+        return
+    yield json.dumps(dict(last, done=True)).encode() + b'\n'
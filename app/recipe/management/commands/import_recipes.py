@@ -0,0 +1,49 @@
+"""
+Django command to import recipes from an NDJSON or CSV file
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import FORMATS, guess_format, import_recipes, iter_records
+from recipe.serializers import RecipeDetailSerializer
+
+
+class Command(BaseCommand):
+    """Stream a recipe file into the library of a user"""
+    help = 'Import recipes from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True,
+                            help='Owner of the imported recipes')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["email"]} does not exist')
+
+        file_format = options['format'] or guess_format(options['path'])
+        progress = {'processed': 0, 'created': 0, 'failed': 0, 'errors': []}
+        with open(options['path'], 'rb') as stream:
+            for progress in import_recipes(
+                user,
+                iter_records(stream, file_format),
+                RecipeDetailSerializer(),
+                batch_size=options['batch_size'],
+            ):
+                self.stdout.write(
+                    'Processed {processed}, created {created}, '
+                    'failed {failed}'.format(**progress)
+                )
+
+        for error in progress['errors']:
+            self.stderr.write(f'line {error["line"]}: '
+                              f'{json.dumps(error["errors"])}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {progress["created"]} recipes'
+        ))
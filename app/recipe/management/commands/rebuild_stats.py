@@ -0,0 +1,40 @@
+"""
+Django command to rebuild tag recipe counts and user statistics
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    """Recompute denormalized stats from scratch and report any drift"""
+    help = 'Rebuild tag recipe counts and user stats, reporting drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report drift, do not fix it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = rebuild_stats(dry_run=options['dry_run'])
+
+        for row in drift:
+            fields = ', '.join(
+                f'{name} {stored} != {expected}'
+                for name, value in row.items()
+                if isinstance(value, tuple)
+                for stored, expected in [value]
+            ) or 'missing'
+            self.stdout.write(f'{row["model"]} {row["pk"]}: {fields}')
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('No drift found'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'{len(drift)} rows drifted'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {len(drift)} drifted rows'
+            ))
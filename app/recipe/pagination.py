@@ -0,0 +1,29 @@
+"""
+Pagination classes for the recipe API
+"""
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeApiCursorPagination(CursorPagination):
+    """Keyset pagination with opaque cursors and no COUNT(*) query"""
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class RecipeCursorPagination(RecipeApiCursorPagination):
+    """Paginate recipes newest first, or by rank when searching"""
+    ordering = ('-id',)
+    search_ordering = ('-rank', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+
+class TagCursorPagination(RecipeApiCursorPagination):
+    """Paginate tags by name, using id to break ties"""
+    ordering = ('-name', 'id')
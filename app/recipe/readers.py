@@ -0,0 +1,182 @@
+"""
+Read-only serialization of recipes straight from database rows
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from core.instrumentation import phase
+
+# kolejność tagów receptury, wspólna dla prefetch i ścieżki z wierszy
+TAG_ORDERING = ('name', 'id')
+
+
+def scalar_field(serializer_class, name, field):
+    """Return (name, source, to_representation) of a plain field"""
+    if isinstance(field, serializers.BaseSerializer) or (
+        len(field.source_attrs) != 1
+    ):
+        raise ImproperlyConfigured(
+            f'{serializer_class.__name__}.{name} cannot be read from rows.'
+        )
+    return name, field.source, field.to_representation
+
+
+def readable_fields(serializer):
+    return [
+        (name, field) for name, field in serializer.fields.items()
+        if not field.write_only
+    ]
+
+
+class RowSerializer:
+    """Build the output of a model serializer from `.values()` rows
+
+    Plain fields are read from the rows and nested many-to-many serializers
+    from one query on the link table per relation, so neither model
+    instances nor bound serializers are created. Every value still goes
+    through its field's `to_representation`, which keeps the output
+    identical to the serializer's. `fields` limits the output to the given
+    names.
+    """
+
+    def __init__(self, serializer_class, ordering=None, fields=None):
+        ordering = ordering or {}
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.pk = model._meta.pk.attname
+        self.fields = []
+        self.relations = []
+        for name, field in readable_fields(serializer):
+            if fields is not None and name not in fields:
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                relation = model._meta.get_field(field.source)
+                if not relation.many_to_many or relation.auto_created:
+                    raise ImproperlyConfigured(
+                        f'{serializer_class.__name__}.{name} is not a '
+                        'many-to-many field of the model.'
+                    )
+                self.fields.append((name, None, None))
+                self.relations.append((
+                    name, relation, [
+                        scalar_field(type(field.child), *child)
+                        for child in readable_fields(field.child)
+                    ], ordering.get(name, ())
+                ))
+            else:
+                self.fields.append(
+                    scalar_field(serializer_class, name, field)
+                )
+        self.columns = [
+            source for _, source, _ in self.fields if source is not None
+        ]
+        if self.pk not in self.columns:
+            self.columns.append(self.pk)
+
+    def related(self, relation, fields, ordering, ids):
+        """Map row pks to the nested representations of a relation"""
+        source = relation.m2m_field_name()
+        target = relation.m2m_reverse_field_name()
+        links = relation.remote_field.through.objects.filter(**{
+            f'{source}_id__in': ids
+        }).order_by(
+            *(f'{target}__{name}' for name in ordering)
+        ).values_list(
+            f'{source}_id', *(f'{target}__{field}' for _, field, _ in fields)
+        )
+
+        result = {pk: [] for pk in ids}
+        for pk, *values in links:
+            result[pk].append({
+                name: None if value is None else to_representation(value)
+                for (name, _, to_representation), value in zip(fields, values)
+            })
+        return result
+
+    def to_representation(self, rows):
+        """Return the serialized list of rows"""
+        ids = [row[self.pk] for row in rows]
+        related = {
+            name: self.related(relation, fields, ordering, ids)
+            for name, relation, fields, ordering in self.relations
+        } if ids else {}
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, to_representation in self.fields:
+                if source is None:
+                    item[name] = related[name][row[self.pk]]
+                    continue
+                value = row[source]
+                item[name] = (
+                    None if value is None else to_representation(value)
+                )
+            data.append(item)
+        return data
+
+
+class RowReadMixin:
+    """Serve list and retrieve from `.values()` rows
+
+    Set `row_reads = False` to fall back to the regular serializers.
+    """
+    row_reads = True
+    row_ordering = {}
+
+    def get_row_fields(self):
+        """Names of the fields to serialize, None for all"""
+        return None
+
+    def get_row_serializer(self):
+        serializer_class = self.get_serializer_class()
+        fields = self.get_row_fields()
+        key = (serializer_class, fields and tuple(fields))
+        cache = type(self).__dict__.get('_row_serializers')
+        if cache is None:
+            cache = type(self)._row_serializers = {}
+        if key not in cache:
+            cache[key] = RowSerializer(
+                serializer_class, self.row_ordering, fields
+            )
+        return cache[key]
+
+    def get_rows(self, row_serializer):
+        """Return the filtered queryset as rows, keeping its annotations"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset.prefetch_related(None).values(
+            *row_serializer.columns, *queryset.query.annotations
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.row_reads:
+            return super().list(request, *args, **kwargs)
+
+        row_serializer = self.get_row_serializer()
+        rows = self.get_rows(row_serializer)
+        page = self.paginate_queryset(rows)
+        with phase('serialize'):
+            data = row_serializer.to_representation(
+                list(rows) if page is None else page
+            )
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.row_reads:
+            return super().retrieve(request, *args, **kwargs)
+
+        row_serializer = self.get_row_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.get_rows(row_serializer),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        self.check_object_permissions(request, row)
+        with phase('serialize'):
+            data = row_serializer.to_representation([row])[0]
+        return Response(data)
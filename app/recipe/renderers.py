@@ -0,0 +1,31 @@
+"""
+Renderers for the streaming recipe export formats
+"""
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Newline delimited JSON
+
+    Export responses are streamed and never go through `render`; it is only
+    used for error responses such as 401 or 406.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(
+            data, cls=encoders.JSONEncoder, ensure_ascii=False
+        ).encode() + b'\n'
+
+
+class CSVRenderer(NDJSONRenderer):
+    """Comma separated values, one recipe per row"""
+    media_type = 'text/csv'
+    format = 'csv'
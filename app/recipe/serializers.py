@@ -1,44 +1,85 @@
+from django.db import transaction
+
 from rest_framework import serializers
 
+from core.instrumentation import TimedListSerializer, TimedSerializerMixin
 from core.models import Recipe
 from core.models import Tag
+from core.models import UserStats
+from recipe.bulk import bulk_create_recipes, resolve_tags
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
         model = Tag
+        fields = ('id', 'name', 'recipe_count')
+        read_only_fields = ('id', 'recipe_count')
+        list_serializer_class = TimedListSerializer
+
+    def validate_name(self, value):
+        # tylko przy zmianie nazwy istniejącego taga, zagnieżdżone tagi
+        # receptur są rozwiązywane po nazwie
+        if self.instance is not None and Tag.objects.filter(
+            user=self.instance.user_id, name=value
+        ).exclude(pk=self.instance.pk).exists():
+            raise serializers.ValidationError('Tag with this name exists.')
+        return value
+
+
+class RecipeTagSerializer(TagSerializer):
+    """Serializer for tags nested in recipes"""
+
+    class Meta(TagSerializer.Meta):
         fields = ('id', 'name')
         read_only_fields = ('id',)
 
-class RecipeSerializer(serializers.ModelSerializer):
+
+class RecipeListSerializer(TimedListSerializer):
+    """Create many recipes with bulk inserts"""
+
+    def create(self, validated_data):
+        for item in validated_data:
+            item.pop('user', None)
+        with transaction.atomic():
+            return bulk_create_recipes(
+                self.context['request'].user, validated_data
+            )
+
+
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for recipe object"""
-    tags = TagSerializer(many=True, required=False)
+    tags = RecipeTagSerializer(many=True, required=False)
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'time_minutes', 'price', 'link', 'tags')
         read_only_fields = ('id',)
+        list_serializer_class = RecipeListSerializer
+
+    def _resolve_tags(self, tags):
+        """Return tag objects for the payload, creating missing ones in bulk"""
+        names = [tag['name'] for tag in tags]
+        found = resolve_tags(self.context['request'].user, names)
+        return list(found.values())
 
     def _get_or_create_tags(self, tags, recipe):
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, is_created = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
+        recipe.tags.add(*self._resolve_tags(tags))
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         recipe = Recipe.objects.create(**validated_data)
         self._get_or_create_tags(tags, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._resolve_tags(tags))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -53,3 +94,18 @@ class RecipeDetailSerializer(RecipeSerializer):
         read_only_fields = RecipeSerializer.Meta.read_only_fields
 
 
+class UserStatsSerializer(TimedSerializerMixin,
+                          serializers.ModelSerializer):
+    """Serializer for the user's library statistics"""
+    avg_time_minutes = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = UserStats
+        fields = (
+            'recipe_count',
+            'tag_count',
+            'avg_time_minutes',
+            'min_price',
+            'max_price',
+        )
+        read_only_fields = fields
@@ -0,0 +1,84 @@
+"""
+Sparse fieldsets selected with the `fields` query parameter
+"""
+from drf_spectacular.utils import OpenApiParameter
+
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+
+
+def readable_field_names(serializer_class):
+    return [
+        name for name, field in serializer_class().fields.items()
+        if not field.write_only
+    ]
+
+
+def fields_parameter(serializer_class):
+    """Document the `fields` parameter of an action in the schema"""
+    return OpenApiParameter(
+        name=FIELDS_PARAM,
+        description='Comma separated fields to return, one of: {}. '
+                    'All fields are returned by default.'.format(
+                        ', '.join(readable_field_names(serializer_class))
+                    ),
+    )
+
+
+def parse_fields(value, available):
+    """Return the requested names in serializer order, None for all"""
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    if not names:
+        return None
+    unknown = names.difference(available)
+    if unknown:
+        raise ValidationError({FIELDS_PARAM: [
+            f'Unknown fields: {", ".join(sorted(unknown))}.'
+        ]})
+    return [name for name in available if name in names]
+
+
+class SparseFieldsMixin:
+    """Trim read responses to `?fields=` and load only the needed columns
+
+    Fields in `sparse_required_fields` are always loaded (the pagination
+    cursor reads them) but still only returned when requested.
+    """
+    sparse_actions = ('list', 'retrieve')
+    sparse_required_fields = ('id',)
+
+    def get_sparse_fields(self):
+        """Names of the requested fields, None when all are returned"""
+        if self.action not in self.sparse_actions:
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = parse_fields(
+                self.request.query_params.get(FIELDS_PARAM, ''),
+                readable_field_names(self.get_serializer_class())
+            )
+        return self._sparse_fields
+
+    def only_sparse_fields(self, queryset):
+        """Defer the model columns no requested field is read from"""
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+
+        serializer_fields = self.get_serializer_class()().fields
+        model_fields = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        columns = {
+            serializer_fields[name].source for name in fields
+        }.union(self.sparse_required_fields)
+        return queryset.only(*sorted(columns & model_fields))
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            trimmed = getattr(serializer, 'child', serializer)
+            for name in set(trimmed.fields).difference(fields):
+                trimmed.fields.pop(name)
+        return serializer
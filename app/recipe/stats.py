@@ -0,0 +1,277 @@
+"""
+Denormalized tag recipe counts and per-user library statistics
+
+`Tag.recipe_count` and `UserStats` are updated incrementally from model
+signals. Bulk writes bypass most signals, so they pause the receivers and
+recount only the rows they touched with `refresh_user_stats` and
+`refresh_tag_counts`. `rebuild_stats` recomputes everything from scratch.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import (
+    Count,
+    DecimalField,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, UserStats
+
+USER_STATS_FIELDS = (
+    'recipe_count', 'tag_count', 'time_minutes_total', 'min_price', 'max_price'
+)
+
+_paused = ContextVar('recipe_stats_paused', default=False)
+
+
+@contextmanager
+def paused():
+    """Skip the incremental receivers, the caller refreshes afterwards"""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def _grouped(queryset, field, aggregate):
+    return Subquery(queryset.order_by().values(field).annotate(
+        value=aggregate
+    ).values('value'))
+
+
+def _price_range():
+    recipes = Recipe.objects.filter(user_id=OuterRef('user_id'))
+    return {
+        'min_price': _grouped(recipes, 'user_id', Min('price')),
+        'max_price': _grouped(recipes, 'user_id', Max('price')),
+    }
+
+
+def user_stats_expressions():
+    """Expressions computing every `UserStats` field from scratch"""
+    recipes = Recipe.objects.filter(user_id=OuterRef('user_id'))
+    tags = Tag.objects.filter(user_id=OuterRef('user_id'))
+    return dict(
+        recipe_count=Coalesce(_grouped(recipes, 'user_id', Count('id')), 0),
+        tag_count=Coalesce(_grouped(tags, 'user_id', Count('id')), 0),
+        time_minutes_total=Coalesce(
+            _grouped(recipes, 'user_id', Sum('time_minutes')), 0
+        ),
+        **_price_range()
+    )
+
+
+def tag_recipe_count_expression():
+    links = Recipe.tags.through.objects.filter(tag_id=OuterRef('pk'))
+    return Coalesce(_grouped(links, 'tag_id', Count('recipe_id')), 0)
+
+
+def refresh_user_stats(user_id):
+    UserStats.objects.filter(user_id=user_id).update(
+        **user_stats_expressions()
+    )
+
+
+def refresh_tag_count(user_id):
+    UserStats.objects.filter(user_id=user_id).update(
+        tag_count=user_stats_expressions()['tag_count']
+    )
+
+
+def refresh_tag_counts(tag_ids):
+    if tag_ids:
+        Tag.objects.filter(pk__in=tag_ids).update(
+            recipe_count=tag_recipe_count_expression()
+        )
+
+
+def recipes_added(user_id, recipes):
+    """Add new recipes to the user's stats with a single update"""
+    if not recipes:
+        return
+    prices = [recipe.price for recipe in recipes if recipe.price is not None]
+    changes = {
+        'recipe_count': F('recipe_count') + len(recipes),
+        'time_minutes_total': F('time_minutes_total') + sum(
+            int(recipe.time_minutes) for recipe in recipes
+        ),
+    }
+    if prices:
+        # bez Cast sqlite porównuje parametry jako tekst ('10.00' < '9.50')
+        price_field = DecimalField(max_digits=5, decimal_places=2)
+        low = Cast(Value(min(prices)), price_field)
+        high = Cast(Value(max(prices)), price_field)
+        changes['min_price'] = Least(Coalesce('min_price', low), low)
+        changes['max_price'] = Greatest(Coalesce('max_price', high), high)
+    UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def rebuild_stats(dry_run=False):
+    """Recompute all counts and stats, returning the rows that drifted
+
+    Every drift is a dict with the `model`, the `pk` and, per differing
+    field, a `(stored, expected)` pair.
+    """
+    missing = list(get_user_model().objects.filter(
+        stats__isnull=True
+    ).values_list('pk', flat=True))
+    if not dry_run:
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in missing], batch_size=1000
+        )
+    drift = [
+        {'model': 'userstats', 'pk': pk, 'missing': True} for pk in missing
+    ]
+
+    expected = {f'expected_{name}': expr
+                for name, expr in user_stats_expressions().items()}
+    for row in UserStats.objects.annotate(**expected).values(
+        'pk', *USER_STATS_FIELDS, *expected
+    ).iterator():
+        fields = {
+            name: (row[name], row[f'expected_{name}'])
+            for name in USER_STATS_FIELDS
+            if row[name] != row[f'expected_{name}']
+        }
+        if fields:
+            drift.append({'model': 'userstats', 'pk': row['pk'], **fields})
+
+    for row in Tag.objects.annotate(
+        expected=tag_recipe_count_expression()
+    ).exclude(recipe_count=F('expected')).values(
+        'pk', 'recipe_count', 'expected'
+    ).iterator():
+        drift.append({
+            'model': 'tag',
+            'pk': row['pk'],
+            'recipe_count': (row['recipe_count'], row['expected']),
+        })
+
+    if not dry_run:
+        UserStats.objects.update(**user_stats_expressions())
+        Tag.objects.update(recipe_count=tag_recipe_count_expression())
+    return drift
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.create(user=instance)
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_recipe_values(sender, instance, update_fields=None, **kwargs):
+    instance._stats_previous = None
+    if _paused.get() or instance._state.adding:
+        return
+    if update_fields is not None and not {
+        'time_minutes', 'price'
+    } & set(update_fields):
+        return
+    instance._stats_previous = Recipe.objects.filter(pk=instance.pk).values(
+        'time_minutes', 'price'
+    ).first()
+
+
+@receiver(post_save, sender=Recipe)
+def update_stats_on_recipe_save(sender, instance, created, **kwargs):
+    if _paused.get():
+        return
+    if created:
+        recipes_added(instance.user_id, [instance])
+        return
+
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is None:
+        return
+    changes = {}
+    delta = int(instance.time_minutes) - previous['time_minutes']
+    if delta:
+        changes['time_minutes_total'] = F('time_minutes_total') + delta
+    if instance.price != previous['price']:
+        changes.update(_price_range())
+    if changes:
+        UserStats.objects.filter(user_id=instance.user_id).update(**changes)
+
+
+@receiver(pre_delete, sender=Recipe)
+def update_tag_counts_on_recipe_delete(sender, instance, **kwargs):
+    # linki znikają razem z recepturą bez sygnału m2m_changed
+    if not _paused.get():
+        Tag.objects.filter(recipe=instance).update(
+            recipe_count=F('recipe_count') - 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def update_stats_on_recipe_delete(sender, instance, **kwargs):
+    if _paused.get():
+        return
+    changes = {
+        'recipe_count': F('recipe_count') - 1,
+        'time_minutes_total': F('time_minutes_total') - instance.time_minutes,
+    }
+    if instance.price is not None:
+        changes.update(_price_range())
+    UserStats.objects.filter(user_id=instance.user_id).update(**changes)
+
+
+@receiver(post_save, sender=Tag)
+def update_stats_on_tag_create(sender, instance, created, **kwargs):
+    if created and not _paused.get():
+        UserStats.objects.filter(user_id=instance.user_id).update(
+            tag_count=F('tag_count') + 1
+        )
+
+
+@receiver(post_delete, sender=Tag)
+def update_stats_on_tag_delete(sender, instance, **kwargs):
+    if not _paused.get():
+        UserStats.objects.filter(user_id=instance.user_id).update(
+            tag_count=F('tag_count') - 1
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tag_counts_on_link_change(sender, instance, action, reverse,
+                                     pk_set, **kwargs):
+    if _paused.get():
+        return
+    if action == 'pre_clear':
+        instance._stats_cleared_tags = (
+            [instance.pk] if reverse
+            else list(instance.tags.values_list('pk', flat=True))
+        )
+    elif action == 'post_clear':
+        refresh_tag_counts(getattr(instance, '_stats_cleared_tags', []))
+    elif action == 'post_add' and pk_set:
+        # Django przekazuje tu tylko nowo dodane linki
+        if reverse:
+            Tag.objects.filter(pk=instance.pk).update(
+                recipe_count=F('recipe_count') + len(pk_set)
+            )
+        else:
+            Tag.objects.filter(pk__in=pk_set).update(
+                recipe_count=F('recipe_count') + 1
+            )
+    elif action == 'post_remove' and pk_set:
+        # pk_set może zawierać tagi, które nie były podpięte
+        refresh_tag_counts([instance.pk] if reverse else pk_set)
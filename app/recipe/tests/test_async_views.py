@@ -0,0 +1,183 @@
+"""
+Tests for the async recipe and tag read endpoints
+"""
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.executors import get_executor
+from core.handlers import ASGIHandler
+from core.models import Recipe, Tag
+from recipe import async_views
+
+RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+IMPORT_URL = reverse('recipe:recipe-import')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(ROOT_URLCONF='app.urls_async', EXECUTORS=dict(
+    settings.EXECUTORS, db={'MAX_WORKERS': 2, 'MAX_PENDING': 0}
+))
+class AsyncReadApiTests(TransactionTestCase):
+    """Test recipe and tag reads served by async views"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+
+    def get(self, url):
+        return asyncio.run(self.client.get(
+            url, authorization=f'Token {self.token.key}'
+        ))
+
+    def test_reads_run_in_db_executor(self):
+        threads = []
+        run_view = async_views.run_view
+
+        def record_thread(view, request, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return run_view(view, request, *args, **kwargs)
+
+        with patch.object(async_views, 'run_view', record_thread):
+            for url in (RECIPES_URL, detail_url(self.recipe.id), TAGS_URL):
+                res = self.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(threads), 3)
+        self.assertTrue(all(name.startswith('db') for name in threads))
+
+    def test_async_responses_match_sync_views(self):
+        for url in (RECIPES_URL, detail_url(self.recipe.id), TAGS_URL):
+            res = self.get(url)
+            cache.clear()
+            with override_settings(ROOT_URLCONF='app.urls'):
+                client = APIClient()
+                client.credentials(
+                    HTTP_AUTHORIZATION=f'Token {self.token.key}'
+                )
+                expected = client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.content, expected.content)
+
+    def test_write_falls_back_to_sync_view(self):
+        res = asyncio.run(self.client.post(
+            RECIPES_URL,
+            {'title': 'Cake', 'time_minutes': 30},
+            content_type='application/json',
+            authorization=f'Token {self.token.key}'
+        ))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Recipe.objects.filter(title='Cake').exists())
+
+    def test_unauthenticated_read_rejected(self):
+        res = asyncio.run(self.client.get(RECIPES_URL))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_busy_executor_returns_503(self):
+        executor = get_executor('db')
+        release = threading.Event()
+        blockers = [executor.submit(release.wait) for _ in range(2)]
+        try:
+            res = self.get(RECIPES_URL)
+        finally:
+            release.set()
+            for blocker in blockers:
+                blocker.result()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+
+class AsgiStreamingTests(TransactionTestCase):
+    """Test streaming export and import served through the ASGI handler"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def request(self, method, url, query='', body=b'', content_type=None):
+        headers = [
+            (b'host', b'testserver'),
+            (b'authorization', f'Token {self.token.key}'.encode()),
+            (b'content-length', str(len(body)).encode()),
+        ]
+        if content_type:
+            headers.append((b'content-type', content_type.encode()))
+        scope = {
+            'type': 'http', 'method': method, 'path': url,
+            'query_string': query.encode(), 'headers': headers,
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(ASGIHandler()(scope, receive, send))
+        self.assertFalse(messages[-1].get('more_body'))
+        return messages[0]['status'], b''.join(
+            message.get('body', b'') for message in messages[1:]
+        ).decode()
+
+    def test_export(self):
+        for i in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f'Soup {i}', time_minutes=10
+            )
+
+        status_code, body = self.request('GET', EXPORT_URL, 'format=ndjson')
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [json.loads(line)['title'] for line in body.splitlines()],
+            ['Soup 2', 'Soup 1', 'Soup 0']
+        )
+
+    def test_import(self):
+        upload = SimpleUploadedFile('recipes.ndjson', b'\n'.join(
+            json.dumps({'title': f'Soup {i}', 'time_minutes': 5}).encode()
+            for i in range(3)
+        ))
+
+        status_code, body = self.request(
+            'POST', IMPORT_URL,
+            body=encode_multipart(BOUNDARY, {'file': upload}),
+            content_type=MULTIPART_CONTENT,
+        )
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(body.splitlines()[-1])['created'], 3)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
@@ -0,0 +1,247 @@
+"""
+Tests for the bulk recipe endpoint
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.bulk import resolve_tags
+
+BULK_URL = reverse('recipe:recipe-bulk')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Sample Recipe', 'time_minutes': 10}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test creating, updating and deleting recipes in bulk"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_with_tags(self):
+        Tag.objects.create(user=self.user, name='vegan')
+        payload = [
+            {
+                'title': 'Soup',
+                'time_minutes': 20,
+                'price': Decimal('4.50'),
+                'tags': [{'name': 'vegan'}, {'name': 'lunch'}]
+            },
+            {'title': 'Cake', 'time_minutes': 60, 'tags': [{'name': 'lunch'}]},
+            {'title': 'Toast', 'time_minutes': 5},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        soup = Recipe.objects.get(user=self.user, title='Soup')
+        self.assertEqual(
+            sorted(soup.tags.values_list('name', flat=True)),
+            ['lunch', 'vegan']
+        )
+        self.assertEqual(soup.price, Decimal('4.50'))
+
+    def test_bulk_create_query_count_is_constant(self):
+        def post(count):
+            payload = [
+                {
+                    'title': f'Recipe {i}',
+                    'time_minutes': 5,
+                    'tags': [{'name': 'shared'}, {'name': f'tag-{i}'}]
+                }
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(ctx)
+
+        # sqlite nie zwraca id z bulk insert, więc recepty zapisuje osobno
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertEqual(post(2), post(50))
+
+    def test_bulk_create_reports_errors_per_item(self):
+        payload = [
+            {'title': 'Soup', 'time_minutes': 20},
+            {'title': 'Broken'},
+            {'time_minutes': 'abc'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            [error['index'] for error in res.data['errors']], [1, 2]
+        )
+        self.assertIn('time_minutes', res.data['errors'][0]['errors'])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(BULK_URL, {'title': 'Soup'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        first = create_recipe(user=self.user)
+        first.tags.add(vegan)
+        second = create_recipe(user=self.user)
+        payload = [
+            {'id': first.id, 'title': 'Renamed', 'tags': [{'name': 'dinner'}]},
+            {'id': second.id, 'time_minutes': 99},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.title, 'Renamed')
+        self.assertEqual(
+            list(first.tags.values_list('name', flat=True)), ['dinner']
+        )
+        self.assertEqual(second.time_minutes, 99)
+        self.assertEqual(second.title, 'Sample Recipe')
+
+    def test_bulk_update_duplicate_id_fails(self):
+        recipe = create_recipe(user=self.user)
+        payload = [
+            {'id': recipe.id, 'tags': [{'name': 'vegan'}]},
+            {'id': recipe.id, 'tags': [{'name': 'vegan'}]},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'], [{'index': 1, 'errors': {
+            'id': ['Duplicate id.']
+        }}])
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_update_other_users_recipe_fails(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass'
+        )
+        mine = create_recipe(user=self.user)
+        theirs = create_recipe(user=other)
+        payload = [
+            {'id': mine.id, 'title': 'Mine'},
+            {'id': theirs.id, 'title': 'Stolen'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        mine.refresh_from_db()
+        self.assertEqual(mine.title, 'Sample Recipe')
+
+    def test_bulk_delete(self):
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+
+        res = self.client.delete(
+            BULK_URL, [recipes[0].id, recipes[2].id], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            list(Recipe.objects.values_list('id', flat=True)),
+            [recipes[1].id]
+        )
+
+    def test_bulk_delete_rejects_non_integer_ids(self):
+        recipe = create_recipe(user=self.user)
+
+        for payload in ([{'id': recipe.id}], [[recipe.id]], [True],
+                        [str(recipe.id)]):
+            res = self.client.delete(
+                BULK_URL, [recipe.id] + payload, format='json'
+            )
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(res.data['errors'], [{'index': 1, 'errors': {
+                'id': ['A valid integer is required.']
+            }}])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_delete_true_is_not_recipe_one(self):
+        recipe = create_recipe(user=self.user, id=1)
+
+        res = self.client.delete(BULK_URL, [True], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_write_invalidates_list_cache(self):
+        self.client.get(RECIPES_URL)
+
+        self.client.post(
+            BULK_URL, [{'title': 'Soup', 'time_minutes': 5}], format='json'
+        )
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+
+class ResolveTagsTests(TestCase):
+    """Test resolving tag names to tags"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+
+    def test_existing_and_new_tags(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+
+        found = resolve_tags(self.user, ['vegan', 'lunch', 'vegan'])
+
+        self.assertEqual(set(found), {'vegan', 'lunch'})
+        self.assertEqual(found['vegan'].pk, vegan.pk)
+        self.assertIsNotNone(found['lunch'].pk)
+
+    def test_tag_created_concurrently_is_reused(self):
+        """Test a tag inserted after the lookup is not duplicated"""
+        real_filter = Tag.objects.filter
+        calls = []
+
+        def filter_racing_with_other_request(*args, **kwargs):
+            if not calls:
+                calls.append(kwargs)
+                result = real_filter(*args, **kwargs)
+                list(result)
+                Tag.objects.create(user=self.user, name='vegan')
+                return result
+            return real_filter(*args, **kwargs)
+
+        with patch.object(Tag.objects, 'filter',
+                          side_effect=filter_racing_with_other_request):
+            found = resolve_tags(self.user, ['vegan'])
+
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(
+            found['vegan'].pk, Tag.objects.get(user=self.user).pk
+        )
@@ -0,0 +1,218 @@
+"""
+Tests for the recipe API response cache
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.cache import get_user_version
+from recipe.checks import check_response_cache_backend
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Sample Recipe', 'time_minutes': 10}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test cached list and retrieve responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, second.data)
+
+    def test_query_params_are_part_of_key(self):
+        create_recipe(user=self.user)
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        create_recipe(user=self.user, title='Mine')
+        self.client.get(RECIPES_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_create_invalidates_list(self):
+        self.client.get(RECIPES_URL)
+
+        self.client.post(RECIPES_URL, {'title': 'New', 'time_minutes': 5})
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_update_invalidates_detail(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Renamed'})
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['title'], 'Renamed')
+
+    def test_tag_changes_invalidate_recipe_list(self):
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        self.client.get(RECIPES_URL)
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'vegan')
+
+        tag.name = 'vegetarian'
+        tag.save()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            res.data['results'][0]['tags'][0]['name'], 'vegetarian'
+        )
+
+        tag.delete()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data['results'][0]['tags'], [])
+
+    def test_tag_list_invalidated_by_delete(self):
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        self.client.get(TAGS_URL)
+
+        self.client.delete(reverse('recipe:tag-detail', args=[tag.id]))
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_version_survives_lost_key(self):
+        version = get_user_version(self.user.pk)
+        cache.clear()
+
+        self.assertGreater(get_user_version(self.user.pk), version)
+
+    @override_settings(RECIPE_API_CACHE={'ENABLED': False})
+    def test_cache_can_be_disabled(self):
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(2):
+            self.client.get(RECIPES_URL)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag / If-None-Match handling"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(user=self.user)
+
+    def test_matching_etag_returns_not_modified(self):
+        for url in (RECIPES_URL, detail_url(self.recipe.id), TAGS_URL):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            etag = res['ETag']
+
+            with self.assertNumQueries(0):
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res['ETag'], etag)
+            self.assertEqual(res.content, b'')
+
+    @override_settings(RECIPE_API_CACHE={'ENABLED': False})
+    def test_etag_does_not_need_response_cache(self):
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_after_write(self):
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Renamed'})
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_etag_depends_on_url_and_user(self):
+        list_etag = self.client.get(RECIPES_URL)['ETag']
+        page_etag = self.client.get(RECIPES_URL, {'page_size': 1})['ETag']
+        self.assertNotEqual(list_etag, page_etag)
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass'
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=list_etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_missing_recipe_has_no_etag(self):
+        res = self.client.get(detail_url(self.recipe.id + 1000))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(res.has_header('ETag'))
+
+
+class CacheBackendCheckTests(SimpleTestCase):
+    """Test the check of the cache backend used for versions"""
+    locmem = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }}
+    shared = {'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_table',
+    }}
+
+    @override_settings(WEB_CONCURRENCY=1, CACHES=locmem)
+    def test_local_cache_allowed_for_single_process(self):
+        self.assertEqual(check_response_cache_backend(None), [])
+
+    @override_settings(WEB_CONCURRENCY=4, CACHES=locmem)
+    def test_local_cache_refused_for_several_processes(self):
+        errors = check_response_cache_backend(None)
+
+        self.assertEqual([error.id for error in errors], ['recipe.E001'])
+
+    @override_settings(WEB_CONCURRENCY=4, CACHES=shared)
+    def test_shared_cache_allowed_for_several_processes(self):
+        self.assertEqual(check_response_cache_backend(None), [])
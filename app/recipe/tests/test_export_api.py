@@ -0,0 +1,115 @@
+"""
+Tests for the streaming recipe export
+"""
+import csv
+import io
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': '5.00',
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def read_body(res):
+    return b''.join(res.streaming_content).decode()
+
+
+class ExportApiTests(TestCase):
+    """Test exporting recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        self.client.force_authenticate(None)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_ndjson(self):
+        recipe = create_recipe(user=self.user, title='Zażółć gęślą jaźń')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+        create_recipe(user=self.user, title='Second')
+        create_recipe(
+            user=get_user_model().objects.create_user(
+                email='other@example.com', password='testpass'
+            )
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in read_body(res).splitlines()]
+        self.assertEqual([row['title'] for row in rows],
+                         ['Second', 'Zażółć gęślą jaźń'])
+        self.assertEqual(rows[1]['tags'], [{'id': recipe.tags.get().id,
+                                            'name': 'vegan'}])
+        self.assertEqual(rows[1]['price'], '5.00')
+        self.assertEqual(rows[1]['description'], 'Sample description')
+
+    def test_export_csv(self):
+        recipe = create_recipe(user=self.user, title='Soup, hot')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='vegan'),
+            Tag.objects.create(user=self.user, name='lunch'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(read_body(res))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Soup, hot')
+        self.assertEqual(sorted(rows[0]['tags'].split('|')),
+                         ['lunch', 'vegan'])
+
+    def test_export_reads_in_chunks(self):
+        for i in range(7):
+            create_recipe(user=self.user, title=f'Recipe {i}')
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 3):
+            res = self.client.get(EXPORT_URL)
+            with CaptureQueriesContext(connection) as ctx:
+                lines = read_body(res).splitlines()
+
+        self.assertEqual(len(lines), 7)
+        # 3 pełne porcje z tagami + puste zapytanie kończące
+        self.assertEqual(len(ctx), 3 * 2 + 1)
+        self.assertEqual(len(set(lines)), 7)
+
+    def test_export_empty_library(self):
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(read_body(res).strip(), ','.join((
+            'id', 'title', 'description', 'time_minutes', 'price', 'link',
+            'tags'
+        )))
@@ -0,0 +1,183 @@
+"""
+Tests for importing recipes from files
+"""
+import json
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.bulk import bulk_create_recipes
+from recipe.views import RecipeViewSet
+
+IMPORT_URL = reverse('recipe:recipe-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode()
+
+
+def read_lines(res):
+    body = b''.join(res.streaming_content).decode()
+    return [json.loads(line) for line in body.splitlines()]
+
+
+class ImportApiTests(TestCase):
+    """Test the import endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, name='recipes.ndjson', **data):
+        data['file'] = SimpleUploadedFile(name, content)
+        return self.client.post(IMPORT_URL, data, format='multipart')
+
+    def test_import_ndjson(self):
+        Tag.objects.create(user=self.user, name='vegan')
+        content = ndjson(
+            {'title': 'Soup', 'time_minutes': 20, 'price': '4.50',
+             'tags': [{'name': 'vegan'}, {'name': 'lunch'}]},
+            {'title': 'Cake', 'time_minutes': 60, 'tags': [{'name': 'lunch'}]},
+        )
+
+        res = self.upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        summary = read_lines(res)[-1]
+        self.assertTrue(summary['done'])
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_reports_progress_per_batch(self):
+        content = ndjson(*[
+            {'title': f'Recipe {i}', 'time_minutes': 5} for i in range(5)
+        ])
+
+        with patch.object(RecipeViewSet, 'import_batch_size', 2):
+            lines = read_lines(self.upload(content))
+
+        self.assertEqual([line['processed'] for line in lines],
+                         [2, 4, 5, 5])
+        self.assertNotIn('errors', lines[0])
+
+    def test_import_skips_invalid_lines(self):
+        content = ndjson(
+            {'title': 'Soup', 'time_minutes': 20},
+            {'title': 'No time'},
+        ) + b'not json\n'
+
+        summary = read_lines(self.upload(content))[-1]
+
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(summary['failed'], 2)
+        self.assertEqual([error['line'] for error in summary['errors']],
+                         [2, 3])
+        self.assertIn('time_minutes', summary['errors'][0]['errors'])
+
+    def test_import_reports_invalid_utf8_lines(self):
+        content = ndjson({'title': 'Soup', 'time_minutes': 20})
+        content += b'{"title": "Zupa \xc5", "time_minutes": 5}\n'
+        content += ndjson({'title': 'Cake', 'time_minutes': 60})
+
+        csv_content = (
+            b'title,time_minutes\nSoup,20\n"Zupa\n\xc5",5\nCake,60\n'
+        )
+
+        for name, data, line in (('recipes.ndjson', content, 2),
+                                 ('recipes.csv', csv_content, 4)):
+            res = self.upload(data, name=name)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            summary = read_lines(res)[-1]
+            self.assertTrue(summary['done'])
+            self.assertEqual(summary['created'], 2)
+            self.assertEqual(summary['errors'], [{'line': line, 'errors': {
+                'non_field_errors': ['Invalid UTF-8.']
+            }}])
+
+    def test_failed_import_reports_saved_recipes(self):
+        content = ndjson(*[
+            {'title': f'Recipe {i}', 'time_minutes': 5} for i in range(3)
+        ])
+        calls = []
+        real_create = bulk_create_recipes
+
+        def fail_second_batch(user, items):
+            calls.append(len(items))
+            if len(calls) == 2:
+                raise DatabaseError('connection lost')
+            return real_create(user, items)
+
+        with patch.object(RecipeViewSet, 'import_batch_size', 2), \
+                patch('recipe.importer.bulk_create_recipes',
+                      fail_second_batch), \
+                self.assertLogs('recipe.importer', 'ERROR'):
+            summary = read_lines(self.upload(content))[-1]
+
+        self.assertFalse(summary['done'])
+        self.assertIn('error', summary)
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_import_csv_round_trip(self):
+        recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=20, price='4.50'
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+        exported = b''.join(
+            self.client.get(EXPORT_URL, {'format': 'csv'}).streaming_content
+        )
+
+        summary = read_lines(self.upload(exported, name='recipes.csv'))[-1]
+
+        self.assertEqual(summary['created'], 1)
+        imported = Recipe.objects.exclude(id=recipe.id).get()
+        self.assertEqual(imported.title, 'Soup')
+        self.assertEqual(str(imported.price), '4.50')
+        self.assertEqual(list(imported.tags.all()), list(recipe.tags.all()))
+
+    def test_import_requires_file(self):
+        res = self.client.post(IMPORT_URL, {}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportCommandTests(TestCase):
+    """Test the import_recipes management command"""
+
+    def test_import_recipes_command(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as source:
+            source.write(ndjson(
+                {'title': 'Soup', 'time_minutes': 20},
+                {'title': 'Broken'},
+            ))
+            source.flush()
+            out, err = StringIO(), StringIO()
+
+            call_command('import_recipes', source.name,
+                         email=user.email, stdout=out, stderr=err)
+
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 1)
+        self.assertIn('Imported 1 recipes', out.getvalue())
+        self.assertIn('line 2', err.getvalue())
@@ -0,0 +1,198 @@
+"""
+Parity tests for the row based recipe list and retrieve
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import serializers as drf_serializers
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import serializers
+from recipe.readers import TAG_ORDERING, RowSerializer
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(RECIPE_API_CACHE={'ENABLED': False})
+class RowReadParityTests(TestCase):
+    """Test rows are serialized exactly like the model serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('zupa', 'Obiad', 'wegańska', 'a')
+        }
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title='Żurek', time_minutes=45,
+                price=Decimal('12.5'), link='https://example.com/zurek',
+                description='Na zakwasie'
+            ),
+            Recipe.objects.create(
+                user=self.user, title='Tost', time_minutes=3
+            ),
+            Recipe.objects.create(
+                user=self.user, title='Sałatka', time_minutes=10,
+                price=Decimal('0.00'), description=''
+            ),
+            Recipe.objects.create(
+                user=self.user, title='Pomidorowa', time_minutes=30,
+                price=Decimal('999.99')
+            ),
+        ]
+        self.recipes[0].tags.add(*self.tags.values())
+        self.recipes[2].tags.add(self.tags['wegańska'], self.tags['a'])
+        self.recipes[3].tags.add(self.tags['zupa'], self.tags['Obiad'])
+
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass'
+        )
+        Recipe.objects.create(user=other, title='Obcy', time_minutes=5)
+
+    def get_both(self, url):
+        """Return the row based and the serializer based response"""
+        fast = self.client.get(url)
+        with patch.object(RecipeViewSet, 'row_reads', False):
+            slow = self.client.get(url)
+        return fast, slow
+
+    def assertSameResponse(self, url):
+        fast, slow = self.get_both(url)
+        self.assertEqual(fast.status_code, slow.status_code)
+        self.assertEqual(fast.content, slow.content)
+        return fast
+
+    def test_reads_use_rows(self):
+        to_representation = RowSerializer.to_representation
+        with patch.object(
+            RowSerializer, 'to_representation', autospec=True,
+            side_effect=to_representation
+        ) as mock:
+            self.client.get(RECIPES_URL)
+            self.client.get(detail_url(self.recipes[0].id))
+
+        self.assertEqual(mock.call_count, 2)
+
+    def test_list_matches_serializer(self):
+        res = self.assertSameResponse(RECIPES_URL)
+
+        self.assertEqual(len(res.data['results']), len(self.recipes))
+
+    def test_filtered_lists_match_serializer(self):
+        tag_ids = f'{self.tags["zupa"].id},{self.tags["a"].id}'
+        for query in (
+            f'?tags={tag_ids}',
+            f'?tags={tag_ids}&tags_match=all',
+            '?tags=0',
+        ):
+            with self.subTest(query=query):
+                self.assertSameResponse(RECIPES_URL + query)
+
+    def test_every_page_matches_serializer(self):
+        url = RECIPES_URL + '?page_size=1'
+        pages = 0
+        while url:
+            res = self.assertSameResponse(url)
+            url = res.data['next']
+            pages += 1
+
+        self.assertEqual(pages, len(self.recipes))
+
+    def test_retrieve_matches_serializer(self):
+        for recipe in self.recipes:
+            with self.subTest(recipe=recipe.title):
+                res = self.assertSameResponse(detail_url(recipe.id))
+                self.assertIn('description', res.data)
+
+    def test_retrieve_not_found_matches_serializer(self):
+        other = Recipe.objects.get(title='Obcy')
+        for url in (detail_url(other.id), detail_url(0),
+                    RECIPES_URL + 'abc/'):
+            with self.subTest(url=url):
+                res = self.assertSameResponse(url)
+                self.assertEqual(res.status_code, 404)
+
+    def test_nested_tags_are_ordered(self):
+        res = self.client.get(detail_url(self.recipes[0].id))
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['tags']],
+            list(Tag.objects.filter(user=self.user).order_by(
+                *TAG_ORDERING
+            ).values_list('name', flat=True))
+        )
+
+
+class RowSerializerTests(TestCase):
+    """Test the row serializer against the serializers directly"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        tag = Tag.objects.create(user=self.user, name='deser')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Ciasto {i}', time_minutes=20 + i,
+                price=Decimal('3.10') * i if i else None
+            )
+            if i:
+                recipe.tags.add(tag)
+
+    def test_matches_serializers(self):
+        queryset = Recipe.objects.order_by('id')
+        for serializer_class in (
+            serializers.RecipeSerializer, serializers.RecipeDetailSerializer
+        ):
+            with self.subTest(serializer=serializer_class.__name__):
+                row_serializer = RowSerializer(serializer_class)
+                rows = list(queryset.values(*row_serializer.columns))
+
+                data = row_serializer.to_representation(rows)
+
+                expected = serializer_class(queryset, many=True).data
+                self.assertEqual(data, expected)
+                self.assertEqual(
+                    [list(item) for item in data],
+                    [list(item) for item in expected]
+                )
+
+    def test_tags_read_in_one_query(self):
+        row_serializer = RowSerializer(serializers.RecipeSerializer)
+        rows = list(Recipe.objects.values(*row_serializer.columns))
+
+        with self.assertNumQueries(1):
+            row_serializer.to_representation(rows)
+
+    def test_no_rows_no_queries(self):
+        row_serializer = RowSerializer(serializers.RecipeSerializer)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(row_serializer.to_representation([]), [])
+
+    def test_computed_fields_are_rejected(self):
+        class ComputedSerializer(serializers.RecipeSerializer):
+            summary = drf_serializers.SerializerMethodField()
+
+            class Meta(serializers.RecipeSerializer.Meta):
+                fields = ('id', 'summary')
+
+        with self.assertRaises(ImproperlyConfigured):
+            RowSerializer(ComputedSerializer)
@@ -1,7 +1,11 @@
 from decimal import Decimal
+from unittest import skipUnless
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework import status
@@ -9,12 +13,14 @@ from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag
 
+from recipe.views import RecipeViewSet
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
+DEDUPLICATING_NODE = r'^\s*(Unique|HashAggregate)'
 
 def detail_url(recipe_id):
     return reverse('recipe:recipe-detail', args=[recipe_id])
@@ -54,6 +60,7 @@ class PrivateRecpieApiTests(TestCase):
     """Test the private available recpie API"""
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.user = create_user(email='user@example.com', password='testpass')
         self.client.force_authenticate(self.user)
@@ -69,7 +76,7 @@ class PrivateRecpieApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         other_user = create_user(email='user1@example.com', password='testpass')
@@ -83,7 +90,7 @@ class PrivateRecpieApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
 
     def test_get_recipe_detail(self):
@@ -278,5 +285,233 @@ class PrivateRecpieApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.tags.count(), 0)
 
+    def test_tag_queries_do_not_grow_with_tag_count(self):
+        """Test creating and updating a recipe costs the same for any tags"""
+        Tag.objects.create(user=self.user, name='existing')
+
+        def post_with_tags(count):
+            payload = {
+                'title': 'Tagged recipe',
+                'time_minutes': 5,
+                'tags': [{'name': 'existing'}] + [
+                    {'name': f'tag-{count}-{i}'} for i in range(count)
+                ]
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data['tags']), count + 1)
+            return res.data['id'], len(ctx)
+
+        few_id, few_queries = post_with_tags(1)
+        many_id, many_queries = post_with_tags(30)
+        self.assertEqual(few_queries, many_queries)
+
+        def put_with_tags(recipe_id, count):
+            payload = {
+                'title': 'Tagged recipe',
+                'time_minutes': 5,
+                'tags': [{'name': f'new-{count}-{i}'} for i in range(count)]
+            }
+            url = detail_url(recipe_id)
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.put(url, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(ctx)
+
+        self.assertEqual(put_with_tags(few_id, 1), put_with_tags(many_id, 30))
+
+    def test_duplicate_tag_names_resolved_once(self):
+        """Test repeated tag names in a payload create a single tag"""
+        payload = {
+            'title': 'Avocado toast',
+            'time_minutes': 5,
+            'tags': [{'name': 'vegan'}, {'name': 'vegan'}]
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Tag.objects.filter(user=self.user, name='vegan').count(), 1
+        )
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_recipe_list_query_count_is_constant(self):
+        """Test listing recipes does not run a tags query per recipe"""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('vegan', 'dessert')
+        ]
+        created = 0
+        for size in (1, 100, 1000):
+            Recipe.objects.bulk_create([
+                Recipe(user=self.user, title=f'Recipe {i}', time_minutes=5)
+                for i in range(size - created)
+            ])
+            created = size
+            through = Recipe.tags.through
+            through.objects.bulk_create([
+                through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in Recipe.objects.filter(user=self.user)
+                for tag in tags
+            ], ignore_conflicts=True)
+
+            with self.assertNumQueries(2):
+                res = self.client.get(RECIPES_URL, {'page_size': size})
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['results']), size)
+            self.assertEqual(len(res.data['results'][0]['tags']), 2)
+
+    def test_recipe_detail_prefetches_tags(self):
+        """Test retrieving a recipe loads its tags in a single query"""
+        recipe = create_recpie(user=self.user)
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='vegan'),
+            Tag.objects.create(user=self.user, name='dessert')
+        )
+
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+
+    def test_recipe_list_cursor_pagination(self):
+        """Test recipes are paginated with opaque cursors"""
+        recipes = [
+            create_recpie(user=self.user, title=f'Recipe {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [recipes[4].id, recipes[3].id]
+        )
+
+        seen = [r['id'] for r in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            seen.extend(r['id'] for r in res.data['results'])
+            next_url = res.data['next']
+
+        self.assertEqual(seen, [r.id for r in reversed(recipes)])
+
+    def test_deep_recipe_page_does_not_count(self):
+        """Test a later page runs the same queries as the first one"""
+        for i in range(6):
+            create_recpie(user=self.user, title=f'Recipe {i}')
+
+        with CaptureQueriesContext(connection) as first:
+            res = self.client.get(RECIPES_URL, {'page_size': 2})
+        with CaptureQueriesContext(connection) as later:
+            self.client.get(self.client.get(res.data['next']).data['next'])
+
+        self.assertEqual(len(first), 2)
+        for query in first.captured_queries + later.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_filter_by_tags_any(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        dessert = Tag.objects.create(user=self.user, name='dessert')
+        both = create_recpie(user=self.user, title='Vegan cake')
+        both.tags.add(vegan, dessert)
+        only_vegan = create_recpie(user=self.user, title='Salad')
+        only_vegan.tags.add(vegan)
+        create_recpie(user=self.user, title='Steak')
+
+        res = self.client.get(
+            RECIPES_URL, {'tags': f'{vegan.id},{dessert.id}'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [only_vegan.id, both.id]
+        )
+
+    def test_filter_by_tags_all(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        dessert = Tag.objects.create(user=self.user, name='dessert')
+        both = create_recpie(user=self.user, title='Vegan cake')
+        both.tags.add(vegan, dessert)
+        create_recpie(user=self.user, title='Salad').tags.add(vegan)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': f'{vegan.id},{dessert.id},{vegan.id}',
+            'tags_match': 'all',
+        })
+
+        self.assertEqual([r['id'] for r in res.data['results']], [both.id])
+
+    def test_filter_by_tags_invalid(self):
+        res = self.client.get(RECIPES_URL, {'tags': '1,abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_tags_query_has_no_distinct(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(RECIPES_URL, {'tags': vegan.id})
+
+        self.assertNotIn('DISTINCT', ctx.captured_queries[0]['sql'].upper())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN checks need Postgres')
+class RecipeTagFilterPlanTests(TestCase):
+    """Check the shape of the tag filter query plans
+
+    Only the shape is checked, not the chosen indexes: on a table this
+    small the planner may rightly prefer sequential scans.
+    """
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='testpass')
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'tag {i}')
+            for i in range(5)
+        ]
+        recipes = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Recipe {i}', time_minutes=5)
+            for i in range(500)
+        ])
+        through = Recipe.tags.through
+        through.objects.bulk_create([
+            through(recipe_id=recipe.id, tag_id=tag.id)
+            for i, recipe in enumerate(recipes)
+            for tag in self.tags[:i % 5 + 1]
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe_tags')
+            cursor.execute('ANALYZE core_recipe')
+
+    def filtered(self, match_all):
+        return RecipeViewSet().filter_tags(
+            Recipe.objects.filter(user=self.user).order_by('-id'),
+            {tag.id for tag in self.tags[:3]},
+            match_all=match_all
+        )
+
+    def test_any_plan_does_not_deduplicate_recipes(self):
+        queryset = self.filtered(match_all=False)
+        plan = queryset.explain()
+
+        self.assertNotIn('DISTINCT', str(queryset.query).upper())
+        self.assertNotRegex(plan.splitlines()[0], DEDUPLICATING_NODE)
 
+    def test_all_plan_groups_link_rows_only(self):
+        queryset = self.filtered(match_all=True)
+        plan = queryset.explain()
 
+        self.assertNotIn('DISTINCT', str(queryset.query).upper())
+        self.assertNotRegex(plan.splitlines()[0], DEDUPLICATING_NODE)
+        self.assertIn('Aggregate', plan)
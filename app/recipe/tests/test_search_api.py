@@ -0,0 +1,99 @@
+"""
+Tests for full-text recipe search
+"""
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Sample Recipe', 'time_minutes': 10}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Search needs Postgres')
+class RecipeSearchApiTests(TestCase):
+    """Test the ?search= parameter of the recipe list"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, terms, **params):
+        res = self.client.get(RECIPES_URL, dict(params, search=terms))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def test_title_matches_rank_above_description_matches(self):
+        in_description = create_recipe(
+            user=self.user, title='Stew', description='with chickpeas'
+        )
+        in_title = create_recipe(user=self.user, title='Chickpea curry')
+        create_recipe(user=self.user, title='Pancakes')
+
+        res = self.search('chickpeas')
+
+        self.assertEqual([r['id'] for r in res.data['results']],
+                         [in_title.id, in_description.id])
+
+    def test_search_limited_to_user(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com', password='testpass'
+        )
+        create_recipe(user=other, title='Chickpea curry')
+
+        res = self.search('chickpea')
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_vector_follows_updates(self):
+        recipe = create_recipe(user=self.user, title='Pancakes')
+
+        recipe.title = 'Buckwheat pancakes'
+        recipe.save()
+
+        res = self.search('buckwheat')
+        self.assertEqual([r['id'] for r in res.data['results']], [recipe.id])
+
+    def test_bulk_created_recipes_are_searchable(self):
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Lentil soup {i}', time_minutes=5)
+            for i in range(3)
+        ])
+
+        res = self.search('lentils')
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_search_pages_are_stable(self):
+        for i in range(7):
+            create_recipe(
+                user=self.user,
+                title='Tomato ' * (i % 3 + 1),
+                description=f'Recipe {i}'
+            )
+
+        res = self.search('tomato', page_size=2)
+        seen = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(r['id'] for r in res.data['results'])
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
@@ -0,0 +1,131 @@
+"""
+Tests for sparse fieldsets selected with ?fields=
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+SCHEMA_URL = reverse('api-schema')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(RECIPE_API_CACHE={'ENABLED': False})
+class SparseFieldsApiTests(TestCase):
+    """Test trimming responses and queries to the requested fields"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Bigos', time_minutes=120,
+            price=Decimal('25.00'), description='Kapusta i mięso'
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='obiad'))
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, ' '.join(query['sql'] for query in queries)
+
+    def test_list_returns_requested_fields_in_serializer_order(self):
+        res, sql = self.get(RECIPES_URL, fields='title,id')
+
+        self.assertEqual(res.data['results'], [
+            {'id': self.recipe.id, 'title': 'Bigos'}
+        ])
+        self.assertNotIn('"price"', sql)
+        self.assertNotIn('core_recipe_tags', sql)
+
+    def test_tags_loaded_only_when_requested(self):
+        res, sql = self.get(RECIPES_URL, fields='id,tags')
+
+        self.assertEqual(
+            res.data['results'][0]['tags'][0]['name'], 'obiad'
+        )
+        self.assertIn('core_recipe_tags', sql)
+        self.assertNotIn('"title"', sql)
+
+    def test_retrieve_returns_requested_fields(self):
+        res, sql = self.get(detail_url(self.recipe.id), fields='description')
+
+        self.assertEqual(res.data, {'description': 'Kapusta i mięso'})
+        self.assertNotIn('"link"', sql)
+
+    def test_serializer_path_matches_rows(self):
+        for url, fields in (
+            (RECIPES_URL, 'id,price,tags'),
+            (detail_url(self.recipe.id), 'title,description'),
+        ):
+            with self.subTest(url=url):
+                fast, _ = self.get(url, fields=fields)
+                with patch.object(RecipeViewSet, 'row_reads', False):
+                    slow, sql = self.get(url, fields=fields)
+
+                self.assertEqual(fast.content, slow.content)
+                self.assertNotIn('"time_minutes"', sql)
+
+    def test_empty_fields_returns_everything(self):
+        res, _ = self.get(RECIPES_URL, fields=' ,')
+
+        self.assertIn('link', res.data['results'][0])
+
+    def test_unknown_field_rejected(self):
+        res = self.client.get(
+            RECIPES_URL, {'fields': 'id,description,secret'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data['fields'], ['Unknown fields: description, secret.']
+        )
+
+    def test_tag_list_returns_requested_fields(self):
+        res, sql = self.get(TAGS_URL, fields='name')
+
+        self.assertEqual(res.data['results'], [{'name': 'obiad'}])
+        self.assertNotIn('"recipe_count"', sql)
+
+    def test_writes_ignore_fields(self):
+        res = self.client.patch(
+            detail_url(self.recipe.id) + '?fields=id', {'title': 'Żurek'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Żurek')
+
+    def test_cached_responses_keyed_by_fields(self):
+        with override_settings(RECIPE_API_CACHE={}):
+            cache.clear()
+            first, _ = self.get(RECIPES_URL, fields='id')
+            second, _ = self.get(RECIPES_URL, fields='title')
+
+        self.assertEqual(list(first.data['results'][0]), ['id'])
+        self.assertEqual(list(second.data['results'][0]), ['title'])
+
+    def test_schema_documents_fields(self):
+        res = self.client.get(SCHEMA_URL)
+        schema = res.content.decode()
+
+        self.assertEqual(schema.count('name: fields'), 3)
+        self.assertIn('one of: id, name, recipe_count', schema)
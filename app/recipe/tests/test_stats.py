@@ -0,0 +1,225 @@
+"""
+Tests for tag recipe counts and user library statistics
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, UserStats
+from recipe.stats import rebuild_stats, recipes_added
+
+STATS_URL = reverse('recipe:stats')
+BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Sample Recipe', 'time_minutes': 10}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class StatsSignalTests(TestCase):
+    """Test stats are kept up to date by single-object writes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+
+    def stats(self):
+        return UserStats.objects.get(user=self.user)
+
+    def test_stats_created_with_user(self):
+        stats = self.stats()
+
+        self.assertEqual(stats.recipe_count, 0)
+        self.assertIsNone(stats.avg_time_minutes)
+        self.assertIsNone(stats.min_price)
+
+    def test_recipe_create_update_delete(self):
+        cheap = create_recipe(self.user, time_minutes=10, price=Decimal('2'))
+        create_recipe(self.user, time_minutes=30, price=Decimal('8.50'))
+        create_recipe(self.user, time_minutes=20)
+
+        stats = self.stats()
+        self.assertEqual(stats.recipe_count, 3)
+        self.assertEqual(stats.avg_time_minutes, 20)
+        self.assertEqual(stats.min_price, Decimal('2'))
+        self.assertEqual(stats.max_price, Decimal('8.50'))
+
+        cheap.time_minutes = 40
+        cheap.price = Decimal('9')
+        cheap.save()
+        stats = self.stats()
+        self.assertEqual(stats.time_minutes_total, 90)
+        self.assertEqual(stats.min_price, Decimal('8.50'))
+        self.assertEqual(stats.max_price, Decimal('9'))
+
+        cheap.delete()
+        stats = self.stats()
+        self.assertEqual(stats.recipe_count, 2)
+        self.assertEqual(stats.time_minutes_total, 50)
+        self.assertEqual(stats.max_price, Decimal('8.50'))
+        self.assertEqual(rebuild_stats(dry_run=True), [])
+
+    def test_added_prices_compare_as_numbers(self):
+        create_recipe(self.user, price=Decimal('9.50'))
+
+        recipes_added(self.user.pk, [
+            Recipe(user=self.user, time_minutes=5, price=Decimal('10.00')),
+            Recipe(user=self.user, time_minutes=5, price=Decimal('0.75')),
+        ])
+
+        stats = self.stats()
+        self.assertEqual(stats.min_price, Decimal('0.75'))
+        self.assertEqual(stats.max_price, Decimal('10.00'))
+
+    def test_tag_counts(self):
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        lunch = Tag.objects.create(user=self.user, name='lunch')
+        first = create_recipe(self.user)
+        second = create_recipe(self.user)
+
+        first.tags.add(vegan, lunch)
+        second.tags.add(vegan)
+        vegan.recipe_set.add(first)
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 2)
+        self.assertEqual(self.stats().tag_count, 2)
+
+        first.tags.remove(vegan, vegan)
+        second.tags.remove(lunch)
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 1)
+
+        first.tags.clear()
+        second.delete()
+        vegan.refresh_from_db()
+        lunch.refresh_from_db()
+        self.assertEqual((vegan.recipe_count, lunch.recipe_count), (0, 0))
+
+        lunch.delete()
+        self.assertEqual(self.stats().tag_count, 1)
+        self.assertEqual(rebuild_stats(dry_run=True), [])
+
+
+class StatsApiTests(TestCase):
+    """Test the stats endpoint and stats after API writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retrieve_stats(self):
+        create_recipe(self.user, time_minutes=10, price=Decimal('3'))
+        create_recipe(self.user, time_minutes=25)
+        Tag.objects.create(user=self.user, name='vegan')
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipe_count'], 2)
+        self.assertEqual(res.data['tag_count'], 1)
+        self.assertEqual(res.data['avg_time_minutes'], 17.5)
+        self.assertEqual(res.data['min_price'], '3.00')
+
+    def test_stats_require_auth(self):
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_missing_stats_are_built(self):
+        create_recipe(self.user)
+        UserStats.objects.filter(user=self.user).delete()
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipe_count'], 1)
+
+    def test_tag_list_shows_recipe_count(self):
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='vegan'))
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data['results'][0]['recipe_count'], 1)
+
+    def test_bulk_writes_keep_stats_in_sync(self):
+        res = self.client.post(BULK_URL, [
+            {'title': 'Soup', 'time_minutes': 20, 'price': '4.00',
+             'tags': [{'name': 'vegan'}, {'name': 'lunch'}]},
+            {'title': 'Cake', 'time_minutes': 60,
+             'tags': [{'name': 'lunch'}]},
+        ], format='json')
+        ids = {recipe['title']: recipe['id'] for recipe in res.data}
+        self.assertEqual(rebuild_stats(dry_run=True), [])
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name='lunch').recipe_count, 2
+        )
+
+        self.client.patch(BULK_URL, [
+            {'id': ids['Soup'], 'price': '1.00', 'tags': [{'name': 'dinner'}]},
+        ], format='json')
+        self.assertEqual(rebuild_stats(dry_run=True), [])
+        self.assertEqual(
+            Tag.objects.get(user=self.user, name='vegan').recipe_count, 0
+        )
+
+        self.client.delete(BULK_URL, list(ids.values()), format='json')
+        self.assertEqual(rebuild_stats(dry_run=True), [])
+        self.assertEqual(UserStats.objects.get(user=self.user).recipe_count, 0)
+
+
+class RebuildStatsCommandTests(TestCase):
+    """Test the rebuild_stats management command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        create_recipe(self.user, time_minutes=15).tags.add(self.tag)
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('rebuild_stats', *args, stdout=out)
+        return out.getvalue()
+
+    def test_no_drift(self):
+        self.assertIn('No drift found', self.call())
+
+    def test_reports_and_fixes_drift(self):
+        Tag.objects.filter(pk=self.tag.pk).update(recipe_count=7)
+        UserStats.objects.filter(user=self.user).update(recipe_count=3)
+
+        out = self.call('--dry-run')
+        self.assertIn(f'tag {self.tag.pk}: recipe_count 7 != 1', out)
+        self.assertIn(f'userstats {self.user.pk}: recipe_count 3 != 1', out)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 7)
+
+        self.assertIn('Fixed 2 drifted rows', self.call())
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.recipe_count, 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).recipe_count, 1)
+
+    def test_creates_missing_stats(self):
+        UserStats.objects.all().delete()
+
+        self.assertIn(f'userstats {self.user.pk}: missing', self.call())
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).time_minutes_total, 15
+        )
@@ -1,11 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Recipe, Tag
 
 from recipe.serializers import TagSerializer
 
@@ -34,6 +35,7 @@ class PublicTagsApiTests(TestCase):
 
 class PrivateTagsApiTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = creaet_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
@@ -48,7 +50,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         user2 = creaet_user(email="test2@gmail.com")
@@ -58,9 +60,9 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['id'], tag.id)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_update_tag(self):
         tag = create_tag(user=self.user)
@@ -83,4 +85,47 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         tags = Tag.objects.all().filter(user=self.user)
-        self.assertFalse(tags.exists())
\ No newline at end of file
+        self.assertFalse(tags.exists())
+
+    def test_tags_cursor_pagination(self):
+        """Test tags are paginated by name without repeating entries"""
+        names = ['Breakfast', 'Dessert', 'Lunch', 'Vegan', 'Dinner']
+        for name in names:
+            create_tag(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        seen = [t['name'] for t in res.data['results']]
+        self.assertNotIn('count', res.data)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(t['name'] for t in res.data['results'])
+
+        self.assertEqual(seen, sorted(names, reverse=True))
+
+    def test_filter_assigned_only(self):
+        assigned = create_tag(user=self.user, name='Vegan')
+        create_tag(user=self.user, name='Unused')
+        recipe = Recipe.objects.create(
+            user=self.user, title='Salad', time_minutes=5
+        )
+        recipe.tags.add(assigned)
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5
+        ).tags.add(assigned)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [t['id'] for t in res.data['results']], [assigned.id]
+        )
+
+    def test_rename_to_existing_name_fails(self):
+        create_tag(user=self.user, name='Vegan')
+        tag = create_tag(user=self.user, name='Dessert')
+
+        res = self.client.patch(get_tag_detail_url(tag.id), {'name': 'Vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Dessert')
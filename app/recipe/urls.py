@@ -11,5 +11,6 @@ router.register('tags', views.TagViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('stats/', views.UserStatsView.as_view(), name='stats'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+Async routes for recipe and tag reads, see recipe.async_views
+
+They shadow the matching router routes in app.urls_async; all names are
+still reversed through recipe.urls.
+"""
+from django.urls import re_path
+
+from recipe import async_views
+
+urlpatterns = [
+    re_path(r'^recipes/$', async_views.recipe_list),
+    re_path(r'^recipes/(?P<pk>[0-9]+)/$', async_views.recipe_detail),
+    re_path(r'^tags/$', async_views.tag_list),
+]
@@ -1,21 +1,125 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from django.db import transaction
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, FloatField, OuterRef, Prefetch
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+
+from drf_spectacular.utils import extend_schema, extend_schema_view
+
+from rest_framework import generics, viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from core.models import Recipe, Tag
+from core.authentication import CachedTokenAuthentication
+from core.models import Recipe, Tag, UserStats
 from recipe import serializers
+from recipe import stats
+from recipe.bulk import bulk_delete_recipes, bulk_update_recipes
+from recipe.cache import CachedListMixin, CachedRetrieveMixin
+from recipe.export import EXPORTERS, iter_chunks
+from recipe.importer import (
+    FORMATS,
+    guess_format,
+    import_recipes,
+    iter_records,
+    progress_lines,
+)
+from recipe.pagination import RecipeCursorPagination, TagCursorPagination
+from recipe.readers import TAG_ORDERING, RowReadMixin
+from recipe.sparse import SparseFieldsMixin, fields_parameter
+from recipe.renderers import CSVRenderer, NDJSONRenderer
+
+# musi być zgodne z konfiguracją triggera z migracji core 0006
+SEARCH_CONFIG = 'english'
+
+
+def params_to_ints(value, name):
+    """Convert a comma separated query parameter to a set of integers"""
+    try:
+        return {int(part) for part in value.split(',') if part.strip()}
+    except ValueError:
+        raise ValidationError({name: ['Expected comma separated ids.']})
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[fields_parameter(serializers.RecipeSerializer)]
+    ),
+    retrieve=extend_schema(
+        parameters=[fields_parameter(serializers.RecipeDetailSerializer)]
+    ),
+)
+class RecipeViewSet(CachedListMixin,
+                    CachedRetrieveMixin,
+                    SparseFieldsMixin,
+                    RowReadMixin,
+                    viewsets.ModelViewSet):
     """Manage recipes in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeDetailSerializer
+    pagination_class = RecipeCursorPagination
+    throttle_scope = 'recipes'
+    bulk_max_items = 10000
+    export_chunk_size = 500
+    import_batch_size = 1000
+    row_ordering = {'tags': TAG_ORDERING}
+
+    def with_tags(self, queryset):
+        return queryset.prefetch_related(Prefetch(
+            'tags',
+            queryset=Tag.objects.only('id', 'name').order_by(*TAG_ORDERING)
+        ))
+
+    def search(self, queryset, terms):
+        """Filter by full-text match on title/description, best match first"""
+        query = SearchQuery(
+            terms, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        ).filter(search_vector=query).order_by('-rank', '-id')
+
+    def filter_tags(self, queryset, tag_ids, match_all=False):
+        """Filter recipes linked to any (or all) of the tags
+
+        Uses a semi-join on the link table instead of joining it and
+        removing duplicate rows with DISTINCT.
+        """
+        links = Recipe.tags.through.objects.filter(tag_id__in=tag_ids)
+        if match_all:
+            links = links.values('recipe_id').annotate(
+                matched=Count('tag_id')
+            ).filter(matched=len(tag_ids))
+        return queryset.filter(id__in=links.values('recipe_id'))
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(
+            user=self.request.user
+        ).defer('search_vector').order_by('-id')
+        if self.action in ('list', 'retrieve'):
+            fields = self.get_sparse_fields()
+            if fields is None or 'tags' in fields:
+                queryset = self.with_tags(queryset)
+            queryset = self.only_sparse_fields(queryset)
+        if self.action != 'list':
+            return queryset
+
+        params = self.request.query_params
+        if params.get('tags'):
+            queryset = self.filter_tags(
+                queryset,
+                params_to_ints(params['tags'], 'tags'),
+                match_all=params.get('tags_match') == 'all'
+            )
+        if params.get('search'):
+            queryset = self.search(queryset, params['search'])
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -23,20 +127,213 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def get_row_fields(self):
+        return self.get_sparse_fields()
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        """Create, update or delete many recipes in one transaction
+
+        POST takes a list of recipes, PATCH a list of partial recipes with
+        their `id` and DELETE a list of ids. Nothing is written unless every
+        item is valid; errors are reported per item index.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list.']})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [
+                f'Ensure there are at most {self.bulk_max_items} items.'
+            ]})
+
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        if request.method == 'PATCH':
+            return self._bulk_update(items)
+        return self._bulk_delete(items)
+
+    def _bulk_error_response(self, errors):
+        return Response(
+            {'errors': errors}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def _bulk_response(self, recipes, status_code):
+        queryset = self.with_tags(self.get_queryset().filter(
+            id__in=[recipe.pk for recipe in recipes]
+        ))
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=status_code)
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            return self._bulk_error_response([
+                {'index': index, 'errors': errors}
+                for index, errors in enumerate(serializer.errors) if errors
+            ])
+
+        recipes = serializer.save(user=self.request.user)
+        return self._bulk_response(recipes, status.HTTP_201_CREATED)
 
-class TagViewSet(mixins.ListModelMixin,
+    def _owned_ids(self, ids):
+        # type, a nie isinstance: True nie może znaczyć przepisu o id 1
+        ids = [pk for pk in ids if type(pk) is int]
+        return self.get_queryset().filter(id__in=ids)
+
+    def _bulk_update(self, items):
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        instances = self._owned_ids(ids).in_bulk()
+
+        errors = []
+        changes = []
+        seen = set()
+        for index, (item, pk) in enumerate(zip(items, ids)):
+            instance = instances.get(pk)
+            if instance is None:
+                errors.append({'index': index, 'errors': {
+                    'id': ['Not found.']
+                }})
+                continue
+            if pk in seen:
+                # dwie zmiany jednego przepisu dublowałyby powiązania z tagami
+                errors.append({'index': index, 'errors': {
+                    'id': ['Duplicate id.']
+                }})
+                continue
+            seen.add(pk)
+            serializer = self.get_serializer(instance, data=item, partial=True)
+            if serializer.is_valid():
+                changes.append((instance, dict(serializer.validated_data)))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        if errors:
+            return self._bulk_error_response(errors)
+
+        with transaction.atomic():
+            recipes = bulk_update_recipes(self.request.user, changes)
+        return self._bulk_response(recipes, status.HTTP_200_OK)
+
+    def _bulk_delete(self, ids):
+        owned = set(self._owned_ids(ids).values_list('id', flat=True))
+        errors = []
+        for index, pk in enumerate(ids):
+            if type(pk) is not int:
+                errors.append({'index': index, 'errors': {
+                    'id': ['A valid integer is required.']
+                }})
+            elif pk not in owned:
+                errors.append({'index': index, 'errors': {
+                    'id': ['Not found.']
+                }})
+        if errors:
+            return self._bulk_error_response(errors)
+
+        with transaction.atomic():
+            bulk_delete_recipes(
+                self.request.user, self.get_queryset().filter(id__in=owned)
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'], url_path='export',
+            renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream all recipes of the user as NDJSON or CSV
+
+        The format is picked with the Accept header or ?format=ndjson|csv.
+        """
+        renderer = request.accepted_renderer
+        chunks = iter_chunks(
+            self.get_queryset(), self.export_chunk_size, self.with_tags
+        )
+        response = StreamingHttpResponse(
+            EXPORTERS[renderer.format](chunks, self.get_serializer_class()),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import',
+            url_name='import', parser_classes=[MultiPartParser],
+            renderer_classes=[NDJSONRenderer])
+    def import_file(self, request):
+        """Import recipes from an uploaded NDJSON or CSV `file`
+
+        The file is parsed as a stream and written in batches. Progress is
+        streamed back as NDJSON, one line per batch, followed by a summary
+        with per-line errors. Every batch is committed on its own, so an
+        import that stops early keeps the recipes counted as created.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['No file was submitted.']})
+        file_format = request.data.get('format') or guess_format(upload.name)
+        if file_format not in FORMATS:
+            raise ValidationError({'format': [
+                f'Expected one of: {", ".join(FORMATS)}.'
+            ]})
+
+        progress = import_recipes(
+            request.user,
+            iter_records(upload.file, file_format),
+            self.get_serializer(),
+            batch_size=self.import_batch_size,
+        )
+        return StreamingHttpResponse(
+            progress_lines(progress),
+            content_type=f'{NDJSONRenderer.media_type}; charset=utf-8'
+        )
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[fields_parameter(serializers.TagSerializer)]
+    ),
+)
+class TagViewSet(CachedListMixin,
+                 SparseFieldsMixin,
+                 mixins.ListModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.DestroyModelMixin,
                  viewsets.GenericViewSet):
     """Manage tags in the database"""
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = TagCursorPagination
+    throttle_scope = 'tags'
+    sparse_required_fields = ('id', 'name')
 
     def get_queryset(self):
-        return super().get_queryset().filter(user=self.request.user).order_by('-name')
+        queryset = super().get_queryset().filter(
+            user=self.request.user
+        ).order_by('-name', 'id')
+        if self.request.query_params.get('assigned_only') in ('1', 'true'):
+            queryset = queryset.filter(Exists(
+                Recipe.tags.through.objects.filter(tag_id=OuterRef('pk'))
+            ))
+        return self.only_sparse_fields(queryset)
+
+
+class UserStatsView(generics.RetrieveAPIView):
+    """Show totals of the authenticated user's recipe library"""
+    serializer_class = serializers.UserStatsSerializer
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_scope = 'recipes'
 
+    def get_object(self):
+        user_stats, created = UserStats.objects.get_or_create(
+            user=self.request.user
+        )
+        if created:
+            stats.refresh_user_stats(self.request.user.pk)
+            user_stats.refresh_from_db()
+        return user_stats
@@ -0,0 +1,109 @@
+"""
+Tests for throttling and load shedding of the token endpoint
+"""
+import threading
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.executors import ExecutorBusy, get_executor
+from user.throttles import LoginEmailThrottle, LoginIPThrottle
+
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+class LoginLimitsTests(TestCase):
+    """Test the token endpoint sheds load and throttles guessing"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass'
+        )
+
+    def login(self, email='user@example.com', password='testpass', **extra):
+        return self.client.post(
+            TOKEN_URL, {'email': email, 'password': password}, **extra
+        )
+
+    @override_settings(EXECUTORS=dict(
+        settings.EXECUTORS, password={'MAX_WORKERS': 1, 'MAX_PENDING': 0}
+    ))
+    def test_busy_password_executor_returns_503(self):
+        release = threading.Event()
+        blocker = get_executor('password').submit(release.wait)
+        try:
+            res = self.login()
+        finally:
+            release.set()
+            blocker.result()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(res.data['detail'].code, 'service_busy')
+
+    def test_busy_password_change_returns_503(self):
+        self.client.force_authenticate(self.user)
+        with patch('core.passwords.run', side_effect=ExecutorBusy):
+            res = self.client.patch(ME_URL, {'password': 'newpassword'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @patch.object(LoginEmailThrottle, 'rate', '2/min', create=True)
+    def test_throttled_per_email(self):
+        for password in ('wrong1', 'wrong2'):
+            self.assertEqual(
+                self.login(password=password).status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        res = self.login(email=' USER@example.com')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+        other = self.login(email='other@example.com')
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch.object(LoginIPThrottle, 'rate', '2/min', create=True)
+    def test_throttled_per_ip(self):
+        for i in range(2):
+            self.login(email=f'guess{i}@example.com')
+
+        res = self.login()
+        elsewhere = self.login(REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(elsewhere.status_code, status.HTTP_200_OK)
+
+    @patch.object(LoginIPThrottle, 'rate', '2/min', create=True)
+    def test_forwarded_for_header_does_not_change_ip(self):
+        for i in range(2):
+            self.login(email=f'guess{i}@example.com',
+                       HTTP_X_FORWARDED_FOR=f'1.2.3.{i}')
+
+        res = self.login(HTTP_X_FORWARDED_FOR='1.2.3.99')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch.object(LoginIPThrottle, 'rate', '2/min', create=True)
+    def test_client_ip_taken_from_trusted_proxy(self):
+        rest_framework = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            for i in range(2):
+                self.login(email=f'guess{i}@example.com',
+                           HTTP_X_FORWARDED_FOR='6.6.6.6, 10.0.0.1')
+
+            res = self.login(HTTP_X_FORWARDED_FOR='6.6.6.6, 10.0.0.1')
+            elsewhere = self.login(HTTP_X_FORWARDED_FOR='6.6.6.6, 10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(elsewhere.status_code, status.HTTP_200_OK)
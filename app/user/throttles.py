@@ -0,0 +1,30 @@
+"""
+Throttles of the token endpoint
+"""
+import hashlib
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPThrottle(SimpleRateThrottle):
+    """Limit token requests per client IP"""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class LoginEmailThrottle(SimpleRateThrottle):
+    """Limit token requests per email, whatever address they come from"""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        email = getattr(request.data, 'get', lambda key: None)('email')
+        if not isinstance(email, str) or not email.strip():
+            return None
+        # skrót, żeby klucz cache nie zależał od znaków w adresie
+        ident = hashlib.sha1(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -1,25 +1,34 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.throttling import TokenBucketThrottle
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer
 )
+from user.throttles import LoginEmailThrottle, LoginIPThrottle
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_scope = 'user'
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (
+        TokenBucketThrottle, LoginIPThrottle, LoginEmailThrottle
+    )
+    throttle_scope = 'user'
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'user'
 
     def get_object(self):
         return self.request.user
\ No newline at end of file